@@ -0,0 +1,269 @@
+import asyncio
+import functools
+import inspect
+from concurrent.futures import ThreadPoolExecutor
+
+from databaseoperations import DBOperations
+from employee import Employee
+from employeefilter import EmployeeFilter
+from userconfirmation import UserConfirmationProvider
+
+
+class BlockingConfirmationProvider(UserConfirmationProvider):
+    """
+    Wraps a confirmation provider whose requestConfirmation is a coroutine function, so that it can be
+    given to DBOperations, which calls it from a worker thread. Each request is run on the event loop
+    and the worker thread waits for the answer.
+    """
+
+    def __init__(self, provider, loop) -> None:
+        """
+        Args:
+            provider: An object with an "async def requestConfirmation(self, data)" method
+            loop (asyncio.AbstractEventLoop): The event loop to run the requests on
+        """
+        super().__init__(getattr(provider, "prompt", ""))
+        self.provider = provider
+        self.loop = loop
+
+    def requestConfirmation(self, data):
+        return asyncio.run_coroutine_threadsafe(self.provider.requestConfirmation(data), self.loop).result()
+
+
+def copy_result(result):
+    """Copies the Employees in a read result, so that callers sharing a coalesced read can each
+    modify what they are given.
+    """
+    if isinstance(result, Employee):
+        return Employee(result.id, result.title, result.forename, result.surname, result.email, result.salary)
+    if isinstance(result, list):
+        return [copy_result(r) for r in result]
+    return result
+
+
+class AsyncDBOperations:
+    """
+    The AsyncDBOperations class gives asyncio code awaitable versions of the DBOperations functions.
+    Each call runs on a bounded pool of worker threads using a pooled DBOperations object, so each
+    worker keeps one connection open for its lifetime and the event loop is never blocked by SQLite.
+
+    Concurrent calls to the same read function with the same arguments are coalesced: only the first
+    is run, and the others wait for its result (each getting their own copy of the Employees). A read
+    never joins one which started before a write made through this object finished, so a caller
+    always sees its own changes.
+
+    Confirmation providers may be ordinary UserConfirmationProviders, which are called on the worker
+    thread, or have an "async def requestConfirmation(self, data)" method, which is awaited on the
+    event loop. In both cases the worker waits for the answer, so a slow confirmation ties up one
+    worker but not the event loop.
+
+    An AsyncDBOperations object should only be used from one event loop.
+    """
+
+    def __init__(self, database_name: str, max_workers: int = 4, **db_options):
+        """
+        Args:
+            database_name (str): Path to the SQLite database file.
+            max_workers (int, optional): Number of worker threads, and so of open connections. Defaults to 4.
+            **db_options: Any other DBOperations arguments (cache_size, profile, instrumentation, ...).
+            The DBOperations object is always pooled. Note that it migrates the schema when it is created,
+            so create AsyncDBOperations objects at startup rather than while serving requests.
+        """
+        self.db_ops = DBOperations(database_name, pooled=True, **db_options)
+        self.max_workers = max_workers
+        self.executor = ThreadPoolExecutor(max_workers, thread_name_prefix="AsyncDBOperations")
+        self.coalesced_reads = 0
+        self._write_generation = 0
+        self._in_flight = {}
+
+    async def __aenter__(self):
+        return self
+
+    async def __aexit__(self, exc_type, exc_value, traceback):
+        await self.close()
+
+    async def close(self):
+        """Waits for running calls to finish, then stops the workers and closes their connections.
+        """
+        loop = asyncio.get_running_loop()
+        await loop.run_in_executor(None, functools.partial(self.executor.shutdown, wait=True))
+        self.db_ops.close()
+
+    async def _run(self, name, *args, **kwargs):
+        """Runs a DBOperations function on a worker thread.
+        """
+        loop = asyncio.get_running_loop()
+        return await loop.run_in_executor(self.executor, functools.partial(getattr(self.db_ops, name), *args, **kwargs))
+
+    async def _read(self, name, *args):
+        """Runs a DBOperations function which doesn't change the database, joining an identical call
+        already in flight if there is one. Every caller of a shared call, including the one which started
+        it, gets its own copy of the result, so none of them sees another's changes to it.
+        """
+        key = (name, self._write_generation) + args
+        try:
+            future = self._in_flight.get(key)
+        except TypeError:
+            # Unhashable arguments, so the call can't be matched with others
+            return await self._run(name, *args)
+
+        if future is not None:
+            self.coalesced_reads += 1
+            return copy_result(await asyncio.shield(future))
+
+        future = asyncio.ensure_future(self._run(name, *args))
+        self._in_flight[key] = future
+        future.add_done_callback(lambda f: self._in_flight.pop(key, None))
+        return copy_result(await asyncio.shield(future))
+
+    async def _write(self, name, *args, **kwargs):
+        """Runs a DBOperations function which may change the database, awaiting an async confirmation
+        provider (the last positional argument or confirmationProvider) on the event loop.
+        """
+        loop = asyncio.get_running_loop()
+        args = [self._confirmation_provider(a, loop) for a in args]
+        kwargs = {k: self._confirmation_provider(v, loop) for k, v in kwargs.items()}
+        try:
+            return await self._run(name, *args, **kwargs)
+        finally:
+            self._write_generation += 1
+
+    @staticmethod
+    def _confirmation_provider(value, loop):
+        requestConfirmation = getattr(value, "requestConfirmation", None)
+        if requestConfirmation is not None and inspect.iscoroutinefunction(requestConfirmation):
+            return BlockingConfirmationProvider(value, loop)
+        return value
+
+    async def create_table_if_not_exists(self):
+        return await self._write("create_table_if_not_exists")
+
+    async def table_exists(self, table_name: str = None):
+        return await self._read("table_exists", table_name)
+
+    async def create_table(self):
+        return await self._write("create_table")
+
+    async def upgrade_schema(self):
+        return await self._write("upgrade_schema")
+
+    async def search_index_exists(self):
+        return await self._read("search_index_exists")
+
+    async def create_search_index(self):
+        return await self._write("create_search_index")
+
+    async def name_key_index_exists(self):
+        return await self._read("name_key_index_exists")
+
+    async def create_name_key_index(self):
+        return await self._write("create_name_key_index")
+
+    async def update_name_key_index(self, best_effort: bool = False):
+        return await self._write("update_name_key_index", best_effort)
+
+    async def insert_data(self, data_to_insert: Employee, confirmationProvider):
+        return await self._write("insert_data", data_to_insert, confirmationProvider)
+
+    async def insert_many(self, employees, confirmationProvider, batch_size: int = 1000, sample_size: int = 5,
+                          row_count: int = None):
+        """See DBOperations.insert_many. employees must be an ordinary (not async) iterable, as it is read
+        on a worker thread.
+        """
+        return await self._write("insert_many", employees, confirmationProvider, batch_size, sample_size, row_count)
+
+    async def import_file(self, path: str, confirmationProvider, batch_size: int = 1000, pipeline=None):
+        return await self._write("import_file", path, confirmationProvider, batch_size, pipeline)
+
+    async def export_file(self, path: str, columns=None, employee_filter: EmployeeFilter = None, format: str = None,
+                          batch_size: int = 10000):
+        return await self._run("export_file", path, columns, employee_filter, format, batch_size)
+
+    async def select_all(self):
+        return await self._read("select_all")
+
+    async def select_page(self, after_id: int = 0, limit: int = 100):
+        return await self._read("select_page", after_id, limit)
+
+    async def iter_pages(self, page_size: int = 100, after_id: int = 0):
+        """Async generator which pages through the EmployeeUoB table with select_page. No query is held
+        open between pages.
+
+        Yields:
+            list[Employee]: Each page of Employees
+        """
+        while True:
+            page = await self.select_page(after_id, page_size)
+            if not page:
+                return
+            yield page
+            if len(page) < page_size:
+                return
+            after_id = page[-1].id
+
+    async def iter_all(self, chunk_size: int = 1000):
+        """Async generator which yields every Employee in the EmployeeUoB table, fetching chunk_size
+        Employees at a time. Unlike DBOperations.iter_all it fetches by pages, so that no worker or query
+        is held while the caller awaits other things.
+
+        Yields:
+            Employee: Each Employee, in Id order
+        """
+        async for page in self.iter_pages(chunk_size):
+            for employee in page:
+                yield employee
+
+    async def search_data_name(self, term, mode: str = "auto", limit: int = None):
+        return await self._read("search_data_name", term, mode, limit)
+
+    async def search_data_id(self, search_term: int):
+        return await self._read("search_data_id", search_term)
+
+    async def search_data_email(self, email: str):
+        return await self._read("search_data_email", email)
+
+    async def update_data(self, employee: Employee, confirmationProvider):
+        return await self._write("update_data", employee, confirmationProvider)
+
+    async def delete_data(self, id: int, confirmationProvider):
+        return await self._write("delete_data", id, confirmationProvider)
+
+    async def adjust_pay(self, id: int, percentage_increase: float, confirmationProvider):
+        return await self._write("adjust_pay", id, percentage_increase, confirmationProvider)
+
+    async def adjust_pay_all_employees(self, percentage_increase: float, confirmationProvider, preview_size: int = 10):
+        return await self._write("adjust_pay_all_employees", percentage_increase, confirmationProvider, preview_size)
+
+    async def adjust_pay_bulk(self, rules, confirmationProvider, employee_filter: EmployeeFilter = None,
+                              preview_size: int = 10):
+        return await self._write("adjust_pay_bulk", rules, confirmationProvider, employee_filter, preview_size)
+
+    async def latest_change_cursor(self):
+        return await self._read("latest_change_cursor")
+
+    async def changes_since(self, cursor: int = 0, limit: int = 1000):
+        return await self._read("changes_since", cursor, limit)
+
+    async def compact_change_log(self, max_age_seconds: float = None, max_changes: int = None):
+        return await self._write("compact_change_log", max_age_seconds, max_changes)
+
+    async def sync_records(self, records, confirmationProvider, key: str = "email", delete_missing: bool = False,
+                           batch_size: int = 5000, preview_size: int = 10):
+        """See DBOperations.sync_records. records must be an ordinary (not async) iterable, as it is read
+        on a worker thread.
+        """
+        return await self._write("sync_records", records, confirmationProvider, key, delete_missing, batch_size,
+                                 preview_size)
+
+    async def sync_file(self, path: str, confirmationProvider, key: str = "email", delete_missing: bool = False,
+                        batch_size: int = 5000):
+        return await self._write("sync_file", path, confirmationProvider, key, delete_missing, batch_size)
+
+    async def backup(self, target_path: str, pages: int = 256, sleep: float = 0.05, progress=None,
+                     max_restarts: int = 10):
+        """See DBOperations.backup. progress, if given, is called on the worker thread.
+        """
+        return await self._run("backup", target_path, pages, sleep, progress, max_restarts)
+
+    async def restore(self, source_path: str, confirmationProvider):
+        return await self._write("restore", source_path, confirmationProvider)
@@ -0,0 +1,122 @@
+"""
+Load test of AsyncDBOperations: hundreds of concurrent lookups from asyncio tasks, for several worker
+pool sizes, compared with the same lookups made one after another through DBOperations from a coroutine.
+Each run also reports the longest time the event loop was kept from running other tasks.
+
+"id uniform" lookups are spread over the whole table; "id hot" lookups all go to a few Employees, as
+happens when many clients poll the same records, and show the effect of coalescing identical reads.
+"name LIKE" lookups (a tenth as many) each scan the table, and show the event loop being kept free
+while SQLite works.
+
+Run from the repository root:
+    python -m benchmarks.async_load [--rows 20000] [--lookups 2000] [--concurrency 500]
+"""
+import argparse
+import asyncio
+import json
+import os
+import random
+import tempfile
+import time
+
+from asyncdatabaseoperations import AsyncDBOperations
+from benchmarks.synthetic import SURNAMES, generate_employees
+from databaseoperations import DBOperations
+from userconfirmation import AutoConfirmationProvider
+
+
+def make_lookups(kind, rows, lookups):
+    """
+    Returns:
+        list[tuple]: (DBOperations function name, arguments) for each lookup
+    """
+    rng = random.Random(1)
+    if kind == "id hot":
+        return [("search_data_id", (rng.randint(1, 10),)) for _ in range(lookups)]
+    if kind == "id uniform":
+        return [("search_data_id", (rng.randint(1, rows),)) for _ in range(lookups)]
+    # A scan of the whole table for each lookup
+    return [("search_data_name", (rng.choice(SURNAMES) + str(rng.randrange(rows // len(SURNAMES))), "like"))
+            for _ in range(lookups // 10)]
+
+
+class StallMonitor:
+    """Measures how long the event loop goes without running a task which wakes every millisecond,
+    ie: how long other clients of the service would be kept waiting.
+    """
+
+    def __init__(self) -> None:
+        self.max_stall = 0.0
+        self.running = True
+
+    async def run(self):
+        last = time.perf_counter()
+        while self.running:
+            await asyncio.sleep(0.001)
+            now = time.perf_counter()
+            self.max_stall = max(self.max_stall, now - last - 0.001)
+            last = now
+
+
+async def run_blocking(path, lookups):
+    """Calls DBOperations directly from a coroutine, blocking the event loop."""
+    monitor = StallMonitor()
+    ticker = asyncio.ensure_future(monitor.run())
+    await asyncio.sleep(0.01)
+    with DBOperations(path, pooled=True) as db_ops:
+        start = time.perf_counter()
+        for name, args in lookups:
+            getattr(db_ops, name)(*args)
+        elapsed = time.perf_counter() - start
+    await asyncio.sleep(0.01)
+    monitor.running = False
+    await ticker
+    return {"lookups/s": round(len(lookups) / elapsed, 1), "max event loop stall ms": round(monitor.max_stall * 1000, 2)}
+
+
+async def run_concurrent(path, lookups, workers, concurrency):
+    async with AsyncDBOperations(path, max_workers=workers) as db_ops:
+        limit = asyncio.Semaphore(concurrency)
+        monitor = StallMonitor()
+        ticker = asyncio.ensure_future(monitor.run())
+
+        async def lookup(name, args):
+            async with limit:
+                return await getattr(db_ops, name)(*args)
+
+        start = time.perf_counter()
+        results = await asyncio.gather(*(lookup(name, args) for name, args in lookups))
+        elapsed = time.perf_counter() - start
+        monitor.running = False
+        await ticker
+        assert all(r is not None for r in results)
+        return {"lookups/s": round(len(lookups) / elapsed, 1), "coalesced": db_ops.coalesced_reads,
+                "max event loop stall ms": round(monitor.max_stall * 1000, 2)}
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--rows", type=int, default=20000, help="Employees in the database")
+    parser.add_argument("--lookups", type=int, default=2000, help="search_data_id calls of each kind (and a tenth as many name searches)")
+    parser.add_argument("--concurrency", type=int, default=500, help="lookups in flight at once")
+    parser.add_argument("--workers", type=int, nargs="+", default=[1, 2, 4, 8], help="worker pool sizes to try")
+    args = parser.parse_args()
+
+    report = {}
+    with tempfile.TemporaryDirectory() as directory:
+        path = os.path.join(directory, "async_load.db")
+        with DBOperations(path, pooled=True) as db_ops:
+            db_ops.create_table()
+            db_ops.insert_many(generate_employees(args.rows), AutoConfirmationProvider())
+
+        for kind in ("id uniform", "id hot", "name LIKE"):
+            lookups = make_lookups(kind, args.rows, args.lookups)
+            report[kind] = {"DBOperations (blocking)": asyncio.run(run_blocking(path, lookups))}
+            for workers in args.workers:
+                report[kind][f"{workers} workers"] = asyncio.run(run_concurrent(path, lookups, workers, args.concurrency))
+
+    print(json.dumps(report, indent=2))
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,75 @@
+"""
+Benchmark of DBOperations.backup on a database which is being written to: how long the backup takes
+and how many times it restarts, and the latency of the writes made alongside it, for a range of
+pages-per-step and sleep settings. The first row is the writer on its own, with no backup running.
+
+Run from the repository root:
+    python -m benchmarks.backup [--rows 100000] [--profile wal]
+"""
+import argparse
+import json
+import os
+import statistics
+import tempfile
+import threading
+import time
+
+from benchmarks.synthetic import generate_employees
+from databaseoperations import DBOperations
+from userconfirmation import AutoConfirmationProvider
+
+settings = [(-1, 0), (1024, 0), (256, 0.01), (64, 0.05)]
+
+
+def write_until(path, profile, stop, latencies):
+    approve = AutoConfirmationProvider()
+    with DBOperations(path, pooled=True, profile=profile, migrate=False) as db_ops:
+        employee_id = 1
+        while not stop.is_set():
+            start = time.perf_counter()
+            db_ops.adjust_pay(employee_id, 0.1, approve)
+            latencies.append(time.perf_counter() - start)
+            employee_id = employee_id % 1000 + 1
+            time.sleep(0.005)
+
+
+def run(db_ops, directory, profile, pages, sleep):
+    stop = threading.Event()
+    latencies = []
+    writer = threading.Thread(target=write_until, args=(db_ops.database_name, profile, stop, latencies))
+    writer.start()
+    if pages is None:
+        time.sleep(1)
+        result = {}
+    else:
+        result = db_ops.backup(os.path.join(directory, "backup.db"), pages, sleep) or {}
+    stop.set()
+    writer.join()
+
+    latencies.sort()
+    return dict(result, **{
+        "writes": len(latencies),
+        "write median ms": round(statistics.median(latencies) * 1000, 2),
+        "write max ms": round(latencies[-1] * 1000, 2),
+    })
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--rows", type=int, default=100000, help="Employees in the table")
+    parser.add_argument("--profile", default=None, help="sqliteprofiles profile for both connections")
+    args = parser.parse_args()
+
+    report = {}
+    with tempfile.TemporaryDirectory() as directory:
+        with DBOperations(os.path.join(directory, "employees.db"), pooled=True, profile=args.profile) as db_ops:
+            db_ops.create_table()
+            db_ops.insert_many(generate_employees(args.rows), AutoConfirmationProvider())
+            report["no backup"] = run(db_ops, directory, args.profile, None, None)
+            for pages, sleep in settings:
+                report[f"pages={pages} sleep={sleep}"] = run(db_ops, directory, args.profile, pages, sleep)
+    print(json.dumps(report, indent=2))
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,121 @@
+"""
+Microbenchmark comparing how quickly rows of the EmployeeUoB table are turned into Employee
+objects, and how much memory each one uses, before and after Employee was given __slots__
+and a sqlite3 row factory.
+
+Run from the repository root:
+    python -m benchmarks.employee_decoding [row_count]
+"""
+import sqlite3
+import sys
+import time
+import tracemalloc
+
+from employee import Employee, employee_row_factory
+
+
+class LegacyEmployee:
+    """
+    Copy of the original Employee: a __dict__ per instance, built with six setter calls per row.
+    """
+
+    def __init__(self):
+        self.id = 0
+        self.title = ''
+        self.forename = ''
+        self.surname = ''
+        self.email = ''
+        self.salary = 0.0
+
+    @staticmethod
+    def from_db_result(result_tuple):
+        try:
+            e = LegacyEmployee()
+            e.set_employee_id(result_tuple[0])
+            e.set_employee_title(result_tuple[1])
+            e.set_forename(result_tuple[2])
+            e.set_surname(result_tuple[3])
+            e.set_email(result_tuple[4])
+            e.set_salary(result_tuple[5])
+            return e
+        except TypeError:
+            return None
+
+    def set_employee_id(self, id):
+        self.id = id
+
+    def set_employee_title(self, title):
+        self.title = title
+
+    def set_forename(self, forename):
+        self.forename = forename
+
+    def set_surname(self, surname):
+        self.surname = surname
+
+    def set_email(self, email):
+        self.email = email
+
+    def set_salary(self, salary):
+        self.salary = salary
+
+
+def make_database(row_count):
+    conn = sqlite3.connect(":memory:")
+    conn.execute("CREATE TABLE EmployeeUoB (Id INTEGER PRIMARY KEY AUTOINCREMENT, Title, Forename, Surname, EmailAddress, Salary)")
+    conn.executemany("INSERT INTO EmployeeUoB (Title, Forename, Surname, EmailAddress, Salary) VALUES (?,?,?,?,?)",
+                     (("Dr", f"Forename{i}", f"Surname{i}", f"employee{i}@example.com", 20000.0 + i)
+                      for i in range(row_count)))
+    conn.commit()
+    return conn
+
+
+def decode_before(conn):
+    cur = conn.execute("SELECT * from EmployeeUoB")
+    return [LegacyEmployee.from_db_result(r) for r in cur.fetchall()]
+
+
+def decode_after(conn):
+    cur = conn.cursor()
+    cur.row_factory = employee_row_factory
+    cur.execute("SELECT * from EmployeeUoB")
+    return cur.fetchall()
+
+
+def rows_per_second(decode, conn, row_count, repeats=5):
+    best = min(timed(decode, conn) for _ in range(repeats))
+    return row_count / best
+
+
+def timed(decode, conn):
+    start = time.perf_counter()
+    decode(conn)
+    return time.perf_counter() - start
+
+
+def bytes_per_row(decode, conn, row_count):
+    """Memory allocated for the decoded objects themselves, excluding the column values, which
+    are shared by both versions.
+    """
+    rows = conn.execute("SELECT * from EmployeeUoB").fetchall()
+    decoder = LegacyEmployee.from_db_result if decode is decode_before else (lambda r: Employee(*r))
+    tracemalloc.start()
+    objects = [decoder(r) for r in rows]
+    size, _ = tracemalloc.get_traced_memory()
+    tracemalloc.stop()
+    del objects
+    return size / row_count
+
+
+def main():
+    row_count = int(sys.argv[1]) if len(sys.argv) > 1 else 200000
+    conn = make_database(row_count)
+
+    print(f"{row_count} rows")
+    for name, decode in (("before", decode_before), ("after", decode_after)):
+        print(f"{name:>6}: {rows_per_second(decode, conn, row_count):>12,.0f} rows/s "
+              f"{bytes_per_row(decode, conn, row_count):>8,.1f} bytes/row")
+
+
+if __name__ == "__main__":
+    main()
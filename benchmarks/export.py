@@ -0,0 +1,67 @@
+"""
+Benchmark of extracting the whole EmployeeUoB table to a file: select_all followed by writing each
+Employee out (the only way before export_file) against DBOperations.export_file streaming rows to
+CSV, JSONL and, if pyarrow is installed, Arrow and Parquet. Peak memory is measured with tracemalloc,
+in a separate run.
+
+Run from the repository root:
+    python -m benchmarks.export [--rows 500000]
+"""
+import argparse
+import csv
+import importlib.util
+import json
+import os
+import tempfile
+import time
+import tracemalloc
+
+from benchmarks.synthetic import generate_employees
+from databaseoperations import DBOperations
+from userconfirmation import AutoConfirmationProvider
+
+
+def select_all_to_csv(db_ops, path):
+    with open(path, "w", newline="") as f:
+        writer = csv.writer(f)
+        writer.writerow(["Id", "Title", "Forename", "Surname", "EmailAddress", "Salary"])
+        for e in db_ops.select_all():
+            writer.writerow([e.id, e.title, e.forename, e.surname, e.email, e.salary])
+
+
+def measure(export):
+    """Times export, then runs it again under tracemalloc (which slows it down) to find its peak memory."""
+    start = time.perf_counter()
+    export()
+    seconds = time.perf_counter() - start
+
+    tracemalloc.start()
+    export()
+    peak = tracemalloc.get_traced_memory()[1]
+    tracemalloc.stop()
+    return {"seconds": round(seconds, 3), "peak MiB": round(peak / 2 ** 20, 1)}
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--rows", type=int, default=500000, help="Employees in the table")
+    args = parser.parse_args()
+
+    extensions = [".csv", ".jsonl"]
+    if importlib.util.find_spec("pyarrow") is not None:
+        extensions += [".arrow", ".parquet"]
+
+    with tempfile.TemporaryDirectory() as directory:
+        with DBOperations(os.path.join(directory, "employees.db"), pooled=True) as db_ops:
+            db_ops.create_table()
+            db_ops.insert_many(generate_employees(args.rows), AutoConfirmationProvider())
+
+            report = {"select_all (.csv)": measure(lambda: select_all_to_csv(db_ops, os.path.join(directory, "all.csv")))}
+            for extension in extensions:
+                path = os.path.join(directory, "export" + extension)
+                report[f"export_file ({extension})"] = measure(lambda: db_ops.export_file(path))
+    print(json.dumps(report, indent=2))
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,128 @@
+"""
+Benchmark of fuzzy name search (search_data_name with mode="fuzzy", through the name key index)
+against the LIKE and full-text modes, for surnames and full names with one typing mistake (a
+character changed, dropped, added or two swapped). Reports how long each search takes and how
+often the intended name is among the results, and what the index costs: its build time and size,
+insert_many's rate with and without it, and the time update_name_key_index then takes to add the
+inserted rows (which the first fuzzy search after a write would otherwise spend).
+
+The synthetic surnames are built from syllables, as benchmarks.synthetic only has twenty: about ten
+thousand of them, some much more common than others.
+
+Run from the repository root:
+    python -m benchmarks.fuzzy_search [--rows 1000000] [--queries 200]
+"""
+import argparse
+import itertools
+import json
+import os
+import random
+import string
+import tempfile
+import time
+
+from benchmarks.synthetic import FORENAMES, TITLES
+from databaseoperations import DBOperations
+from employee import Employee
+from namekeys import name_words
+from userconfirmation import AutoConfirmationProvider
+
+PREFIXES = ["Ash", "Black", "Brad", "Brook", "Cart", "Chad", "Dal", "Dun", "Ed", "Fair", "Fox", "Gold", "Good",
+            "Green", "Hart", "Haw", "Hol", "Kings", "Lang", "Lock", "Mar", "Mid", "Mor", "New", "North", "Oak",
+            "Pen", "Rad", "Red", "Ros", "Sand", "Shel", "Stan", "Stock", "Sum", "Thorn", "Wal", "West", "Whit", "Wood"]
+MIDDLES = ["", "a", "er", "ing", "el", "en", "ow", "is", "et", "in"]
+SUFFIXES = ["bury", "by", "combe", "dale", "den", "field", "ford", "gate", "ham", "hurst", "ing", "land", "ley",
+            "man", "mere", "more", "ridge", "shaw", "son", "stead", "ton", "well", "wick", "win", "worth"]
+
+
+def generate_names(count: int, seed: int = 5):
+    rng = random.Random(seed)
+    surnames = [p + m + s for p in PREFIXES for m in MIDDLES for s in SUFFIXES]
+    rng.shuffle(surnames)
+    # Zipf-like frequencies, flattened so that the most common surname is about 1.3% of Employees
+    weights = list(itertools.accumulate(1 / (rank + 10) for rank in range(1, len(surnames) + 1)))
+    for n in range(count):
+        forename = rng.choice(FORENAMES)
+        surname = rng.choices(surnames, cum_weights=weights)[0]
+        yield Employee(0, rng.choice(TITLES), forename, surname,
+                       f"{forename.lower()}.{surname.lower()}.{n}@example.com", float(rng.randrange(18000, 150000)))
+
+
+def misspell(rng, word):
+    i = rng.randrange(1, len(word) - 1)
+    edit = rng.choice(["change", "drop", "add", "swap"])
+    if edit == "change":
+        return word[:i] + rng.choice(string.ascii_lowercase) + word[i + 1:]
+    if edit == "drop":
+        return word[:i] + word[i + 1:]
+    if edit == "add":
+        return word[:i] + rng.choice(string.ascii_lowercase) + word[i:]
+    return word[:i] + word[i + 1] + word[i] + word[i + 2:]
+
+
+def searches(db_ops, mode, queries, limit):
+    start = time.perf_counter()
+    found = 0
+    for term, forename, surname in queries:
+        results = db_ops.search_data_name(term, mode, limit) or []
+        found += any(name_words(e.surname) == [surname] and (forename is None or e.forename.lower() == forename)
+                     for e in results)
+    return {"ms per search": round((time.perf_counter() - start) / len(queries) * 1000, 2),
+            "intended name found": f"{found}/{len(queries)}"}
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--rows", type=int, default=1000000, help="Employees in the table")
+    parser.add_argument("--queries", type=int, default=200, help="searches of each kind per mode")
+    parser.add_argument("--limit", type=int, default=20, help="results per search")
+    args = parser.parse_args()
+
+    approve = AutoConfirmationProvider()
+    rng = random.Random(6)
+    employees = list(generate_names(args.rows))
+    sample = [rng.choice(employees) for _ in range(args.queries)]
+    surnames = [(misspell(rng, e.surname.lower()), None, e.surname.lower()) for e in sample]
+    full_names = [(f"{e.forename} {misspell(rng, e.surname.lower())}", e.forename.lower(), e.surname.lower())
+                  for e in sample]
+
+    report = {}
+    with tempfile.TemporaryDirectory() as directory:
+        with DBOperations(os.path.join(directory, "plain.db"), pooled=True) as db_ops:
+            db_ops.create_table()
+            start = time.perf_counter()
+            db_ops.insert_many(employees[:100000], approve, batch_size=5000)
+            report["insert_many rows/s without the index"] = round(min(args.rows, 100000) / (time.perf_counter() - start))
+
+        path = os.path.join(directory, "employees.db")
+        with DBOperations(path, pooled=True) as db_ops:
+            db_ops.create_table()
+            db_ops.create_search_index()
+            db_ops.insert_many(employees, approve, batch_size=5000)
+
+            size = os.path.getsize(path)
+            start = time.perf_counter()
+            db_ops.create_name_key_index()
+            report["create_name_key_index seconds"] = round(time.perf_counter() - start, 2)
+            report["database MB without / with the name key index"] = [round(size / 2 ** 20, 1),
+                                                                       round(os.path.getsize(path) / 2 ** 20, 1)]
+
+        with DBOperations(os.path.join(directory, "indexed.db"), pooled=True) as db_ops:
+            db_ops.create_table()
+            db_ops.create_name_key_index()
+            start = time.perf_counter()
+            db_ops.insert_many(employees[:100000], approve, batch_size=5000)
+            report["insert_many rows/s with the index"] = round(min(args.rows, 100000) / (time.perf_counter() - start))
+            start = time.perf_counter()
+            db_ops.update_name_key_index()
+            report["update_name_key_index seconds for those rows"] = round(time.perf_counter() - start, 2)
+
+        with DBOperations(path, pooled=True) as db_ops:
+            for mode in ("fuzzy", "fts", "like"):
+                report[mode] = {"surname": searches(db_ops, mode, surnames, args.limit),
+                                "forename and surname": searches(db_ops, mode, full_names, args.limit)}
+    print(json.dumps(report, indent=2))
+
+
+if __name__ == "__main__":
+    main()
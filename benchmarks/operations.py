@@ -0,0 +1,181 @@
+"""
+Benchmark harness timing every public DBOperations operation as the EmployeeUoB table grows.
+
+For each table size, a fresh database is loaded with deterministic synthetic Employees (see
+benchmarks.synthetic) and each operation is called repeatedly with an AutoConfirmationProvider
+which approves every change. Each size runs in its own process, so that peak RSS is measured
+per size. The report is JSON, so that runs on different commits can be compared.
+
+Run from the repository root:
+    python -m benchmarks.operations [--sizes 1000,100000,1000000,10000000] [--operations 200]
+        [--repeats 3] [--profile throughput] [--output report.json]
+"""
+import argparse
+import contextlib
+import json
+import multiprocessing
+import os
+import platform
+import random
+import resource
+import sqlite3
+import subprocess
+import sys
+import tempfile
+import time
+from concurrent.futures import ProcessPoolExecutor
+
+from benchmarks.synthetic import SURNAMES, generate_employees
+from databaseoperations import DBOperations
+from userconfirmation import AutoConfirmationProvider
+
+
+def peak_rss_kb():
+    """
+    Returns:
+        int: Peak resident set size of this process so far, in KiB (Linux reports ru_maxrss in KiB)
+    """
+    return resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+
+
+def percentile(sorted_values, fraction):
+    index = min(len(sorted_values) - 1, int(round(fraction * (len(sorted_values) - 1))))
+    return sorted_values[index]
+
+
+def summarise(latencies, rows=None):
+    """Summarises the latencies (in seconds) of repeated calls of one operation.
+
+    Args:
+        latencies (list[float]): The time taken by each call
+        rows (int, optional): Rows processed per call, for operations which work on the whole table
+
+    Returns:
+        dict: Call count, throughput, p50/p99 latency in milliseconds, and peak RSS so far
+    """
+    latencies = sorted(latencies)
+    total = sum(latencies)
+    result = {
+        "calls": len(latencies),
+        "ops_per_s": round(len(latencies) / total, 3) if total else None,
+        "p50_ms": round(percentile(latencies, 0.50) * 1000, 4),
+        "p99_ms": round(percentile(latencies, 0.99) * 1000, 4),
+        "peak_rss_kb": peak_rss_kb(),
+    }
+    if rows is not None:
+        result["rows_per_s"] = round(rows * len(latencies) / total, 1) if total else None
+    return result
+
+
+def time_calls(function, arguments):
+    latencies = []
+    for args in arguments:
+        start = time.perf_counter()
+        function(*args)
+        latencies.append(time.perf_counter() - start)
+    return latencies
+
+
+def run_size(size, operations, repeats, profile, directory, seed):
+    """Loads a fresh database with size Employees and times every operation against it.
+
+    DBOperations' own messages are sent to stderr so that they don't mix with the report.
+
+    Returns:
+        dict: The summary of each operation, by name
+    """
+    with contextlib.redirect_stdout(sys.stderr):
+        return _run_size(size, operations, repeats, profile, directory, seed)
+
+
+def _run_size(size, operations, repeats, profile, directory, seed):
+    path = os.path.join(directory, f"benchmark_{size}.db")
+    rng = random.Random(seed)
+    approve = AutoConfirmationProvider()
+    results = {}
+
+    with DBOperations(path, pooled=True, profile=profile) as db_ops:
+        db_ops.create_table()
+        db_ops.create_search_index()
+
+        start = time.perf_counter()
+        db_ops.insert_many(generate_employees(size, seed), approve, batch_size=10000)
+        results["load (insert_many)"] = summarise([time.perf_counter() - start], rows=size)
+
+        new_employees = list(generate_employees(operations, seed + 1))
+        results["insert_data"] = summarise(time_calls(
+            db_ops.insert_data, [(e, approve) for e in new_employees]))
+
+        row_count = size + operations
+        results["select_all"] = summarise(time_calls(db_ops.select_all, [()] * repeats), rows=row_count)
+
+        terms = [rng.choice(SURNAMES)[:4] + str(rng.randrange(max(1, size // len(SURNAMES)))) for _ in range(operations)]
+        results["search_data_name"] = summarise(time_calls(db_ops.search_data_name, [(t,) for t in terms]))
+
+        ids = rng.sample(range(1, size + 1), min(size, operations))
+        results["search_data_id"] = summarise(time_calls(db_ops.search_data_id, [(id,) for id in ids]))
+
+        employees = [db_ops.search_data_id(id) for id in ids]
+        for e in employees:
+            e.title = "Dr"
+        results["update_data"] = summarise(time_calls(db_ops.update_data, [(e, approve) for e in employees]))
+
+        results["adjust_pay"] = summarise(time_calls(db_ops.adjust_pay, [(id, 1.5, approve) for id in ids]))
+
+        results["delete_data"] = summarise(time_calls(db_ops.delete_data, [(id, approve) for id in ids]))
+
+        results["adjust_pay_all_employees"] = summarise(time_calls(
+            db_ops.adjust_pay_all_employees, [(1.5, approve)] * repeats), rows=row_count - len(ids))
+
+    os.remove(path)
+    return results
+
+
+def git_commit():
+    try:
+        return subprocess.run(["git", "rev-parse", "HEAD"], capture_output=True, text=True, check=True).stdout.strip()
+    except (OSError, subprocess.CalledProcessError):
+        return None
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--sizes", default="1000,100000,1000000,10000000",
+                        help="comma separated table sizes (default: %(default)s)")
+    parser.add_argument("--operations", type=int, default=200,
+                        help="calls of each single-row operation per size (default: %(default)s)")
+    parser.add_argument("--repeats", type=int, default=3,
+                        help="calls of each whole-table operation per size (default: %(default)s)")
+    parser.add_argument("--profile", default=None, help="sqliteprofiles profile to use")
+    parser.add_argument("--seed", type=int, default=0, help="seed for the synthetic data")
+    parser.add_argument("--dir", default=None, help="directory for the database files (default: a temporary directory)")
+    parser.add_argument("--output", default=None, help="write the JSON report to this file instead of stdout")
+    args = parser.parse_args()
+
+    report = {
+        "commit": git_commit(),
+        "python": platform.python_version(),
+        "sqlite": sqlite3.sqlite_version,
+        "platform": platform.platform(),
+        "profile": args.profile,
+        "operations": args.operations,
+        "repeats": args.repeats,
+        "sizes": {},
+    }
+
+    with tempfile.TemporaryDirectory(dir=args.dir) as directory:
+        for size in (int(s) for s in args.sizes.split(",")):
+            with ProcessPoolExecutor(max_workers=1, mp_context=multiprocessing.get_context("spawn")) as executor:
+                report["sizes"][str(size)] = executor.submit(
+                    run_size, size, args.operations, args.repeats, args.profile, directory, args.seed).result()
+
+    output = json.dumps(report, indent=2)
+    if args.output:
+        with open(args.output, "w") as f:
+            f.write(output + "\n")
+    else:
+        print(output)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,80 @@
+"""
+Benchmark of the SQLite settings profiles in sqliteprofiles, run against the existing
+DBOperations insert, select and update operations.
+
+Run from the repository root:
+    python -m benchmarks.profiles [--rows 20000] [--operations 500]
+"""
+import argparse
+import json
+import os
+import tempfile
+import time
+
+from benchmarks.synthetic import generate_employees
+from databaseoperations import DBOperations
+from sqliteprofiles import PROFILES
+from userconfirmation import AutoConfirmationProvider
+
+
+def run_profile(profile, directory, rows, operations):
+    path = os.path.join(directory, f"{profile or 'default'}.db")
+    approve = AutoConfirmationProvider()
+    results = {}
+
+    with DBOperations(path, pooled=True, profile=profile) as db_ops:
+        db_ops.create_table()
+
+        start = time.perf_counter()
+        db_ops.insert_many(generate_employees(rows), approve)
+        results["insert_many rows/s"] = rows / (time.perf_counter() - start)
+
+        employees = list(generate_employees(operations, seed=1))
+        start = time.perf_counter()
+        for e in employees:
+            db_ops.insert_data(e, approve)
+        results["insert_data ops/s"] = operations / (time.perf_counter() - start)
+
+        start = time.perf_counter()
+        for id in range(1, operations + 1):
+            db_ops.search_data_id(id)
+        results["search_data_id ops/s"] = operations / (time.perf_counter() - start)
+
+        start = time.perf_counter()
+        db_ops.select_all()
+        results["select_all rows/s"] = (rows + operations) / (time.perf_counter() - start)
+
+        start = time.perf_counter()
+        for e in employees:
+            e.title = "Dr"
+            db_ops.update_data(e, approve)
+        results["update_data ops/s"] = operations / (time.perf_counter() - start)
+
+        start = time.perf_counter()
+        for id in range(1, operations + 1):
+            db_ops.adjust_pay(id, 1.0, approve)
+        results["adjust_pay ops/s"] = operations / (time.perf_counter() - start)
+
+        start = time.perf_counter()
+        db_ops.adjust_pay_all_employees(1.0, approve)
+        results["adjust_pay_all_employees s"] = time.perf_counter() - start
+
+    return {name: round(value, 3) for name, value in results.items()}
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--rows", type=int, default=20000, help="rows loaded with insert_many")
+    parser.add_argument("--operations", type=int, default=500, help="single-row operations of each kind")
+    parser.add_argument("--dir", default=None, help="directory for the database files (default: a temporary directory)")
+    args = parser.parse_args()
+
+    with tempfile.TemporaryDirectory(dir=args.dir) as directory:
+        report = {profile or "default": run_profile(profile, directory, args.rows, args.operations)
+                  for profile in [None] + list(PROFILES)}
+
+    print(json.dumps(report, indent=2))
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,76 @@
+"""
+Benchmark of reads answered from the file (one-shot and pooled connections) against reads answered
+from an in-memory read replica, and of the replica's refreshes after changes made through another
+connection: a few single-row changes (incremental) and a change to every row (full).
+
+Run from the repository root:
+    python -m benchmarks.read_replica [--rows 100000] [--reads 2000]
+"""
+import argparse
+import json
+import os
+import random
+import tempfile
+import time
+
+from benchmarks.synthetic import generate_employees
+from databaseoperations import DBOperations
+from userconfirmation import AutoConfirmationProvider
+
+
+def reads(db_ops, count, ids):
+    rng = random.Random(4)
+    start = time.perf_counter()
+    for _ in range(count):
+        db_ops.search_data_id(rng.choice(ids))
+    by_id = (time.perf_counter() - start) / count
+
+    start = time.perf_counter()
+    for _ in range(max(count // 100, 1)):
+        db_ops.search_data_name("walk", "like", 50)
+    like = (time.perf_counter() - start) / max(count // 100, 1)
+
+    start = time.perf_counter()
+    db_ops.select_all()
+    select_all = time.perf_counter() - start
+    return {"search_data_id ms": round(by_id * 1000, 4), "search_data_name (like) ms": round(like * 1000, 2),
+            "select_all ms": round(select_all * 1000, 1)}
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--rows", type=int, default=100000, help="Employees in the table")
+    parser.add_argument("--reads", type=int, default=2000, help="search_data_id calls per mode")
+    args = parser.parse_args()
+
+    approve = AutoConfirmationProvider()
+    with tempfile.TemporaryDirectory() as directory:
+        path = os.path.join(directory, "employees.db")
+        with DBOperations(path, pooled=True) as writer:
+            writer.create_table()
+            writer.insert_many(generate_employees(args.rows), approve, batch_size=5000)
+            ids = [e.id for e in writer.select_all()]
+
+            report = {"one-shot": reads(DBOperations(path), args.reads, ids)}
+            with DBOperations(path, pooled=True) as db_ops:
+                report["pooled"] = reads(db_ops, args.reads, ids)
+
+            start = time.perf_counter()
+            with DBOperations(path, pooled=True, read_replica=True) as db_ops:
+                load = time.perf_counter() - start
+                report["read replica"] = reads(db_ops, args.reads, ids)
+
+                for n in range(10):
+                    writer.adjust_pay(ids[n], 1, approve)
+                db_ops.search_data_id(ids[0])
+                report["refresh after 10 changes"] = db_ops.replica_status()["last refresh"]
+
+                writer.adjust_pay_all_employees(1, approve)
+                db_ops.search_data_id(ids[0])
+                report["refresh after changing every row"] = db_ops.replica_status()["last refresh"]
+                report["initial load seconds"] = round(load, 3)
+    print(json.dumps(report, indent=2))
+
+
+if __name__ == "__main__":
+    main()
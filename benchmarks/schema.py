@@ -0,0 +1,73 @@
+"""
+Benchmark of the schema migration: builds a database with the original untyped EmployeeUoB table
+(no indexes), times name and email lookups and shows their query plans, then migrates it with
+migrations.migrate and measures the same lookups again.
+
+Run from the repository root:
+    python -m benchmarks.schema [--rows 100000] [--lookups 500]
+"""
+import argparse
+import json
+import os
+import sqlite3
+import tempfile
+import time
+
+import migrations
+from benchmarks.synthetic import SURNAMES, generate_employees
+
+SQL_CREATE_UNTYPED_TABLE = ("CREATE TABLE EmployeeUoB (Id INTEGER PRIMARY KEY AUTOINCREMENT, "
+                            "Title, Forename, Surname, EmailAddress, Salary)")
+SQL_INSERT = "INSERT INTO EmployeeUoB (Title, Forename, Surname, EmailAddress, Salary) VALUES (?,?,?,?,?)"
+
+# The lookups made by DBOperations.search_data_name (LIKE and prefix modes) and search_data_email
+LOOKUPS = {
+    "name LIKE": ("SELECT * from EmployeeUoB WHERE Forename LIKE ? OR Surname LIKE ?",
+                  lambda n: (f"%{SURNAMES[n % len(SURNAMES)]}{n}%",) * 2),
+    "surname prefix": ("SELECT * from EmployeeUoB WHERE Surname LIKE ? ORDER BY Surname, Forename",
+                       lambda n: (f"{SURNAMES[n % len(SURNAMES)]}{n}%",)),
+    "email": ("SELECT * from EmployeeUoB WHERE EmailAddress = ? AND EmailAddress <> ''",
+              None),
+}
+
+
+def measure(conn, emails, lookups):
+    results = {}
+    for name, (sql, make_params) in LOOKUPS.items():
+        params = [(emails[n % len(emails)],) if make_params is None else make_params(n) for n in range(lookups)]
+        plan = [row[-1] for row in conn.execute("EXPLAIN QUERY PLAN " + sql, params[0])]
+        start = time.perf_counter()
+        for p in params:
+            conn.execute(sql, p).fetchall()
+        results[name] = {"lookups/s": round(lookups / (time.perf_counter() - start), 1), "plan": plan}
+    return results
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--rows", type=int, default=100000, help="Employees in the database")
+    parser.add_argument("--lookups", type=int, default=500, help="lookups of each kind")
+    args = parser.parse_args()
+
+    with tempfile.TemporaryDirectory() as directory:
+        conn = sqlite3.connect(os.path.join(directory, "schema.db"), isolation_level=None)
+        conn.execute(SQL_CREATE_UNTYPED_TABLE)
+        conn.execute("BEGIN")
+        conn.executemany(SQL_INSERT, ((e.title, e.forename, e.surname, e.email, str(e.salary))
+                                      for e in generate_employees(args.rows)))
+        conn.execute("COMMIT")
+        emails = [row[0] for row in conn.execute("SELECT EmailAddress FROM EmployeeUoB ORDER BY random() LIMIT ?",
+                                                 (args.lookups,))]
+
+        report = {"before": measure(conn, emails, args.lookups)}
+        start = time.perf_counter()
+        migrations.migrate(conn)
+        report["migration seconds"] = round(time.perf_counter() - start, 3)
+        report["after"] = measure(conn, emails, args.lookups)
+        conn.close()
+
+    print(json.dumps(report, indent=2))
+
+
+if __name__ == "__main__":
+    main()
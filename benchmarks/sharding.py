@@ -0,0 +1,76 @@
+"""
+Benchmark of ShardedDBOperations against a single DBOperations file: several threads each making
+single-row pay adjustments (one transaction each) at the same time, then select_all and an
+adjust_pay_all_employees over the whole table. On a single file the writers queue for its write
+lock; with shards, writers to different shards commit concurrently.
+
+Run from the repository root:
+    python -m benchmarks.sharding [--rows 200000] [--shards 4] [--threads 8] [--writes 200] [--profile durable]
+"""
+import argparse
+import json
+import os
+import random
+import tempfile
+import threading
+import time
+
+from benchmarks.synthetic import generate_employees
+from databaseoperations import DBOperations
+from shardeddatabaseoperations import ShardedDBOperations
+from userconfirmation import AutoConfirmationProvider
+
+
+def timed(call):
+    start = time.perf_counter()
+    call()
+    return round(time.perf_counter() - start, 3)
+
+
+def concurrent_writes(db_ops, ids, threads, writes):
+    approve = AutoConfirmationProvider()
+
+    def writer(seed):
+        rng = random.Random(seed)
+        for _ in range(writes):
+            db_ops.adjust_pay(rng.choice(ids), 0.1, approve)
+
+    workers = [threading.Thread(target=writer, args=(n,)) for n in range(threads)]
+    for w in workers:
+        w.start()
+    for w in workers:
+        w.join()
+
+
+def run(db_ops, args):
+    approve = AutoConfirmationProvider()
+    db_ops.create_table()
+    db_ops.insert_many(generate_employees(args.rows), approve, batch_size=5000)
+    ids = [e.id for e in db_ops.select_all()]
+    return {
+        f"{args.threads} threads x {args.writes} adjust_pay": timed(lambda: concurrent_writes(db_ops, ids, args.threads, args.writes)),
+        "select_all": timed(db_ops.select_all),
+        "adjust_pay_all_employees": timed(lambda: db_ops.adjust_pay_all_employees(1, approve)),
+    }
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--rows", type=int, default=200000, help="Employees in the table")
+    parser.add_argument("--shards", type=int, default=4)
+    parser.add_argument("--threads", type=int, default=8, help="concurrent writers")
+    parser.add_argument("--writes", type=int, default=200, help="adjust_pay calls per writer")
+    parser.add_argument("--profile", default="durable", help="sqliteprofiles profile")
+    args = parser.parse_args()
+
+    with tempfile.TemporaryDirectory() as directory:
+        path = os.path.join(directory, "employees.db")
+        with DBOperations(path, pooled=True, profile=args.profile) as db_ops:
+            single = run(db_ops, args)
+        with ShardedDBOperations(path, args.shards, profile=args.profile) as db_ops:
+            sharded = run(db_ops, args)
+    print(json.dumps({"single file (seconds)": single, f"{args.shards} shards (seconds)": sharded}, indent=2))
+
+
+if __name__ == "__main__":
+    main()
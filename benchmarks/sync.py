@@ -0,0 +1,84 @@
+"""
+Benchmark of reconciling a full employee extract with the table: DBOperations.sync_records against
+the per-record approach it replaces (search_data_email for each record, then insert_data or
+update_data, which rewrites every row in its own transaction). The extract differs from the table
+in a small fraction of its records.
+
+Run from the repository root:
+    python -m benchmarks.sync [--rows 50000] [--changed 0.01]
+"""
+import argparse
+import json
+import os
+import random
+import tempfile
+import time
+
+from benchmarks.synthetic import generate_employees
+from databaseoperations import DBOperations
+from userconfirmation import AutoConfirmationProvider
+
+
+def make_feed(rows, changed, seed=2):
+    """The table's Employees as feed records, with a fraction changed and as many again new."""
+    rng = random.Random(seed)
+    feed = []
+    for e in generate_employees(rows):
+        record = {"Title": e.title, "Forename": e.forename, "Surname": e.surname, "EmailAddress": e.email,
+                  "Salary": e.salary}
+        if rng.random() < changed:
+            record["Salary"] += 1000
+        feed.append(record)
+    for n, e in enumerate(generate_employees(int(rows * changed), seed=seed)):
+        feed.append({"Title": e.title, "Forename": e.forename, "Surname": e.surname,
+                     "EmailAddress": f"new.{n}@example.com", "Salary": e.salary})
+    return feed
+
+
+def per_record(db_ops, feed, approve):
+    from employee import Employee
+
+    for record in feed:
+        incoming = Employee.from_record(record)
+        current = db_ops.search_data_email(incoming.email)
+        if current is None:
+            db_ops.insert_data(incoming, approve)
+        else:
+            incoming.id = current.id
+            db_ops.update_data(incoming, approve)
+
+
+def run(directory, rows, feed, approach):
+    path = os.path.join(directory, f"{approach}.db")
+    approve = AutoConfirmationProvider()
+    with DBOperations(path, pooled=True) as db_ops:
+        db_ops.create_table()
+        db_ops.insert_many(generate_employees(rows), approve)
+        cursor = db_ops.latest_change_cursor()
+
+        start = time.perf_counter()
+        if approach == "sync_records":
+            db_ops.sync_records(feed, approve)
+        else:
+            per_record(db_ops, feed, approve)
+        seconds = time.perf_counter() - start
+
+        # Rows rewritten with the same values aren't in the change log
+        changed = len(db_ops.changes_since(cursor, limit=len(feed) + 1).changes)
+    return {"seconds": round(seconds, 3), "rows changed": changed}
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--rows", type=int, default=50000, help="Employees in the table")
+    parser.add_argument("--changed", type=float, default=0.01, help="fraction of records changed (and added)")
+    args = parser.parse_args()
+
+    feed = make_feed(args.rows, args.changed)
+    with tempfile.TemporaryDirectory() as directory:
+        report = {approach: run(directory, args.rows, feed, approach) for approach in ("per_record", "sync_records")}
+    print(json.dumps(report, indent=2))
+
+
+if __name__ == "__main__":
+    main()
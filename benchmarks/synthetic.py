@@ -0,0 +1,36 @@
+"""
+Deterministic synthetic Employees for the benchmarks. The same seed and count always give the
+same Employees, so results from different commits are measured against identical data.
+"""
+import random
+
+from employee import Employee
+
+TITLES = ["Mr", "Mrs", "Ms", "Mx", "Dr", "Prof"]
+FORENAMES = ["Alice", "Bob", "Carol", "David", "Eve", "Frank", "Grace", "Heidi", "Ivan", "Judy",
+             "Mallory", "Niaj", "Olivia", "Peggy", "Rupert", "Sybil", "Trent", "Victor", "Walter", "Yasmin"]
+SURNAMES = ["Smith", "Jones", "Taylor", "Brown", "Williams", "Wilson", "Johnson", "Davies", "Patel", "Robinson",
+            "Wright", "Thompson", "Evans", "Walker", "White", "Roberts", "Green", "Hall", "Wood", "Jackson"]
+
+
+def make_employee(rng, n: int):
+    forename = rng.choice(FORENAMES)
+    surname = rng.choice(SURNAMES) + str(n // len(SURNAMES))
+    return Employee(0, rng.choice(TITLES), forename, surname,
+                    f"{forename.lower()}.{surname.lower()}.{n}@example.com",
+                    float(rng.randrange(18000, 150000)))
+
+
+def generate_employees(count: int, seed: int = 0):
+    """Yields count synthetic Employees.
+
+    Args:
+        count (int): Number of Employees
+        seed (int, optional): Seed for the random generator. Defaults to 0.
+
+    Yields:
+        Employee: Each Employee, with id 0
+    """
+    rng = random.Random(seed)
+    for n in range(count):
+        yield make_employee(rng, n)
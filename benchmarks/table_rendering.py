@@ -0,0 +1,50 @@
+"""
+Benchmark of printing large tables of Employees: make_employee_table (PrettyTable, built in memory)
+against TableRenderer streaming the same Employees, and a confirmation preview of the whole list.
+Output is written to os.devnull; peak memory is measured with tracemalloc, in a separate run.
+
+Run from the repository root:
+    python -m benchmarks.table_rendering [--rows 100000]
+"""
+import argparse
+import json
+import os
+import time
+import tracemalloc
+
+from benchmarks.synthetic import generate_employees
+from employee import make_employee_table
+from tablerenderer import TableRenderer
+
+
+def measure(render):
+    """Times render, then runs it again under tracemalloc (which slows it down) to find its peak memory."""
+    with open(os.devnull, "w") as out:
+        start = time.perf_counter()
+        render(out)
+        seconds = time.perf_counter() - start
+
+        tracemalloc.start()
+        render(out)
+        peak = tracemalloc.get_traced_memory()[1]
+        tracemalloc.stop()
+    return {"seconds": round(seconds, 3), "peak MiB": round(peak / 2 ** 20, 1)}
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--rows", type=int, default=100000, help="Employees in the table")
+    args = parser.parse_args()
+
+    employees = list(generate_employees(args.rows))
+    report = {
+        "make_employee_table": measure(lambda out: print(make_employee_table(employees), file=out)),
+        "TableRenderer.render (list)": measure(lambda out: TableRenderer().render(employees, out)),
+        "TableRenderer.render (generator)": measure(lambda out: TableRenderer().render(generate_employees(args.rows), out)),
+        "TableRenderer.render_preview": measure(lambda out: TableRenderer().render_preview(employees, out=out)),
+    }
+    print(json.dumps(report, indent=2))
+
+
+if __name__ == "__main__":
+    main()
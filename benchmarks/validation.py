@@ -0,0 +1,73 @@
+"""
+Benchmark of checking a feed before it is loaded: DBOperations.validate_records (a ValidationPipeline
+with one set-based duplicate lookup per chunk), in this process and on a process pool, against
+checking each record and looking it up with its own query (normalise_record, then
+search_data_email). Half the feed is already in the table and a small fraction of it is malformed.
+
+Run from the repository root:
+    python -m benchmarks.validation [--rows 200000] [--workers 4]
+"""
+import argparse
+import json
+import os
+import random
+import tempfile
+import time
+
+from benchmarks.synthetic import generate_employees
+from databaseoperations import DBOperations
+from employeevalidation import ValidationPipeline, normalise_record
+from userconfirmation import AutoConfirmationProvider
+
+
+def make_feed(rows, seed=3):
+    rng = random.Random(seed)
+    feed = []
+    for e in generate_employees(rows):
+        record = {"Title": e.title, "Forename": e.forename, "Surname": e.surname, "EmailAddress": e.email,
+                  "Salary": f"{e.salary:,.2f}"}
+        if rng.random() < 0.01:
+            record["Salary"] = "unknown"
+        feed.append(record)
+    return feed
+
+
+def per_record(db_ops, feed):
+    clean = 0
+    for record in feed:
+        values, _ = normalise_record(record)
+        if values is not None and (not values[3] or db_ops.search_data_email(values[3]) is None):
+            clean += 1
+    return clean
+
+
+def timed(call):
+    start = time.perf_counter()
+    clean = call()
+    return {"seconds": round(time.perf_counter() - start, 3), "clean": clean}
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--rows", type=int, default=200000, help="records in the feed")
+    parser.add_argument("--workers", type=int, default=os.cpu_count(), help="processes for the pooled run")
+    args = parser.parse_args()
+
+    feed = make_feed(args.rows)
+    with tempfile.TemporaryDirectory() as directory:
+        with DBOperations(os.path.join(directory, "employees.db"), pooled=True) as db_ops:
+            db_ops.create_table()
+            db_ops.insert_many(generate_employees(args.rows // 2), AutoConfirmationProvider(), batch_size=5000)
+
+            report = {
+                "per record": timed(lambda: per_record(db_ops, feed)),
+                "validate_records (1 process)": timed(
+                    lambda: sum(1 for _ in db_ops.validate_records(feed, ValidationPipeline(workers=1)))),
+                f"validate_records ({args.workers} workers)": timed(
+                    lambda: sum(1 for _ in db_ops.validate_records(feed, ValidationPipeline(workers=args.workers)))),
+            }
+    print(json.dumps(report, indent=2))
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,70 @@
+from employee import Employee
+
+change_columns = ["seq", "employee_id", "operation", "changed_at", "title", "forename", "surname", "email", "salary"]
+
+
+class EmployeeChange:
+    """
+    One entry in the change log: an insert, update or delete of an Employee, with the Employee's
+    values after the change (or before it, for a delete).
+    """
+
+    __slots__ = tuple(change_columns)
+
+    def __init__(self, seq, employee_id, operation, changed_at, title, forename, surname, email, salary):
+        """
+        The arguments are in the same order as the columns of the change log, so an EmployeeChange can
+        be built straight from a row with EmployeeChange(*row).
+
+        Args:
+            seq (int): Position of the change in the log. Pass the seq of the last change processed to
+            DBOperations.changes_since to get the changes after it.
+            employee_id (int): Id of the Employee changed
+            operation (str): "insert", "update" or "delete"
+            changed_at (float): When the change was made, in seconds since the Unix epoch (UTC)
+        """
+        self.seq = seq
+        self.employee_id = employee_id
+        self.operation = operation
+        self.changed_at = changed_at
+        self.title = title
+        self.forename = forename
+        self.surname = surname
+        self.email = email
+        self.salary = salary
+
+    def employee(self):
+        """
+        Returns:
+            Employee: The Employee as it was after the change (before it, for a delete)
+        """
+        return Employee(self.employee_id, self.title, self.forename, self.surname, self.email, self.salary)
+
+    def to_dict(self):
+        return {column: getattr(self, column) for column in change_columns}
+
+
+def change_row_factory(cursor, row):
+    """A sqlite3 row factory which turns rows of the change log into EmployeeChange objects.
+    """
+    return EmployeeChange(*row)
+
+
+class ChangeBatch:
+    """
+    A batch of changes returned by DBOperations.changes_since.
+
+    Attributes:
+        changes (list[EmployeeChange]): The changes, oldest first
+        cursor (int): The cursor to pass to the next call of changes_since
+        more (bool): Whether there are more changes after this batch
+        truncated (bool): Whether changes after the cursor the batch was asked for have been removed
+        from the log by retention. If so, the reader has missed changes and should reload the whole
+        table (see DBOperations.latest_change_cursor) before following the log again.
+    """
+
+    def __init__(self, changes, cursor: int, more: bool, truncated: bool) -> None:
+        self.changes = changes
+        self.cursor = cursor
+        self.more = more
+        self.truncated = truncated
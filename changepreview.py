@@ -0,0 +1,28 @@
+class ChangePreview:
+    """
+    The ChangePreview class summarises a change which affects many rows, so that a
+    UserConfirmationProvider can ask for a single confirmation showing the number of rows
+    affected and a small sample of them, rather than every affected Employee.
+    """
+
+    def __init__(self, row_count, sample, aggregates=None) -> None:
+        """
+        Args:
+            row_count (int): Number of rows the change affects, or None if it is not known in advance
+            sample (list[Employee]): A few of the affected Employees
+            aggregates (dict, optional): Any other figures describing the change, by name
+        """
+        self.row_count = row_count
+        self.sample = sample
+        self.aggregates = aggregates if aggregates is not None else {}
+
+    def summary(self):
+        """Describes the change in a few lines of text.
+
+        Returns:
+            str: The summary, ready to be printed to the console
+        """
+        row_count = "unknown" if self.row_count is None else self.row_count
+        lines = [f"Rows affected: {row_count} (showing {len(self.sample)})"]
+        lines += [f"{name}: {value}" for name, value in self.aggregates.items()]
+        return "\n".join(lines)
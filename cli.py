@@ -0,0 +1,434 @@
+"""
+Non-interactive command line interface to the Employee database, for scripts and scheduled jobs.
+
+    python cli.py [--database PATH] [--format table|json|csv] [--yes] COMMAND ...
+
+Commands:
+    init [--name-keys]
+    insert --title T --forename F --surname S --email E --salary N
+    import PATH [--batch-size N] [--rejects PATH] [--workers N]
+    list [--after-id N] [--limit N]
+    export PATH [--columns C,C,...] [--title T ...] [--min-salary N] [--max-salary N] [--batch-size N]
+    search (--id N | --email E | --name TERM [--mode auto|fts|like|prefix|fuzzy] [--limit N])
+    update ID [--title T] [--forename F] [--surname S] [--email E] [--salary N]
+    delete ID
+    adjust-pay (--id N | --all) --percent P
+    sync PATH [--key email|external_id] [--delete-missing]
+    changes [--since CURSOR] [--limit N]
+    compact-changes [--max-age-days D] [--max-changes N]
+    backup PATH [--pages N] [--sleep S] [--progress]
+    restore PATH
+    snapshot DIRECTORY [--interval S] [--keep N] [--pages N] [--sleep S]
+    batch FILE
+
+Changes are only made with --yes, or after answering y at the prompt when run from a terminal; with
+neither they are refused. "batch" runs one command per line of FILE (blank lines and lines starting
+with # are skipped) over a single database connection, using the global options given before it
+unless a line overrides --format or --yes; a line naming a different --database is refused.
+"snapshot" takes a backup every --interval seconds until interrupted, keeping the newest --keep; it
+can't be used in a batch file. "init --name-keys" also creates (or
+rebuilds) the index needed by "search --mode fuzzy".
+
+Output goes to stdout: Employees as a table, a JSON array or CSV, and the outcome of changes as a table,
+a JSON object or CSV. JSON output is one document per line, so batch output is JSON Lines. Messages
+from DBOperations go to stderr. The exit status is 0 if every command succeeded and 1 otherwise.
+"""
+import argparse
+import itertools
+import shlex
+import sys
+from contextlib import redirect_stdout
+
+from databaseoperations import DBOperations
+from employee import Employee
+from userconfirmation import AutoConfirmationProvider, UserConfirmationProvider
+
+employee_fields = ["id"] + Employee.user_editable_attributes
+
+
+def build_parser():
+    parser = argparse.ArgumentParser(prog="cli.py", description=__doc__,
+                                     formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--database", default="EmployeeDatabase.db", help="SQLite database file (default: %(default)s)")
+    parser.add_argument("--format", choices=["table", "json", "csv"], default="table", help="output format (default: %(default)s)")
+    parser.add_argument("--yes", action="store_true", help="make changes without asking for confirmation")
+    commands = parser.add_subparsers(dest="command", required=True)
+
+    init = commands.add_parser("init", help="create the EmployeeUoB table and search index if they don't exist")
+    init.add_argument("--name-keys", action="store_true", help="also create or rebuild the fuzzy name search index")
+
+    insert = commands.add_parser("insert", help="insert an Employee")
+    for attribute in Employee.user_editable_attributes:
+        insert.add_argument(f"--{attribute}", type=float if attribute == "salary" else str,
+                            default=0.0 if attribute == "salary" else "")
+
+    import_file = commands.add_parser("import", help="insert the Employees in a CSV or JSONL file")
+    import_file.add_argument("path")
+    import_file.add_argument("--batch-size", type=int, default=1000)
+    import_file.add_argument("--rejects", help="check records first, writing rejects to this CSV report")
+    import_file.add_argument("--workers", type=int, default=None, help="processes checking records (default: one per CPU)")
+
+    list_all = commands.add_parser("list", help="list Employees in Id order")
+    list_all.add_argument("--after-id", type=int, default=0, help="start after this Id")
+    list_all.add_argument("--limit", type=int, default=None, help="maximum number of Employees")
+
+    export = commands.add_parser("export", help="write Employees to a CSV, JSONL, Arrow or Parquet file")
+    export.add_argument("path", help="file to write; the format is chosen by its extension")
+    export.add_argument("--columns", help="comma separated columns (default: all but ExternalId)")
+    export.add_argument("--title", action="append", help="only Employees with this title (may be repeated)")
+    export.add_argument("--min-salary", type=float, help="only Employees paid at least this much")
+    export.add_argument("--max-salary", type=float, help="only Employees paid less than this")
+    export.add_argument("--batch-size", type=int, default=10000)
+
+    search = commands.add_parser("search", help="find Employees by Id, email address or name")
+    by = search.add_mutually_exclusive_group(required=True)
+    by.add_argument("--id", type=int)
+    by.add_argument("--email")
+    by.add_argument("--name")
+    search.add_argument("--mode", choices=["auto", "fts", "like", "prefix", "fuzzy"], default="auto")
+    search.add_argument("--limit", type=int, default=None)
+
+    update = commands.add_parser("update", help="change the given attributes of an Employee")
+    update.add_argument("id", type=int)
+    for attribute in Employee.user_editable_attributes:
+        update.add_argument(f"--{attribute}", type=float if attribute == "salary" else str)
+
+    delete = commands.add_parser("delete", help="delete an Employee")
+    delete.add_argument("id", type=int)
+
+    adjust_pay = commands.add_parser("adjust-pay", help="adjust the pay of one or all Employees by a percentage")
+    who = adjust_pay.add_mutually_exclusive_group(required=True)
+    who.add_argument("--id", type=int)
+    who.add_argument("--all", action="store_true")
+    adjust_pay.add_argument("--percent", type=float, required=True)
+
+    sync = commands.add_parser("sync", help="bring the table into line with a full CSV or JSONL extract")
+    sync.add_argument("path")
+    sync.add_argument("--key", choices=["email", "external_id"], default="email", help="field records are matched on")
+    sync.add_argument("--delete-missing", action="store_true", help="delete Employees who are not in the extract")
+
+    changes = commands.add_parser("changes", help="list changes from the change log after a cursor")
+    changes.add_argument("--since", type=int, default=0, help="cursor returned by the previous call (default: the start)")
+    changes.add_argument("--limit", type=int, default=1000)
+
+    compact = commands.add_parser("compact-changes", help="remove superseded and expired changes from the change log")
+    compact.add_argument("--max-age-days", type=float, default=None)
+    compact.add_argument("--max-changes", type=int, default=None)
+
+    backup = commands.add_parser("backup", help="copy the database to a file while it is in use")
+    backup.add_argument("path")
+    backup.add_argument("--pages", type=int, default=256, help="pages copied per step (default: %(default)s)")
+    backup.add_argument("--sleep", type=float, default=0.05, help="seconds between steps (default: %(default)s)")
+    backup.add_argument("--progress", action="store_true", help="report progress on stderr")
+
+    restore = commands.add_parser("restore", help="replace the contents of the database with a backup")
+    restore.add_argument("path")
+
+    snapshot = commands.add_parser("snapshot", help="take a backup every --interval seconds until interrupted")
+    snapshot.add_argument("directory")
+    snapshot.add_argument("--interval", type=float, default=3600, help="seconds between snapshots (default: %(default)s)")
+    snapshot.add_argument("--keep", type=int, default=24, help="snapshots kept (default: %(default)s)")
+    snapshot.add_argument("--pages", type=int, default=256)
+    snapshot.add_argument("--sleep", type=float, default=0.05)
+
+    batch = commands.add_parser("batch", help="run the commands in a file over one connection")
+    batch.add_argument("path")
+
+    return parser
+
+
+def confirmation_provider(args, prompt: str):
+    """
+    Returns:
+        UserConfirmationProvider: Approves everything with --yes, asks at the terminal if there is one,
+        and otherwise refuses.
+    """
+    if args.yes:
+        return AutoConfirmationProvider(prompt)
+    if sys.stdin.isatty():
+        return UserConfirmationProvider(prompt)
+    print("Not confirmed: use --yes to make changes non-interactively", file=sys.stderr)
+    return AutoConfirmationProvider(prompt, approve=False)
+
+
+def write_employees(employees, format: str, out):
+    """Writes Employees to out as they are produced, so long listings are not held in memory.
+
+    Args:
+        employees (Iterable[list[Employee]]): The Employees, in pages
+        format (str): "table", "json" or "csv"
+        out (TextIO): Where to write them
+
+    Returns:
+        int: The number of Employees written
+    """
+    count = 0
+    if format == "table":
+        from tablerenderer import TableRenderer
+
+        count = TableRenderer().render(itertools.chain.from_iterable(employees), out)
+        if not count:
+            print("No results found", file=out)
+
+    elif format == "json":
+        import json
+
+        out.write("[")
+        for page in employees:
+            for e in page:
+                out.write((", " if count else "") + json.dumps({f: getattr(e, f) for f in employee_fields}))
+                count += 1
+        out.write("]\n")
+
+    else:
+        import csv
+
+        writer = csv.writer(out)
+        writer.writerow(employee_fields)
+        for page in employees:
+            writer.writerows([getattr(e, f) for f in employee_fields] for e in page)
+            count += len(page)
+    return count
+
+
+def write_outcome(outcome: dict, format: str, out):
+    """Writes the outcome of a change, eg: {"command": "delete", "ok": True}.
+    """
+    if format == "table":
+        print(", ".join(f"{name}: {value}" for name, value in outcome.items()), file=out)
+    elif format == "json":
+        import json
+
+        print(json.dumps(outcome), file=out)
+    else:
+        import csv
+
+        writer = csv.writer(out)
+        writer.writerow(outcome.keys())
+        writer.writerow(outcome.values())
+
+
+def write_changes(batch, format: str, out):
+    """Writes a ChangeBatch. The cursor to continue from is part of the JSON document, and is written
+    after the table or (to stderr) after the CSV rows.
+    """
+    from changelog import change_columns
+
+    status = {"cursor": batch.cursor, "more": batch.more, "truncated": batch.truncated}
+    if format == "json":
+        import json
+
+        print(json.dumps(dict(status, changes=[c.to_dict() for c in batch.changes])), file=out)
+        return
+    if format == "csv":
+        import csv
+
+        writer = csv.writer(out)
+        writer.writerow(change_columns)
+        writer.writerows([getattr(c, column) for column in change_columns] for c in batch.changes)
+        out = sys.stderr
+    else:
+        from tablerenderer import TableRenderer
+
+        TableRenderer(columns=change_columns).render(batch.changes, out)
+    print(", ".join(f"{name}: {value}" for name, value in status.items()), file=out)
+
+
+def list_pages(db_ops: DBOperations, after_id: int, limit: int, page_size: int = 500):
+    remaining = limit
+    for page in db_ops.iter_pages(page_size if limit is None else min(page_size, limit), after_id):
+        if remaining is not None:
+            page = page[:remaining]
+            remaining -= len(page)
+        yield page
+        if remaining == 0:
+            return
+
+
+def run_command(db_ops: DBOperations, args, out):
+    """Runs one parsed command.
+
+    Returns:
+        bool: Whether it succeeded
+    """
+    command = args.command
+
+    if command in ("list", "search"):
+        if command == "list":
+            pages = list_pages(db_ops, args.after_id, args.limit)
+        elif args.id is not None:
+            employee = db_ops.search_data_id(args.id)
+            pages = [[employee] if employee is not None else []]
+        elif args.email is not None:
+            employee = db_ops.search_data_email(args.email)
+            pages = [[employee] if employee is not None else []]
+        else:
+            results = db_ops.search_data_name(args.name, args.mode, args.limit)
+            if results is None:
+                return False
+            pages = [results]
+        return write_employees(pages, args.format, out) > 0 or command == "list"
+
+    if command == "changes":
+        batch = db_ops.changes_since(args.since, args.limit)
+        if batch is None:
+            return False
+        write_changes(batch, args.format, out)
+        return True
+
+    outcome = {"command": command}
+    if command == "init":
+        db_ops.create_table_if_not_exists()
+        outcome["ok"] = bool(db_ops.table_exists())
+        if outcome["ok"] and args.name_keys:
+            outcome["ok"] = db_ops.create_name_key_index()
+
+    elif command == "insert":
+        employee = Employee(0, *(getattr(args, a) for a in Employee.user_editable_attributes))
+        outcome["ok"] = db_ops.insert_data(employee, confirmation_provider(args, "Confirm data insertion"))
+        outcome["id"] = employee.id if outcome["ok"] else None
+
+    elif command == "import":
+        pipeline = None
+        if args.rejects:
+            from employeevalidation import ValidationPipeline
+
+            pipeline = ValidationPipeline(args.rejects, args.workers)
+        inserted = db_ops.import_file(args.path, confirmation_provider(args, f"Confirm import of {args.path}"),
+                                      args.batch_size, pipeline)
+        outcome["ok"] = inserted > 0
+        outcome["inserted"] = inserted
+        if pipeline is not None:
+            outcome.update({name: count for name, count in pipeline.counts.items() if name != "valid"})
+
+    elif command == "export":
+        from employeefilter import EmployeeFilter
+
+        employee_filter = EmployeeFilter(args.title, args.min_salary, args.max_salary)
+        exported = db_ops.export_file(args.path, args.columns.split(",") if args.columns else None,
+                                      employee_filter, batch_size=args.batch_size)
+        outcome["ok"] = exported is not None
+        outcome["path"] = args.path
+        outcome["exported"] = exported
+
+    elif command == "update":
+        employee = db_ops.search_data_id(args.id)
+        outcome["id"] = args.id
+        if employee is None:
+            outcome["ok"] = False
+            outcome["error"] = "No such record"
+        else:
+            for attribute in Employee.user_editable_attributes:
+                if getattr(args, attribute) is not None:
+                    setattr(employee, attribute, getattr(args, attribute))
+            outcome["ok"] = db_ops.update_data(employee, confirmation_provider(args, "Confirm update to record"))
+
+    elif command == "delete":
+        outcome["id"] = args.id
+        outcome["ok"] = db_ops.delete_data(args.id, confirmation_provider(args, "Confirm deletion of record"))
+
+    elif command == "adjust-pay":
+        outcome["percent"] = args.percent
+        if args.all:
+            outcome["ok"] = db_ops.adjust_pay_all_employees(
+                args.percent, confirmation_provider(args, "Confirm general pay adjustment"))
+        else:
+            outcome["id"] = args.id
+            outcome["ok"] = db_ops.adjust_pay(
+                args.id, args.percent, confirmation_provider(args, f"Confirm pay adjustment of {args.percent}%"))
+
+    elif command == "sync":
+        report = db_ops.sync_file(args.path, confirmation_provider(args, f"Confirm sync with {args.path}"),
+                                  args.key, args.delete_missing)
+        outcome["ok"] = report is not None
+        outcome.update(report or {})
+
+    elif command == "compact-changes":
+        max_age = args.max_age_days * 86400 if args.max_age_days is not None else None
+        removed = db_ops.compact_change_log(max_age, args.max_changes)
+        outcome["ok"] = removed is not None
+        outcome.update(removed or {})
+
+    elif command == "backup":
+        progress = None
+        if args.progress:
+            def progress(copied, total):
+                print(f"Copied {copied} of {total} pages", file=sys.stderr)
+        result = db_ops.backup(args.path, args.pages, args.sleep, progress)
+        outcome["ok"] = result is not None
+        outcome["path"] = args.path
+        outcome.update(result or {})
+
+    elif command == "restore":
+        outcome["path"] = args.path
+        outcome["ok"] = db_ops.restore(args.path, confirmation_provider(args, f"Confirm restore from {args.path}"))
+
+    elif command == "snapshot":
+        from snapshotscheduler import SnapshotScheduler
+
+        scheduler = SnapshotScheduler(db_ops, args.directory, args.interval, args.keep, args.pages, args.sleep)
+        try:
+            scheduler.run()
+        except KeyboardInterrupt:
+            pass
+        outcome["ok"] = scheduler.snapshots_taken > 0
+        outcome["snapshots"] = scheduler.snapshots_taken
+        outcome["last"] = scheduler.last_snapshot
+
+    write_outcome(outcome, args.format, out)
+    return bool(outcome["ok"])
+
+
+def run_batch(db_ops: DBOperations, parser, args, out):
+    """Runs each command in the batch file, carrying on after failures.
+
+    Returns:
+        bool: Whether every command succeeded
+    """
+    all_succeeded = True
+    with open(args.path) as f:
+        for line_number, line in enumerate(f, 1):
+            if not line.strip() or line.lstrip().startswith("#"):
+                continue
+            # Start from the global options of the batch command, so a line only needs its own command
+            defaults = argparse.Namespace(database=args.database, format=args.format, yes=args.yes)
+            try:
+                line_args = parser.parse_args(shlex.split(line), namespace=defaults)
+            except SystemExit:
+                print(f"{args.path}:{line_number}: invalid command", file=sys.stderr)
+                all_succeeded = False
+                continue
+            if line_args.command in ("batch", "snapshot"):
+                print(f"{args.path}:{line_number}: {line_args.command} can't be used in a batch file", file=sys.stderr)
+                all_succeeded = False
+                continue
+            if line_args.database != args.database:
+                print(f"{args.path}:{line_number}: --database can't be changed in a batch file", file=sys.stderr)
+                all_succeeded = False
+                continue
+            all_succeeded = run_command(db_ops, line_args, out) and all_succeeded
+    return all_succeeded
+
+
+def main(argv=None):
+    """Runs the command line given in argv (defaults to sys.argv[1:]).
+
+    Returns:
+        int: The exit status
+    """
+    parser = build_parser()
+    args = parser.parse_args(argv)
+    out = sys.stdout
+
+    with redirect_stdout(sys.stderr):
+        with DBOperations(args.database, pooled=True) as db_ops:
+            if args.command == "batch":
+                succeeded = run_batch(db_ops, parser, args, out)
+            else:
+                succeeded = run_command(db_ops, args, out)
+
+    return 0 if succeeded else 1
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,52 @@
+import sqlite3
+import threading
+
+
+class ConnectionPool:
+    """
+    The ConnectionPool class keeps one long-lived sqlite3 connection per thread, so that a
+    DBOperations object does not have to open a new connection (and re-prepare all of its
+    SQL statements) every time one of its functions is called.
+    Each connection keeps sqlite3's own prepared-statement cache, which is reused for as
+    long as the connection stays open.
+    """
+
+    def __init__(self, connect) -> None:
+        """
+        Args:
+            connect (callable): A function taking no arguments which opens and returns a new
+            sqlite3.Connection. It is called once for every thread which uses the pool.
+        """
+        self.connect = connect
+        self._local = threading.local()
+        self._lock = threading.Lock()
+        self._connections = []
+
+    def acquire(self):
+        """Returns the connection belonging to the calling thread, opening it if needed.
+
+        Returns:
+            sqlite3.Connection: The calling thread's connection.
+        """
+        conn = getattr(self._local, "conn", None)
+        if conn is None:
+            conn = self.connect()
+            self._local.conn = conn
+            with self._lock:
+                self._connections.append(conn)
+        return conn
+
+    def close_all(self):
+        """Closes every connection opened by the pool, in all threads.
+        """
+        with self._lock:
+            connections, self._connections = self._connections, []
+        for conn in connections:
+            try:
+                conn.close()
+            except sqlite3.Error as e:
+                print(e)
+        self._local = threading.local()
+
+    def __len__(self):
+        return len(self._connections)
@@ -1,40 +1,460 @@
+import itertools
+import json
+import math
+import os
 import sqlite3
+import threading
+import time
 
 
-from employee import Employee
+import migrations
+import namekeys
+from changelog import ChangeBatch, change_row_factory
+from changepreview import ChangePreview
+from connectionpool import ConnectionPool
+from employeecache import EmployeeCache
+from instrumentation import Instrumentation, instrumented
+from payadjustment import pay_factor_expression
+from sqliteprofiles import PROFILES, apply_profile
+from employee import Employee, employee_row_factory, salary_cents
+from employeefilter import EmployeeFilter
 from userconfirmation import UserConfirmationProvider
 
 
+class _BackupRestarted(Exception):
+    """Raised to stop a stepped backup which keeps being restarted by writes."""
+
+
 class DBOperations:
     employee_table_name = "EmployeeUoB"
+    search_index_name = "EmployeeUoB_fts"
+    name_key_index_name = "EmployeeUoB_name_keys"
+    name_word_table_name = "EmployeeUoB_name_words"
+    name_key_queue_name = "EmployeeUoB_name_keys_pending"
+    search_modes = ("auto", "fts", "like", "prefix", "fuzzy")
+    # Most words of names a fuzzy name search compares with each word of the term (see search_data_name_fuzzy)
+    fuzzy_candidates = 200
 
-    sql_create_table = "CREATE TABLE EmployeeUoB (Id INTEGER PRIMARY KEY AUTOINCREMENT, Title, Forename, Surname, EmailAddress, Salary)"
+    # Salary is stored in whole cents (see migrations), so Employee objects never see the stored value:
+    # it is converted to pounds in SQL, and salaries are converted to cents in Python (see
+    # employee_values) before they are written, so that text which isn't an amount is refused.
+    sql_employee_columns = "Id, Title, Forename, Surname, EmailAddress, Salary / 100.0"
     sql_check_table_exists = "SELECT * FROM sqlite_master WHERE name=?"
     sql_insert = "INSERT INTO EmployeeUoB (Title, Forename, Surname, EmailAddress, Salary) VALUES (?,?,?,?,?)"
-    sql_select_all = "SELECT * from EmployeeUoB"
-    sql_search_id = "SELECT * from EmployeeUoB where Id = ?"
-    sql_search_name = "SELECT * from EmployeeUoB where Forename LIKE ? OR Surname LIKE ?"
-    sql_update_data = "UPDATE EmployeeUoB SET Title=?,Forename=?, Surname=?, EmailAddress=?, Salary=? WHERE Id = ?"
-    sql_delete_data = "DELETE FROM EmployeeUoB WHERE Id = ?"
-    sql_salary_adjustment = "UPDATE EmployeeUoB SET Salary=Salary*? WHERE Id=?"
-    sql_salary_adjustment_all = "UPDATE EmployeeUoB SET Salary=Salary*?"
+    sql_select_all = "SELECT " + sql_employee_columns + " from EmployeeUoB"
+    sql_select_page = "SELECT " + sql_employee_columns + " from EmployeeUoB WHERE Id > ? ORDER BY Id LIMIT ?"
+    sql_search_id = "SELECT " + sql_employee_columns + " from EmployeeUoB where Id = ?"
+    sql_search_email = "SELECT " + sql_employee_columns + " from EmployeeUoB where EmailAddress = ? AND EmailAddress <> ''"
+    sql_search_name = "SELECT " + sql_employee_columns + " from EmployeeUoB where Forename LIKE ? OR Surname LIKE ? LIMIT ?"
+    sql_search_surname_prefix = "SELECT " + sql_employee_columns + " from EmployeeUoB where Surname LIKE ? ORDER BY Surname, Forename LIMIT ?"
+    sql_search_name_fts = ("SELECT e.Id, e.Title, e.Forename, e.Surname, e.EmailAddress, e.Salary / 100.0 from EmployeeUoB_fts "
+                           "JOIN EmployeeUoB e ON e.Id = EmployeeUoB_fts.rowid WHERE EmployeeUoB_fts MATCH ? ORDER BY rank LIMIT ?")
+    sql_create_search_index = ([migrations.SQL_CREATE_SEARCH_TABLE] + migrations.SQL_CREATE_SEARCH_TRIGGERS
+                               + [migrations.SQL_REBUILD_SEARCH_INDEX])
+    # The words of names sharing the most keys with a word of a fuzzy search term, a phonetic key counting
+    # for as much as three trigrams, and whether each has the word's Metaphone key
+    sql_fuzzy_name_words = ("SELECT Word, MAX(Key = ?) from EmployeeUoB_name_keys WHERE Key IN (SELECT value FROM json_each(?)) "
+                            "GROUP BY Word ORDER BY SUM(CASE WHEN Key GLOB 'T*' THEN 1 ELSE 3 END) DESC LIMIT ?")
+    sql_count_name_words = ("SELECT COUNT(*) from (SELECT 1 from EmployeeUoB_name_words "
+                            "WHERE Word IN (SELECT value FROM json_each(?)) LIMIT ?)")
+    # The Employees with one of a list of words, and one of each of the other lists of words
+    sql_search_name_words = ("SELECT " + sql_employee_columns + " from EmployeeUoB WHERE Id IN "
+                             "(SELECT w.EmployeeId from EmployeeUoB_name_words w WHERE w.Word IN (SELECT value FROM json_each(?)) "
+                             "AND NOT EXISTS (SELECT 1 FROM json_each(?) other WHERE NOT EXISTS "
+                             "(SELECT 1 FROM EmployeeUoB_name_words o, json_each(other.value) m "
+                             "WHERE o.EmployeeId = w.EmployeeId AND o.Word = m.value)) "
+                             "ORDER BY w.EmployeeId LIMIT ?)")
+    sql_create_name_key_index = migrations.SQL_CREATE_NAME_KEY_TABLES + migrations.SQL_CREATE_NAME_KEY_TRIGGERS
+    sql_pending_name_words_exist = migrations.SQL_PENDING_NAME_WORDS_EXIST
+    sql_insert_returning = sql_insert + " RETURNING Id"
+    # The mutations below only match the row if it still holds the values it had when it was
+    # shown to the user (Id, Title, Forename, Surname, EmailAddress, Salary), and return the
+    # rows they changed, so that the check and the write happen in a single statement.
+    sql_row_unchanged = "Id = ? AND Title IS ? AND Forename IS ? AND Surname IS ? AND EmailAddress IS ? AND Salary / 100.0 IS ?"
+    sql_update_data = ("UPDATE EmployeeUoB SET Title=?,Forename=?, Surname=?, EmailAddress=?, Salary=? WHERE "
+                       + sql_row_unchanged + " RETURNING " + sql_employee_columns)
+    sql_delete_data = "DELETE FROM EmployeeUoB WHERE " + sql_row_unchanged + " RETURNING " + sql_employee_columns
+    sql_salary_adjustment = ("UPDATE EmployeeUoB SET Salary=CAST(ROUND(Salary*?) AS INTEGER) WHERE " + sql_row_unchanged
+                             + " RETURNING " + sql_employee_columns)
+    sql_salary_adjustment_all = "UPDATE EmployeeUoB SET Salary=CAST(ROUND(Salary*?) AS INTEGER)"
     sql_get_last_id = "SELECT last_insert_rowid()"
+    sql_preview_salary_adjustment = "SELECT " + sql_employee_columns + ", ROUND(Salary*?) / 100.0 from EmployeeUoB where Id = ?"
+    sql_preview_salary_adjustment_all = ("SELECT Id, Title, Forename, Surname, EmailAddress, ROUND(Salary*?) / 100.0 "
+                                         "from EmployeeUoB ORDER BY Id LIMIT ?")
+    sql_salary_adjustment_all_totals = "SELECT COUNT(*), TOTAL(Salary) / 100.0, TOTAL(ROUND(Salary*?)) / 100.0 from EmployeeUoB"
+    # Templates for adjust_pay_bulk, completed with a pay factor CASE expression and an EmployeeFilter condition
+    sql_pay_factors = "SELECT *, ROUND(Salary*({factor})) AS NewSalary from EmployeeUoB WHERE {condition}"
+    sql_pay_adjustment_totals = ("SELECT COUNT(*), TOTAL(Salary) / 100.0, TOTAL(NewSalary) / 100.0, "
+                                 "MIN(NewSalary-Salary) / 100.0, MAX(NewSalary-Salary) / 100.0 "
+                                 "from (" + sql_pay_factors + ") WHERE NewSalary IS NOT NULL")
+    sql_preview_pay_adjustment = ("SELECT Id, Title, Forename, Surname, EmailAddress, NewSalary / 100.0 "
+                                  "from (" + sql_pay_factors + ") WHERE NewSalary IS NOT NULL ORDER BY Id LIMIT ?")
+    sql_pay_adjustment = "UPDATE EmployeeUoB SET Salary=CAST(ROUND(Salary*({factor})) AS INTEGER) WHERE {condition} AND ({factor}) IS NOT NULL"
+    # Change log (see migrations.create_change_log). Superseded changes are those followed by a later
+    # change to the same Employee; removing them never loses the latest state of any Employee.
+    sql_select_changes = ("SELECT Seq, EmployeeId, Operation, ChangedAt, Title, Forename, Surname, EmailAddress, "
+                          "Salary / 100.0 from EmployeeUoB_changes WHERE Seq > ? ORDER BY Seq LIMIT ?")
+    sql_change_log_purged = "SELECT PurgedThrough from EmployeeUoB_changes_purged"
+    sql_latest_change = ("SELECT MAX(PurgedThrough, (SELECT COALESCE(MAX(Seq), 0) from EmployeeUoB_changes)) "
+                         "from EmployeeUoB_changes_purged")
+    sql_delete_superseded_changes = ("DELETE FROM EmployeeUoB_changes WHERE Seq < "
+                                     "(SELECT MAX(Seq) from EmployeeUoB_changes later "
+                                     "WHERE later.EmployeeId = EmployeeUoB_changes.EmployeeId)")
+    sql_last_change_before = "SELECT MAX(Seq) from EmployeeUoB_changes WHERE ChangedAt < (julianday('now') - 2440587.5) * 86400.0 - ?"
+    sql_last_change_beyond = "SELECT Seq from EmployeeUoB_changes ORDER BY Seq DESC LIMIT 1 OFFSET ?"
+    sql_delete_changes_through = "DELETE FROM EmployeeUoB_changes WHERE Seq <= ?"
+    sql_set_change_log_purged = "UPDATE EmployeeUoB_changes_purged SET PurgedThrough = MAX(PurgedThrough, ?)"
+    # After a restore the change log carries on from past the newest cursor of the database it replaced
+    sql_set_change_log_sequence = "UPDATE sqlite_sequence SET seq = MAX(seq, ?) WHERE name='EmployeeUoB_changes'"
+    sql_insert_change_log_sequence = "INSERT INTO sqlite_sequence (name, seq) VALUES ('EmployeeUoB_changes', ?)"
+    # Sync from an external feed (see sync_records). The feed is loaded into a temporary staging table,
+    # keyed on the value it is matched by, and compared with EmployeeUoB in SQL. {key} is the EmployeeUoB
+    # column matched on, and "{key} {present}" is true of the rows which can be matched. Text is compared
+    # with BINARY collation, so that corrections to the case of a name count as changes.
+    sync_keys = {
+        "email": ("EmailAddress", "<> ''", "NOCASE"),
+        "external_id": ("ExternalId", "IS NOT NULL", "BINARY"),
+    }
+    sql_create_sync_staging = ("CREATE TEMP TABLE EmployeeSync (Key TEXT PRIMARY KEY COLLATE {collation}, Title TEXT, "
+                               "Forename TEXT, Surname TEXT, EmailAddress TEXT, Salary INTEGER, ExternalId TEXT)")
+    sql_drop_sync_staging = "DROP TABLE IF EXISTS temp.EmployeeSync"
+    # A later record with the same key replaces an earlier one
+    sql_stage_sync_record = ("INSERT INTO temp.EmployeeSync (Key, Title, Forename, Surname, EmailAddress, Salary, ExternalId) "
+                             "VALUES (?,?,?,?,?,?,?) ON CONFLICT(Key) DO UPDATE SET "
+                             "Title=excluded.Title, Forename=excluded.Forename, Surname=excluded.Surname, "
+                             "EmailAddress=excluded.EmailAddress, Salary=excluded.Salary, ExternalId=excluded.ExternalId")
+    sql_count_sync_staging = "SELECT COUNT(*) from temp.EmployeeSync"
+    # With external_id keys, an email address used by several feed records, or by an existing Employee
+    # with a different ExternalId, would break the unique index on EmailAddress, so those records are rejected
+    sql_reject_sync_shared_emails = ("DELETE FROM temp.EmployeeSync WHERE EmailAddress <> '' AND EmailAddress COLLATE NOCASE IN "
+                                     "(SELECT EmailAddress from temp.EmployeeSync WHERE EmailAddress <> '' "
+                                     "GROUP BY EmailAddress COLLATE NOCASE HAVING COUNT(*) > 1)")
+    sql_reject_sync_taken_emails = ("DELETE FROM temp.EmployeeSync WHERE EmailAddress <> '' AND EXISTS "
+                                    "(SELECT 1 from EmployeeUoB e WHERE e.EmailAddress = temp.EmployeeSync.EmailAddress "
+                                    "AND e.EmailAddress <> '' AND e.ExternalId IS NOT temp.EmployeeSync.Key)")
+    sql_sync_row_differs = ("{e}.Title IS NOT {s}.Title COLLATE BINARY OR {e}.Forename IS NOT {s}.Forename COLLATE BINARY "
+                            "OR {e}.Surname IS NOT {s}.Surname COLLATE BINARY "
+                            "OR {e}.EmailAddress IS NOT {s}.EmailAddress COLLATE BINARY OR {e}.Salary IS NOT {s}.Salary "
+                            "OR ({s}.ExternalId IS NOT NULL AND {e}.ExternalId IS NOT {s}.ExternalId)")
+    sql_sync_counts = ("SELECT (SELECT COUNT(*) from temp.EmployeeSync s WHERE NOT EXISTS "
+                       "(SELECT 1 from EmployeeUoB e WHERE e.{key} = s.Key AND e.{key} {present})), "
+                       "(SELECT COUNT(*) from temp.EmployeeSync s JOIN EmployeeUoB e ON e.{key} = s.Key AND e.{key} {present} "
+                       "WHERE " + sql_sync_row_differs.format(e="e", s="s") + "), "
+                       "(SELECT COUNT(*) from temp.EmployeeSync s JOIN EmployeeUoB e ON e.{key} = s.Key AND e.{key} {present} "
+                       "WHERE NOT (" + sql_sync_row_differs.format(e="e", s="s") + ")), "
+                       "(SELECT COUNT(*) from EmployeeUoB e WHERE e.{key} {present} AND NOT EXISTS "
+                       "(SELECT 1 from temp.EmployeeSync s WHERE s.Key = e.{key}))")
+    sql_sync_preview = ("SELECT COALESCE(e.Id, 0), s.Title, s.Forename, s.Surname, s.EmailAddress, s.Salary / 100.0 "
+                        "from temp.EmployeeSync s LEFT JOIN EmployeeUoB e ON e.{key} = s.Key AND e.{key} {present} "
+                        "WHERE e.Id IS NULL OR " + sql_sync_row_differs.format(e="e", s="s") + " ORDER BY s.rowid LIMIT ?")
+    # Only new and changed records are passed to the upsert, as every row it is given uses up a value of
+    # the AUTOINCREMENT Id sequence, even if it ends up updating an existing row. A feed synced on email
+    # addresses may also carry ExternalIds, which are then recorded, so a later sync can use them.
+    sql_sync_upsert = ("INSERT INTO EmployeeUoB (Title, Forename, Surname, EmailAddress, Salary, ExternalId) "
+                       "SELECT Title, Forename, Surname, EmailAddress, Salary, ExternalId from temp.EmployeeSync s "
+                       "WHERE NOT EXISTS (SELECT 1 from EmployeeUoB e WHERE e.{key} = s.Key AND e.{key} {present} "
+                       "AND NOT (" + sql_sync_row_differs.format(e="e", s="s") + ")) "
+                       "ORDER BY s.rowid ON CONFLICT({key}) WHERE {key} {present} DO UPDATE SET "
+                       "Title=excluded.Title, Forename=excluded.Forename, Surname=excluded.Surname, "
+                       "EmailAddress=excluded.EmailAddress, Salary=excluded.Salary, "
+                       "ExternalId=COALESCE(excluded.ExternalId, EmployeeUoB.ExternalId) "
+                       "WHERE " + sql_sync_row_differs.format(e="EmployeeUoB", s="excluded"))
+    sql_sync_delete_missing = ("DELETE FROM EmployeeUoB WHERE {key} {present} AND NOT EXISTS "
+                               "(SELECT 1 from temp.EmployeeSync s WHERE s.Key = EmployeeUoB.{key})")
+    # Incoming records are matched on email address, or on name if they have none (see employeevalidation)
+    sql_create_validation_keys = ("CREATE TEMP TABLE IF NOT EXISTS EmployeeValidation (Record INTEGER PRIMARY KEY, "
+                                  "Forename TEXT, Surname TEXT, EmailAddress TEXT)")
+    sql_clear_validation_keys = "DELETE FROM temp.EmployeeValidation"
+    sql_stage_validation_key = ("INSERT INTO temp.EmployeeValidation (Record, Forename, Surname, EmailAddress) "
+                                "VALUES (?, ?, ?, ?)")
+    sql_find_existing_keys = ("SELECT v.Record, e.Id from temp.EmployeeValidation v JOIN EmployeeUoB e "
+                              "ON e.EmailAddress = v.EmailAddress AND e.EmailAddress <> '' WHERE v.EmailAddress <> '' "
+                              "UNION ALL "
+                              "SELECT v.Record, MIN(e.Id) from temp.EmployeeValidation v JOIN EmployeeUoB e "
+                              "ON e.Surname = v.Surname AND e.Forename = v.Forename WHERE v.EmailAddress = '' "
+                              "GROUP BY v.Record")
+    sql_quick_check = "PRAGMA quick_check"
+    sql_count_employees = "SELECT COUNT(*) from EmployeeUoB"
+    sql_data_version = "PRAGMA data_version"
+    sql_begin_read = "BEGIN"
+    sql_begin_write = "BEGIN IMMEDIATE"
+    # Primary result codes of a database which can't be written to now (locked) or at all (read-only)
+    sqlite_unwritable_codes = (sqlite3.SQLITE_BUSY, sqlite3.SQLITE_LOCKED, sqlite3.SQLITE_READONLY)
 
-    def __init__(self, database_name: str):
-        try:
-            self.database_name = database_name
-            self.conn = sqlite3.connect(database_name)
+    def __init__(self, database_name: str, pooled: bool = False, statement_cache_size: int = 256,
+                 cache_size: int = 0, profile: str = None, instrumentation: Instrumentation = None,
+                 migrate: bool = True, read_replica: bool = False, max_staleness: float = 0):
+        """
+        Args:
+            database_name (str): Path to the SQLite database file.
+            pooled (bool, optional): Keep one long-lived connection per thread instead of
+            opening a new connection for every call. Defaults to False (one-shot connections).
+            statement_cache_size (int, optional): Number of prepared statements each connection
+            keeps cached for reuse. Defaults to 256.
+            cache_size (int, optional): Number of search_data_id and search_data_name results to keep
+            in an EmployeeCache. Only used with pooled=True, because changes made by other connections
+            are detected with PRAGMA data_version, which needs a connection that stays open.
+            Defaults to 0 (no cache).
+            profile (str, optional): Name of a set of SQLite settings from sqliteprofiles.PROFILES
+            ("durable", "throughput" or "read-mostly") to apply to every connection. Defaults to None,
+            which leaves SQLite's defaults in place.
+            instrumentation (Instrumentation, optional): Records timings, row counts, errors and lock
+            waits for each function and SQL statement. Defaults to None (nothing recorded).
+            migrate (bool, optional): Upgrade an existing EmployeeUoB table to the latest schema version
+            straight away (see upgrade_schema). If the upgrade is refused, every other function reports
+            an error until upgrade_schema or restore succeeds. Defaults to True.
+            read_replica (bool, optional): Load the database into memory (see ReadReplica) and answer
+            select_all, iter_all, select_page, the searches and export_file from the copy, which is
+            refreshed from the file when it changes. Writes still go to the file. Defaults to False.
+            max_staleness (float, optional): With read_replica, the most seconds a read may go without
+            checking the file for changes. Writes made through this object are always seen by the next
+            read. Defaults to 0, checking before every read.
+        """
+        if profile is not None and profile not in PROFILES:
+            raise ValueError(f"Unknown profile {profile!r}, expected one of {', '.join(PROFILES)}")
 
-        except Exception as e:
-            print(e)
+        self.database_name = database_name
+        self.statement_cache_size = statement_cache_size
+        self.profile = profile
+        self.instrumentation = instrumentation
+        self._local = threading.local()
+        self._search_index_available = False
+        self._name_key_index_available = False
+        self._schema_out_of_date = False
+        self.pool = ConnectionPool(self._connect) if pooled else None
+        self.cache = EmployeeCache(cache_size) if pooled and cache_size > 0 else None
+        self.replica = None
 
-        finally:
-            self.conn.close()
+        if self.pool is None:
+            try:
+                self.conn = self._connect()
+
+            except Exception as e:
+                self.report_error(e)
+
+            finally:
+                self.release_connection()
+
+        if migrate:
+            self.upgrade_schema()
+
+        if read_replica:
+            from readreplica import ReadReplica
+
+            self.replica = ReadReplica(database_name, max_staleness, on_refresh=self._replica_refreshed,
+                                       trace=instrumentation.trace if instrumentation is not None else None)
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, exc_type, exc_value, traceback):
+        self.close()
+
+    @property
+    def conn(self):
+        return getattr(self._local, "conn", None)
+
+    @conn.setter
+    def conn(self, value):
+        self._local.conn = value
+
+    @property
+    def cur(self):
+        return getattr(self._local, "cur", None)
+
+    @cur.setter
+    def cur(self, value):
+        self._local.cur = value
+
+    def _connect(self):
+        """Opens a new connection to the database.
+
+        Returns:
+            sqlite3.Connection: The new connection
+        """
+        conn = sqlite3.connect(self.database_name,
+                               cached_statements=self.statement_cache_size,
+                               check_same_thread=self.pool is None)
+        if self.profile is not None:
+            apply_profile(conn, self.profile)
+        if self.instrumentation is not None:
+            conn.set_trace_callback(self.instrumentation.trace)
+        return conn
+
+    def get_connection(self, read_only: bool = False):
+        """Sets self.conn and self.cur for a function to use.
 
-    def get_connection(self):
-        self.conn = sqlite3.connect(self.database_name)
+        Args:
+            read_only (bool, optional): The function only reads the EmployeeUoB table, so can be answered
+            from the read replica if there is one. Defaults to False.
+
+        Raises:
+            RuntimeError: If upgrade_schema failed, since the table would be read and written as if it had
+            the latest schema
+        """
+        if self._schema_out_of_date:
+            raise RuntimeError("The database could not be upgraded to the latest schema version, so it can't be "
+                               "used. Correct the problem reported and try again, or restore a backup.")
+        self._open_connection(read_only)
+
+    def _open_connection(self, read_only: bool = False):
+        if read_only and self.replica is not None:
+            self.conn = self.replica.acquire()
+        elif self.pool is not None:
+            self.conn = self.pool.acquire()
+        else:
+            self.conn = self._connect()
         self.cur = self.conn.cursor()
 
+    def release_connection(self):
+        """Hands the current connection back once a function has finished with it. One-shot
+        connections are closed, pooled connections are kept open but any transaction which
+        was left open is rolled back.
+        """
+        if self.conn is None:
+            return
+        if self.replica is not None and self.conn is self.replica.conn:
+            self.replica.release()
+            self.conn = None
+        elif self.pool is not None:
+            if self.conn.in_transaction:
+                self.conn.rollback()
+        else:
+            self.conn.close()
+            self.conn = None
+
+    def commit(self):
+        """Commits the current transaction, and empties the cache since the change may affect
+        cached results.
+        """
+        self.conn.commit()
+        if self.cache is not None:
+            self.cache.invalidate()
+        if self.replica is not None:
+            self.replica.expire()
+
+    def cached_rows(self, key, sql, params):
+        """Runs a query returning whole EmployeeUoB rows, answering it from the cache if possible.
+
+        Args:
+            key (tuple): Identifies the query and its parameters in the cache
+            sql (str): The query
+            params (tuple): Parameters for the query
+
+        Returns:
+            list[Employee]: The Employees returned by the query
+        """
+        if self.cache is None:
+            self.cur.row_factory = employee_row_factory
+            return self.cur.execute(sql, params).fetchall()
+
+        self.cache.check_data_version(self.conn, self.data_version())
+        found, rows = self.cache.get(key)
+        if not found:
+            generation = self.cache.generation
+            rows = tuple(self.cur.execute(sql, params).fetchall())
+            self.cache.put(key, rows, generation)
+        return [Employee(*r) for r in rows]
+
+    def close(self):
+        """Closes all pooled connections, and the read replica, after which reads go to the file.
+        Has no effect for one-shot connections.
+        """
+        if self.pool is not None:
+            self.pool.close_all()
+            self._local = threading.local()
+        if self.cache is not None:
+            self.cache.forget_connections()
+        if self.replica is not None:
+            self.replica.close()
+            self.replica = None
+
+    def _replica_refreshed(self):
+        if self.cache is not None:
+            self.cache.invalidate()
+
+    def replica_status(self):
+        """Describes how up to date the read replica is.
+
+        Returns:
+            dict: The staleness bound (max_staleness), the seconds since the copy was last known to
+            match the file, the numbers of checks and of full and incremental refreshes, and the mode,
+            rows changed and duration of the last refresh; or None without a read replica
+        """
+        if self.replica is None:
+            return None
+        with self.replica.lock:
+            return dict(self.replica.stats, **{"staleness bound": self.replica.max_staleness,
+                                               "staleness": round(self.replica.staleness(), 6)})
+
+    def data_version(self):
+        """Reads PRAGMA data_version on the current connection. The value changes whenever
+        another connection commits a change to the database.
+
+        Returns:
+            int: The current data version
+        """
+        return self.cur.execute(self.sql_data_version).fetchone()[0]
+
+    def begin_write(self, previewed_data_version, check_sql, check_params, previewed_rows):
+        """Takes the database write lock for a change which the user has already confirmed, and
+        checks that the rows shown to the user have not been changed by another writer since.
+        Nothing is locked while the user is deciding, so the check is optimistic: if the data
+        version has moved on, the previewed rows are read again and compared.
+
+        Args:
+            previewed_data_version (int): The data version read when the preview was built
+            check_sql (str): The query used to read the previewed rows
+            check_params (tuple): Parameters for check_sql
+            previewed_rows (list[tuple]): The rows returned by check_sql when the preview was built
+
+        Returns:
+            bool: Whether the change can go ahead. If False, no transaction is left open.
+        """
+        self.lock_write()
+        if self.data_version() == previewed_data_version:
+            return True
+
+        self.cur.execute(check_sql, check_params)
+        if self.cur.fetchall() == previewed_rows:
+            return True
+
+        self.conn.rollback()
+        self.report_conflict()
+        return False
+
+    def lock_write(self):
+        """Starts a write transaction, waiting for the write lock if another connection holds it.
+        The time spent waiting is recorded as lock wait time.
+        """
+        start = time.perf_counter()
+        self.cur.execute(self.sql_begin_write)
+        if self.instrumentation is not None:
+            self.instrumentation.record_lock_wait(time.perf_counter() - start)
+
+    @staticmethod
+    def employee_values(employee: Employee):
+        """The values of an Employee's columns for an INSERT or UPDATE, with its salary in cents.
+
+        Raises:
+            ValueError: If the salary isn't an amount (see employee.parse_salary)
+
+        Returns:
+            tuple: (title, forename, surname, email, salary in cents)
+        """
+        return employee.to_tuple()[:4] + (salary_cents(employee.salary),)
+
+    def report_error(self, e):
+        """Reports an error which stopped a function from completing.
+        """
+        print(e)
+        if self.instrumentation is not None:
+            self.instrumentation.record_error()
+
+    def report_conflict(self):
+        print("The affected data was changed by another user since it was shown. No changes made.")
+
+    @instrumented
     def create_table_if_not_exists(self):
         """Checks whether the table exists already, and creates it if it doesn't.
         """
@@ -42,6 +462,7 @@ class DBOperations:
             if self.table_exists():
                 print(
                     f"Table <<{self.employee_table_name}>> not created: Table already exists")
+                self.upgrade_schema()
             else:
                 self.create_table()
                 if self.table_exists():
@@ -50,41 +471,194 @@ class DBOperations:
                 else:
                     print(
                         f"Unable to create table <<{self.employee_table_name}>>")
+
+            if self.table_exists() and not self.search_index_exists():
+                self.create_search_index()
         except Exception as e:
-            print(e)
+            self.report_error(e)
 
-    def table_exists(self):
+    @instrumented
+    def table_exists(self, table_name: str = None):
         """Checks for the existence of the table 
 
+        Args:
+            table_name (str, optional): The table to look for. Defaults to the EmployeeUoB table.
+
         Returns:
             bool: table exists
         """
         try:
             self.get_connection()
             result = self.cur.execute(
-                self.sql_check_table_exists, (self.employee_table_name,))
+                self.sql_check_table_exists, (table_name or self.employee_table_name,))
             tables_returned = result.fetchone()
             return tables_returned is not None
         except Exception as e:
-            print(e)
+            self.report_error(e)
         finally:
-            self.conn.close()
+            self.release_connection()
 
+    @instrumented
     def create_table(self):
-        """Creates the EmployeeUoB table
+        """Creates the EmployeeUoB table, at the latest schema version
         """
         try:
             self.get_connection()
-            self.cur.execute(self.sql_create_table)
-            self.conn.commit()
+            migrations.migrate(self.conn)
+            if self.replica is not None:
+                self.replica.expire()
 
         except Exception as e:
-            print(e)
+            self.report_error(e)
         finally:
-            self.conn.close()
+            self.release_connection()
+
+    @instrumented
+    def upgrade_schema(self):
+        """Upgrades an existing EmployeeUoB table to the latest schema version, applying each pending
+        migration from the migrations module in its own transaction. Does nothing if the table doesn't
+        exist yet or is already up to date. If a migration fails, every other function reports an error
+        until the upgrade succeeds.
+
+        Returns:
+            list[tuple]: (version, description) of each migration applied
+        """
+        applied = []
+        try:
+            self._open_connection()
+            if migrations.needs_migration(self.conn):
+                self._schema_out_of_date = True
+                applied = migrations.migrate(self.conn)
+                for version, description in applied:
+                    print(f"Database upgraded to schema version {version}: {description}")
+                if self.cache is not None:
+                    self.cache.invalidate()
+                if self.replica is not None:
+                    self.replica.expire()
+            self._schema_out_of_date = False
+
+        except Exception as e:
+            self.report_error(e)
+        finally:
+            self.release_connection()
+            return applied
+
+    def search_index_exists(self):
+        """Checks whether the full-text name search index has been created. A positive answer is
+        remembered, so this is only looked up in the database until the index is found.
+
+        Returns:
+            bool: search index exists
+        """
+        if not self._search_index_available:
+            self._search_index_available = bool(self.table_exists(self.search_index_name))
+        return self._search_index_available
+
+    @instrumented
+    def create_search_index(self):
+        """Creates an FTS5 full-text index (using the trigram tokenizer) over the Forename, Surname and 
+        EmailAddress columns, kept up to date by triggers on the EmployeeUoB table, and fills it from
+        the rows already in the table. This needs an SQLite build with FTS5 compiled in; if FTS5 isn't
+        available the index isn't created and name searches keep using LIKE.
+
+        Returns:
+            bool: Whether the index was created
+        """
+        success = False
+        try:
+            self.get_connection()
+            for sql in self.sql_create_search_index:
+                self.cur.execute(sql)
+            self.commit()
+            success = True
+            print(f"Search index <<{self.search_index_name}>> created successfully")
+
+        except sqlite3.OperationalError as e:
+            print(f"Search index not created, name searches will scan the table: {e}")
+        except Exception as e:
+            self.report_error(e)
+        finally:
+            self.release_connection()
+            return success
 
+    def name_key_index_exists(self):
+        """Checks whether the fuzzy name search index has been created, remembering a positive answer
+        as search_index_exists does.
+
+        Returns:
+            bool: name key index exists
+        """
+        if not self._name_key_index_available:
+            self._name_key_index_available = bool(self.table_exists(self.name_key_index_name))
+        return self._name_key_index_available
+
+    @instrumented
+    def create_name_key_index(self):
+        """Creates the index used by fuzzy name searches: tables of the words of each Employee's Forename
+        and Surname and of the Soundex, Metaphone and trigram keys of each word (see namekeys), and fills
+        them from the rows already in the table. Triggers on the EmployeeUoB table queue Employees whose
+        names change for update_name_key_index. Any existing index is replaced, so this also rebuilds it.
+
+        Returns:
+            bool: Whether the index was created
+        """
+        success = False
+        try:
+            self.get_connection()
+            self.cur.execute(self.sql_begin_write)
+            self.cur.execute(f"DROP TABLE IF EXISTS {self.name_key_index_name}")
+            self.cur.execute(f"DROP TABLE IF EXISTS {self.name_word_table_name}")
+            self.cur.execute(f"DROP TABLE IF EXISTS {self.name_key_queue_name}")
+            for operation in ("insert", "delete", "update"):
+                self.cur.execute(f"DROP TRIGGER IF EXISTS {self.name_key_index_name}_{operation}")
+            for sql in self.sql_create_name_key_index:
+                self.cur.execute(sql)
+            namekeys.update_name_key_index(self.conn, everyone=True)
+            self.commit()
+            success = True
+            print(f"Name key index <<{self.name_key_index_name}>> created successfully")
+
+        except Exception as e:
+            self.report_error(e)
+        finally:
+            self.release_connection()
+            return success
+
+    @instrumented
+    def update_name_key_index(self, best_effort: bool = False):
+        """Adds the Employees queued by the name key index's triggers, ie: those inserted or renamed
+        (through any connection) since the last update, to the index. search_data_name_fuzzy calls this
+        first, so writes don't pay for working out words and keys, and searches always see them.
+
+        Args:
+            best_effort (bool, optional): If the write lock can't be had within the busy timeout, or the
+            database is read-only, leave the Employees queued without reporting an error. Defaults to False.
+
+        Returns:
+            int: The number of Employees added, or None if the update failed or was left
+        """
+        updated = None
+        try:
+            self.get_connection()
+            updated = 0
+            if self.cur.execute(self.sql_pending_name_words_exist).fetchone()[0]:
+                self.lock_write()
+                updated = namekeys.update_name_key_index(self.conn)
+                self.commit()
+
+        except sqlite3.OperationalError as e:
+            if not best_effort or e.sqlite_errorcode & 0xff not in self.sqlite_unwritable_codes:
+                self.report_error(e)
+        except Exception as e:
+            self.report_error(e)
+        finally:
+            self.release_connection()
+            return updated
+
+    @instrumented
     def insert_data(self, data_to_insert: Employee, confirmationProvider: UserConfirmationProvider):
-        """Inserts a new employee into the EmployeeUoB table
+        """Inserts a new employee into the EmployeeUoB table. Once inserted, the id attribute of
+        data_to_insert is set to the Id the new row was given.
 
         Args:
             data_to_insert (Employee): The Employee object to insert into the table
@@ -97,25 +671,181 @@ class DBOperations:
         """
         success = False
         try:
-            self.get_connection()
-            self.cur.execute(self.sql_insert, data_to_insert.to_tuple())
-
-            self.cur.execute(self.sql_search_id, (self.cur.lastrowid,))
-            inserted_data = Employee.from_db_result(self.cur.fetchone())
-
-            if confirmationProvider.requestConfirmation(inserted_data):
-                self.conn.commit()
+            values = self.employee_values(data_to_insert)
+            if confirmationProvider.requestConfirmation(data_to_insert):
+                self.get_connection()
+                self.lock_write()
+                self.cur.execute(self.sql_insert_returning, values)
+                (inserted_id,) = self.cur.fetchone()
+                self.commit()
+                data_to_insert.id = inserted_id
                 success = True
-            else:
-                self.conn.rollback()
 
         except Exception as e:
-            print(e)
+            self.report_error(e)
 
         finally:
-            self.conn.close()
+            self.release_connection()
             return success
 
+    @instrumented
+    def insert_many(self, employees, confirmationProvider: UserConfirmationProvider, batch_size: int = 1000,
+                    sample_size: int = 5, row_count: int = None):
+        """Inserts many new employees into the EmployeeUoB table, asking for a single confirmation
+        for the whole lot. Rows are written with executemany, one transaction per batch, so the
+        Employees can be streamed from a generator without holding them all in memory.
+
+        Note: batches are committed as they are written, so if an error occurs part way through,
+        the batches before it stay in the table.
+
+        Args:
+            employees (Iterable[Employee]): The Employees to insert
+            confirmationProvider (UserConfirmationProvider): Asked once, with a ChangePreview showing
+            the row count and the first few Employees.
+            batch_size (int, optional): Number of rows per executemany call and commit. Defaults to 1000.
+            sample_size (int, optional): Number of Employees shown in the preview. Defaults to 5.
+            row_count (int, optional): Number of Employees, if known. Taken from len(employees) when
+            it isn't supplied and employees has a length.
+
+        Returns:
+            int: The number of rows inserted
+        """
+        inserted = 0
+        try:
+            if row_count is None and hasattr(employees, "__len__"):
+                row_count = len(employees)
+
+            employees = iter(employees)
+            sample = list(itertools.islice(employees, sample_size))
+
+            if sample and confirmationProvider.requestConfirmation(ChangePreview(row_count, sample)):
+                self.get_connection()
+                employees = itertools.chain(sample, employees)
+                while True:
+                    batch = [self.employee_values(e) for e in itertools.islice(employees, batch_size)]
+                    if not batch:
+                        break
+                    self.lock_write()
+                    self.cur.executemany(self.sql_insert, batch)
+                    self.commit()
+                    inserted += len(batch)
+
+        except Exception as e:
+            self.report_error(e)
+
+        finally:
+            self.release_connection()
+            return inserted
+
+    @instrumented
+    def import_file(self, path: str, confirmationProvider: UserConfirmationProvider, batch_size: int = 1000,
+                    pipeline=None):
+        """Streams Employees from a CSV or JSONL file into the EmployeeUoB table using insert_many.
+        The file is read twice: once to count the records for the confirmation, and once to insert them.
+
+        Args:
+            path (str): Path to a .csv, .jsonl or .ndjson file
+            confirmationProvider (UserConfirmationProvider): Asked once for the whole file
+            batch_size (int, optional): Number of rows per batch. Defaults to 1000.
+            pipeline (ValidationPipeline, optional): If given, records are checked with validate_records
+            and only clean ones are inserted. The confirmation then shows the number of records in the
+            file, which includes any that will be rejected.
+
+        Returns:
+            int: The number of rows inserted
+        """
+        import employeeimport  # csv and json are only needed when importing
+
+        try:
+            row_count = employeeimport.count_records(path)
+        except Exception as e:
+            self.report_error(e)
+            return 0
+
+        if pipeline is not None:
+            employees = self.validate_records(employeeimport.iter_records(path), pipeline)
+        else:
+            employees = employeeimport.read_records(path)
+        return self.insert_many(employees, confirmationProvider, batch_size=batch_size, row_count=row_count)
+
+    def validate_records(self, records, pipeline=None):
+        """Generator which checks records with a ValidationPipeline (see employeevalidation) and yields
+        the clean ones as Employees, eg: to pass to insert_many. Each chunk's records are looked up in
+        the EmployeeUoB table together, through a temporary table joined against its email and name
+        indexes. Like iter_all, a connection is held until the generator is exhausted or closed.
+
+        Args:
+            records (Iterable[dict]): The records, eg: from employeeimport.iter_records
+            pipeline (ValidationPipeline, optional): The pipeline to use, whose counts attribute says how
+            many records were rejected, and why, afterwards. Defaults to one with no reject report.
+
+        Yields:
+            Employee: Each record which is valid and not a duplicate
+        """
+        import employeevalidation  # the process pool is only needed when validating
+
+        pipeline = pipeline or employeevalidation.ValidationPipeline()
+        conn = None
+        try:
+            conn = self.pool.acquire() if self.pool is not None else self._connect()
+            cur = conn.cursor()
+            cur.execute(self.sql_create_validation_keys)
+
+            def find_existing(keys):
+                cur.execute(self.sql_clear_validation_keys)
+                cur.executemany(self.sql_stage_validation_key, keys)
+                # Only the temporary database is written, so this takes no lock on EmployeeUoB
+                conn.commit()
+                return dict(cur.execute(self.sql_find_existing_keys).fetchall())
+
+            yield from pipeline.validate(records, find_existing)
+
+        except Exception as e:
+            self.report_error(e)
+        finally:
+            if conn is not None and self.pool is None:
+                conn.close()
+
+    @instrumented
+    def export_file(self, path: str, columns=None, employee_filter: EmployeeFilter = None, format: str = None,
+                    batch_size: int = 10000):
+        """Streams Employees straight from the query into a CSV, JSONL, Arrow or Parquet file (see
+        employeeexport), batch_size rows at a time, without creating Employee objects. The rows are
+        read in a single query, so the file is a consistent snapshot of the table.
+
+        Args:
+            path (str): The file to write; the format is chosen by its extension (.csv, .jsonl, .ndjson,
+            .arrow, .feather or .parquet) unless format is given. Arrow and Parquet need pyarrow.
+            columns (list[str], optional): Columns to export, by column or Employee attribute name.
+            Defaults to Id, Title, Forename, Surname, EmailAddress and Salary.
+            employee_filter (EmployeeFilter, optional): Only export the Employees it selects. Defaults to all.
+            format (str, optional): "csv", "jsonl", "arrow" or "parquet"
+            batch_size (int, optional): Rows fetched and written at a time. For Arrow and Parquet this is
+            the record batch or row group size. Defaults to 10000.
+
+        Returns:
+            int: The number of Employees exported, or None if the export failed
+        """
+        import employeeexport  # csv and json (and pyarrow) are only needed when exporting
+
+        exported = None
+        try:
+            columns = employeeexport.resolve_columns(columns)
+            self.get_connection(read_only=True)
+            employee_filter = employee_filter or EmployeeFilter()
+            employee_filter.prepare(self.cur)
+            condition, params = employee_filter.condition()
+            self.cur.execute(employeeexport.select_sql(columns, condition), params)
+            chunks = iter(lambda: self.cur.fetchmany(batch_size), [])
+            exported = employeeexport.write_export(chunks, columns, path, format)
+
+        except Exception as e:
+            self.report_error(e)
+        finally:
+            self.release_connection()
+            return exported
+
+    @instrumented
     def select_all(self):
         """Fuction which selects all Employees from the EmployeeUoB table
 
@@ -123,42 +853,265 @@ class DBOperations:
             list[Employee]: A list of all Employee objects in the EmployeeUoB table.
         """        
         try:
-            self.get_connection()
+            self.get_connection(read_only=True)
+            self.cur.row_factory = employee_row_factory
             self.cur.execute(self.sql_select_all)
 
-            results = [Employee.from_db_result(r) for r in self.cur.fetchall()]
+            results = self.cur.fetchall()
 
             return results
 
         except Exception as e:
-            print(e)
+            self.report_error(e)
         finally:
-            self.conn.close()
+            self.release_connection()
+
+    def iter_all(self, chunk_size: int = 1000):
+        """Generator which yields every Employee in the EmployeeUoB table, fetching chunk_size rows
+        from the database at a time so that memory use does not grow with the size of the table.
+
+        Note: the query stays open until the generator is exhausted or closed. Use iter_pages when
+        the caller may pause between rows (eg: waiting for the user), so that no read is held open.
+
+        Args:
+            chunk_size (int, optional): Number of rows fetched per fetchmany call. Defaults to 1000.
+
+        Yields:
+            Employee: Each Employee, in table order
+        """
+        if self.replica is not None:
+            # Pages, so that the replica isn't held while the caller works through the rows
+            for page in self.iter_pages(chunk_size):
+                yield from page
+            return
+
+        conn = None
+        try:
+            conn = self.pool.acquire() if self.pool is not None else self._connect()
+            cur = conn.cursor()
+            cur.row_factory = employee_row_factory
+            cur.execute(self.sql_select_all)
+
+            while True:
+                rows = cur.fetchmany(chunk_size)
+                if not rows:
+                    break
+                yield from rows
+
+        except Exception as e:
+            self.report_error(e)
+        finally:
+            if conn is not None and self.pool is None:
+                conn.close()
+
+    @instrumented
+    def select_page(self, after_id: int = 0, limit: int = 100):
+        """Function which selects one page of Employees, ordered by Id, using keyset pagination.
+        Each page is found through the primary key, so fetching a late page costs the same as
+        fetching the first.
+
+        Args:
+            after_id (int, optional): Only return Employees with an Id greater than this. Pass the 
+            Id of the last Employee on the previous page to get the next page. Defaults to 0.
+            limit (int, optional): Maximum number of Employees in the page. Defaults to 100.
+
+        Returns:
+            list[Employee]: The page of Employees, which is empty after the last page.
+        """
+        try:
+            self.get_connection(read_only=True)
+            self.cur.row_factory = employee_row_factory
+            self.cur.execute(self.sql_select_page, (after_id, limit))
+
+            results = self.cur.fetchall()
+
+            return results
+
+        except Exception as e:
+            self.report_error(e)
+        finally:
+            self.release_connection()
 
-    def search_data_name(self, term):
+    def iter_pages(self, page_size: int = 100, after_id: int = 0):
+        """Generator which pages through the EmployeeUoB table with select_page. Nothing is held 
+        open between pages, so the caller can take as long as it likes over each one.
+
+        Args:
+            page_size (int, optional): Number of Employees per page. Defaults to 100.
+            after_id (int, optional): Start after the Employee with this Id. Defaults to 0.
+
+        Yields:
+            list[Employee]: Each page of Employees
+        """
+        while True:
+            page = self.select_page(after_id, page_size)
+            if not page:
+                return
+            yield page
+            if len(page) < page_size:
+                return
+            after_id = page[-1].id
+
+    @instrumented
+    def search_data_name(self, term, mode: str = "auto", limit: int = None):
         """Function searches for the search term within the Forename and Surname fields 
         of entries in the EmployeeUoB tablem returning the results in a list
 
         Args:
             term (str): the search term
+            mode (str, optional): "fts" searches the full-text index (see create_search_index), returning
+            the best matches first, and needs a term of at least three characters.
+            "like" scans the table with LIKE, which also works for terms shorter than three characters
+            and on databases without the index. "auto" uses "fts" when it can and "like" otherwise.
+            "prefix" finds Surnames starting with the term, in name order, through the (Surname, Forename)
+            index. "fuzzy" finds names spelt like or sounding like the term through the name key index
+            (see create_name_key_index), closest first; see search_data_name_fuzzy. Defaults to "auto".
+            limit (int, optional): Maximum number of results to return. Defaults to no limit.
 
         Returns:
-            list[Employee]: A list of Employees where the search term appears in Forename or Surbane fields.
+            list[Employee]: A list of Employees where the search term appears in Forename or Surbane fields;
+            or None if mode is unknown, or is "fts" and the term is shorter than three characters or the
+            search index hasn't been created
         """        
         try:
-            self.get_connection()
+            if mode not in self.search_modes:
+                raise ValueError(f"Unknown search mode {mode!r}, expected one of {', '.join(self.search_modes)}")
+            if mode == "fts" and len(term) < 3:
+                raise ValueError("Full-text search needs a term of at least three characters")
+            if mode == "fuzzy":
+                return self.search_data_name_fuzzy(term, limit)
+            if mode == "fts" and not self.search_index_exists():
+                raise ValueError("Full-text search needs the search index, see create_search_index")
+            use_index = mode in ("auto", "fts") and len(term) >= 3 and self.search_index_exists()
+            if limit is None:
+                limit = -1
 
-            term = "%" + term + "%"
+            self.get_connection(read_only=True)
+
+            if mode == "prefix":
+                term = term + "%"
+                result = self.cached_rows(("prefix", term, limit), self.sql_search_surname_prefix, (term, limit))
+            elif use_index:
+                query = '{Forename Surname} : "' + term.replace('"', '""') + '"'
+                result = self.cached_rows(("fts", query, limit), self.sql_search_name_fts, (query, limit))
+            else:
+                term = "%" + term + "%"
+                result = self.cached_rows(("like", term, limit), self.sql_search_name, (term, term, limit))
 
-            self.cur.execute(self.sql_search_name, (term, term))
-            result = [Employee.from_db_result(r) for r in self.cur.fetchall()]
             return result
 
         except Exception as e:
-            print(e)
+            self.report_error(e)
         finally:
-            self.conn.close()
+            self.release_connection()
+
+    @instrumented
+    def search_data_name_fuzzy(self, term, limit: int = None):
+        """Finds Employees whose names are spelt like, or sound like, the search term, eg: "Jon Smtih"
+        finds John Smith. Through the name key index (see create_name_key_index), each word of the term
+        is compared with the (at most fuzzy_candidates) words of names sharing the most Soundex, Metaphone
+        and trigram keys with it, and matches those within namekeys.max_word_distance edits or with the
+        same Metaphone code. Then the Employees whose names have a match for every word of the term are
+        fetched, closest matches first, only reading as many as are needed for limit results. Employees
+        written since the index was last updated are added to it first (see update_name_key_index). That
+        needs the write lock: if another connection holds it for longer than the busy timeout, or the
+        database is read-only, the search goes ahead with the index as it stands, so Employees written
+        since the last update may be missing from the results.
+
+        Args:
+            term (str): the search term
+            limit (int, optional): Maximum number of results to return. Defaults to no limit.
+
+        Returns:
+            list[Employee]: The matching Employees, closest first (by the edit distances of the words of
+            the term from the words they matched, added up), then in Id order; or None if the name key
+            index hasn't been created
+        """
+        try:
+            words = namekeys.name_words(term)
+            if not words:
+                return []
+            if not self.name_key_index_exists():
+                raise ValueError("Fuzzy name search needs the name key index, see create_name_key_index")
+            if limit == 0:
+                return []
+            self.update_name_key_index(best_effort=True)
+
+            self.get_connection(read_only=True)
+            # {word of a name: edit distance} for each word of the term
+            matches = []
+            for word in words:
+                params = (namekeys.metaphone_key_prefix + namekeys.metaphone(word), namekeys.name_word_keys(word),
+                          self.fuzzy_candidates)
+                candidates = self.conn.execute(self.sql_fuzzy_name_words, params).fetchall()
+                found = namekeys.close_words(word, candidates, namekeys.max_word_distance(word))
+                if not found:
+                    return []
+                matches.append(found)
 
+            distances = {}
+
+            def distance(employee):
+                # Names are often shared, so each is only compared once
+                name = (employee.forename, employee.surname)
+                if name not in distances:
+                    name_words = set(namekeys.name_words(employee.forename) + namekeys.name_words(employee.surname))
+                    distances[name] = sum(min((found[w] for w in name_words if w in found), default=math.inf)
+                                          for found in matches)
+                return distances[name]
+
+            # The matches of each word of the term, grouped by distance, are combined in every way, closest
+            # first. The Employees with a word from each group of a combination are fetched in Id order, up
+            # to limit (not counting any fetched before), stopping once there are enough results which are
+            # closer than anything left to fetch.
+            groups = [{} for _ in matches]
+            for group, found in zip(groups, matches):
+                for word, d in found.items():
+                    group.setdefault(d, []).append(word)
+            counts = {}
+
+            def count_employees(word_list, most):
+                # A count which stopped at most is only known to be at least that
+                key = json.dumps(word_list)
+                known = counts.get(key)
+                if known is None or known[1] and (most < 0 or known[0] < most):
+                    count = self.conn.execute(self.sql_count_name_words, (key, most)).fetchone()[0]
+                    known = counts[key] = (count, 0 <= most <= count)
+                return known[0]
+
+            results = []
+            seen = set()
+            for combination in sorted(itertools.product(*map(sorted, groups)), key=sum):
+                if limit is not None and len(results) >= limit and sorted(results)[limit - 1][0] < sum(combination):
+                    break
+                word_lists = [group[d] for group, d in zip(groups, combination)]
+                first = word_lists[0]
+                if len(word_lists) > 1:
+                    # Fetched through the list matching fewest Employees. Longer words usually match fewer,
+                    # so are counted first, and each count stops at the lowest so far.
+                    fewest = -1
+                    for word_list in sorted(word_lists, key=lambda w: -len(w[0])):
+                        count = count_employees(word_list, fewest)
+                        if fewest < 0 or count < fewest:
+                            first, fewest = word_list, count
+                others = json.dumps([w for w in word_lists if w is not first])
+                first = json.dumps(first)
+                fetch = -1 if limit is None else limit + len(seen)
+                for employee in self.cached_rows(("fuzzy", first, others, fetch), self.sql_search_name_words,
+                                                 (first, others, fetch)):
+                    if employee.id not in seen:
+                        seen.add(employee.id)
+                        results.append((distance(employee), employee.id, employee))
+
+            results.sort(key=lambda r: r[:2])
+            return [r[-1] for r in results[:limit]]
+
+        except Exception as e:
+            self.report_error(e)
+        finally:
+            self.release_connection()
+
+    @instrumented
     def search_data_id(self, search_term: int):
         """Function searches for Employee with the supplied Id in EmployeeUoB table.
 
@@ -169,17 +1122,39 @@ class DBOperations:
             Employee: The matching Employee if it exists. returns None if no match.
         """        
         try:
-            self.get_connection()
+            self.get_connection(read_only=True)
 
-            self.cur.execute(self.sql_search_id, (search_term,))
-            result = Employee.from_db_result(self.cur.fetchone())
-            return result
+            result = self.cached_rows(("id", search_term), self.sql_search_id, (search_term,))
+            return result[0] if result else None
 
         except Exception as e:
-            print(e)
+            self.report_error(e)
         finally:
-            self.conn.close()
+            self.release_connection()
+
+    @instrumented
+    def search_data_email(self, email: str):
+        """Function searches for the Employee with the supplied email address (ignoring case) in the
+        EmployeeUoB table, using its unique index on EmailAddress.
 
+        Args:
+            email (str): The email address to search for.
+
+        Returns:
+            Employee: The matching Employee if it exists. returns None if no match.
+        """
+        try:
+            self.get_connection(read_only=True)
+
+            result = self.cached_rows(("email", email.lower()), self.sql_search_email, (email,))
+            return result[0] if result else None
+
+        except Exception as e:
+            self.report_error(e)
+        finally:
+            self.release_connection()
+
+    @instrumented
     def update_data(self, employee: Employee, confirmationProvider: UserConfirmationProvider):
         """Updates an existing Employee in the EmployeeUoB table
 
@@ -193,25 +1168,29 @@ class DBOperations:
         """        
         success = False
         try:
+            values = self.employee_values(employee)
             self.get_connection()
 
-            self.cur.execute(self.sql_update_data,
-                             employee.to_tuple(include_id=True))
-
             self.cur.execute(self.sql_search_id, (employee.id,))
-            updated_employee = Employee.from_db_result(self.cur.fetchone())
+            current_row = self.cur.fetchone()
 
-            if confirmationProvider.requestConfirmation(updated_employee):
-                self.conn.commit()
-                success = True
+            if current_row is not None and confirmationProvider.requestConfirmation(employee):
+                self.lock_write()
+                self.cur.execute(self.sql_update_data, values + current_row)
+                if self.cur.fetchall():
+                    self.commit()
+                    success = True
+                else:
+                    self.report_conflict()
 
         except Exception as e:
-            print(e)
+            self.report_error(e)
 
         finally:
-            self.conn.close()
+            self.release_connection()
             return success
 
+    @instrumented
     def delete_data(self, id: int, confirmationProvider: UserConfirmationProvider):
         """Function which deletes the Employee with given Id from the EmployeeUoB table.
 
@@ -228,21 +1207,24 @@ class DBOperations:
             self.get_connection()
 
             self.cur.execute(self.sql_search_id, (id,))
-            deleted_employee = Employee.from_db_result(self.cur.fetchone())
-            self.cur.execute(self.sql_delete_data, (id,))
+            current_row = self.cur.fetchone()
 
-            if confirmationProvider.requestConfirmation(deleted_employee):
-                self.conn.commit()
-                success = True
-            else:
-                self.con.rollback()
+            if current_row is not None and confirmationProvider.requestConfirmation(Employee.from_db_result(current_row)):
+                self.lock_write()
+                self.cur.execute(self.sql_delete_data, current_row)
+                if self.cur.fetchall():
+                    self.commit()
+                    success = True
+                else:
+                    self.report_conflict()
 
         except Exception as e:
-            print(e)
+            self.report_error(e)
         finally:
-            self.conn.close()
+            self.release_connection()
             return success
 
+    @instrumented
     def adjust_pay(self, id: int, percentage_increase: float, confirmationProvider: UserConfirmationProvider):
         """Funcion which adjusts the pay of the Employee with given Id, by a defined percentage.
 
@@ -258,48 +1240,518 @@ class DBOperations:
         success = False
         try:
             self.get_connection()
-            self.cur.execute(self.sql_salary_adjustment,
+            self.cur.execute(self.sql_preview_salary_adjustment,
                              (1 + percentage_increase / 100, id))
+            preview_row = self.cur.fetchone()
 
-            self.cur.execute(self.sql_search_id, (id,))
-            updated_employee = Employee.from_db_result(self.cur.fetchone())
+            if preview_row is not None:
+                current_row = preview_row[:6]
+                updated_employee = Employee.from_db_result(current_row[:5] + preview_row[6:])
 
-            if confirmationProvider.requestConfirmation(updated_employee):
-                self.conn.commit()
-                success = True
-            else:
-                self.conn.rollback()
+                if confirmationProvider.requestConfirmation(updated_employee):
+                    self.lock_write()
+                    self.cur.execute(self.sql_salary_adjustment,
+                                     (1 + percentage_increase / 100,) + current_row)
+                    if self.cur.fetchall():
+                        self.commit()
+                        success = True
+                    else:
+                        self.report_conflict()
 
         except Exception as e:
-            print(e)
+            self.report_error(e)
         finally:
-            self.conn.close()
+            self.release_connection()
             return success
 
-    def adjust_pay_all_employees(self, percentage_increase: float, confirmationProvider: UserConfirmationProvider):
+    @instrumented
+    def adjust_pay_all_employees(self, percentage_increase: float, confirmationProvider: UserConfirmationProvider,
+                                 preview_size: int = 10):
         
         """Adjust the pay of all Employees in the EmployeeUoB table by a defined percentage (-99% to +inf%). 
         Useful when awarding an annual pay increase, in line with inflation like all good employers do :) Range
 
+        The confirmation is given a ChangePreview with the number of Employees, the payroll totals before
+        and after, and the first preview_size adjusted Employees, rather than the whole table.
+
         Returns:
             bool: Success
         """        
         success = False
         try:
             self.get_connection()
-            self.cur.execute(self.sql_salary_adjustment_all,
-                             (1 + percentage_increase / 100,))
+            factor = 1 + percentage_increase / 100
 
-            self.cur.execute(self.sql_select_all)
-            updated_employees = [Employee.from_db_result(
-                r) for r in self.cur.fetchall()]
+            self.cur.execute(self.sql_salary_adjustment_all_totals, (factor,))
+            totals = self.cur.fetchall()
+            version = self.data_version()
+            row_count, payroll_before, payroll_after = totals[0]
 
-            if confirmationProvider.requestConfirmation(updated_employees):
-                self.conn.commit()
-                success = True
+            preview_cur = self.conn.cursor()
+            preview_cur.row_factory = employee_row_factory
+            preview_cur.execute(self.sql_preview_salary_adjustment_all, (factor, preview_size))
+            preview = ChangePreview(row_count, preview_cur.fetchall(), {
+                "Payroll before": round(payroll_before, 2),
+                "Payroll after": round(payroll_after, 2),
+            })
+
+            if confirmationProvider.requestConfirmation(preview):
+                if self.begin_write(version, self.sql_salary_adjustment_all_totals, (factor,), totals):
+                    self.cur.execute(self.sql_salary_adjustment_all, (factor,))
+                    self.commit()
+                    success = True
 
         except Exception as e:
-            print(e)
+            self.report_error(e)
         finally:
-            self.conn.close()
+            self.release_connection()
             return success
+
+    @instrumented
+    def adjust_pay_bulk(self, rules, confirmationProvider: UserConfirmationProvider,
+                        employee_filter: EmployeeFilter = None, preview_size: int = 10):
+        """Adjusts the pay of many Employees at once, by different percentages according to a table of
+        tiered rules, in a single UPDATE statement and transaction.
+
+        Each Employee selected by employee_filter has their pay adjusted by the first rule which matches
+        them; Employees who match no rule are left unchanged. The confirmation is given a ChangePreview 
+        with the number of Employees affected, the payroll totals before and after, the smallest and 
+        largest change to an individual's pay, and the first preview_size adjusted Employees.
+
+        Args:
+            rules (list[PayRule]): The tiers of the adjustment, in order of precedence
+            confirmationProvider (UserConfirmationProvider): A UserConfirmationProvider which can be
+            used by the function to get user confirmation that the change can be commited.
+            employee_filter (EmployeeFilter, optional): Which Employees may be adjusted. Defaults to everyone.
+            preview_size (int, optional): Number of adjusted Employees shown in the preview. Defaults to 10.
+
+        Returns:
+            int: The number of Employees whose pay was adjusted
+        """
+        adjusted = 0
+        try:
+            if not rules:
+                raise ValueError("No pay rules given")
+
+            employee_filter = employee_filter or EmployeeFilter()
+            factor_sql, factor_params = pay_factor_expression(rules)
+            condition_sql, condition_params = employee_filter.condition()
+            params = factor_params + condition_params
+
+            def sql(template):
+                return template.format(factor=factor_sql, condition=condition_sql)
+
+            self.get_connection()
+            employee_filter.prepare(self.cur)
+
+            self.cur.execute(sql(self.sql_pay_adjustment_totals), params)
+            totals = self.cur.fetchall()
+            version = self.data_version()
+            row_count, payroll_before, payroll_after, smallest_change, largest_change = totals[0]
+
+            if row_count:
+                preview_cur = self.conn.cursor()
+                preview_cur.row_factory = employee_row_factory
+                preview_cur.execute(sql(self.sql_preview_pay_adjustment), params + (preview_size,))
+                preview = ChangePreview(row_count, preview_cur.fetchall(), {
+                    "Payroll before": round(payroll_before, 2),
+                    "Payroll after": round(payroll_after, 2),
+                    "Smallest change": round(smallest_change, 2),
+                    "Largest change": round(largest_change, 2),
+                })
+
+                if confirmationProvider.requestConfirmation(preview):
+                    if self.begin_write(version, sql(self.sql_pay_adjustment_totals), params, totals):
+                        self.cur.execute(sql(self.sql_pay_adjustment), params + factor_params)
+                        adjusted = self.cur.rowcount
+                        self.commit()
+
+        except Exception as e:
+            self.report_error(e)
+        finally:
+            self.release_connection()
+            return adjusted
+
+    @instrumented
+    def latest_change_cursor(self):
+        """Finds the cursor of the newest change in the change log. A reader starting to follow the log
+        should read this first, then load the whole table (eg: with iter_pages), then apply
+        changes_since(cursor): changes made while the table was being loaded are then seen twice at
+        worst, never missed.
+
+        Returns:
+            int: The cursor, or None if it couldn't be read
+        """
+        try:
+            self.get_connection()
+            return self.cur.execute(self.sql_latest_change).fetchone()[0]
+
+        except Exception as e:
+            self.report_error(e)
+        finally:
+            self.release_connection()
+
+    @instrumented
+    def changes_since(self, cursor: int = 0, limit: int = 1000):
+        """Fetches the changes made to the EmployeeUoB table after the given cursor, oldest first, at
+        most limit at a time. Because old changes may have been compacted (see compact_change_log), a
+        reader should treat "insert" and "update" alike, as the latest values of the Employee.
+
+        Args:
+            cursor (int, optional): The cursor of the last change already processed (ChangeBatch.cursor
+            from the previous call, or latest_change_cursor()). Defaults to 0, the start of the log.
+            limit (int, optional): Maximum number of changes returned. Defaults to 1000.
+
+        Returns:
+            ChangeBatch: The changes, the cursor to continue from, whether there are more and whether
+            any were lost to retention. None if the changes couldn't be read.
+        """
+        try:
+            self.get_connection()
+            # One read transaction, so that a compaction can't run between the two queries
+            self.cur.execute(self.sql_begin_read)
+            purged_through = self.cur.execute(self.sql_change_log_purged).fetchone()[0]
+            self.cur.row_factory = change_row_factory
+            changes = self.cur.execute(self.sql_select_changes, (cursor, limit + 1)).fetchall()
+            self.conn.commit()
+
+            more = len(changes) > limit
+            changes = changes[:limit]
+            return ChangeBatch(changes, changes[-1].seq if changes else cursor, more, cursor < purged_through)
+
+        except Exception as e:
+            self.report_error(e)
+        finally:
+            self.release_connection()
+
+    @instrumented
+    def compact_change_log(self, max_age_seconds: float = None, max_changes: int = None):
+        """Stops the change log growing without bound. Superseded changes (those followed by a later
+        change to the same Employee) are always removed, which readers can't notice since they only need
+        each Employee's latest values. Then, if limits are given, the oldest remaining changes are removed
+        until the log holds no changes older than max_age_seconds and no more than max_changes changes;
+        readers whose cursor is older than those will find their next ChangeBatch truncated.
+
+        Args:
+            max_age_seconds (float, optional): Remove changes made longer ago than this. Defaults to None.
+            max_changes (int, optional): Keep at most this many of the most recent changes. Defaults to None.
+
+        Returns:
+            dict: The number of superseded and expired changes removed, or None if compaction failed
+        """
+        try:
+            self.get_connection()
+            self.lock_write()
+            superseded = self.cur.execute(self.sql_delete_superseded_changes).rowcount
+
+            purge_through = None
+            if max_age_seconds is not None:
+                purge_through = self.cur.execute(self.sql_last_change_before, (max_age_seconds,)).fetchone()[0]
+            if max_changes is not None:
+                beyond = self.cur.execute(self.sql_last_change_beyond, (max_changes,)).fetchone()
+                if beyond is not None:
+                    purge_through = max(purge_through or 0, beyond[0])
+
+            expired = 0
+            if purge_through:
+                expired = self.cur.execute(self.sql_delete_changes_through, (purge_through,)).rowcount
+                self.cur.execute(self.sql_set_change_log_purged, (purge_through,))
+            self.conn.commit()
+            return {"superseded": superseded, "expired": expired}
+
+        except Exception as e:
+            self.report_error(e)
+        finally:
+            self.release_connection()
+
+    @staticmethod
+    def sync_row(record, key: str):
+        """Turns a feed record into a row of the sync staging table.
+
+        Args:
+            record (dict | Employee): A record read from the feed (with the fields accepted by
+            Employee.from_record, and optionally ExternalId), or an Employee
+            key (str): "email" or "external_id"
+
+        Returns:
+            tuple: (key value, title, forename, surname, email, salary in cents, external id). The key
+            value is empty if the record has no email address or external id to match on. None if the
+            record's salary isn't an amount.
+        """
+        if isinstance(record, Employee):
+            employee, external_id = record, None
+        else:
+            employee = Employee.from_record(record)
+            fields = {name.lower(): value for name, value in record.items()}
+            external_id = fields.get("externalid", fields.get("external_id"))
+        try:
+            salary = salary_cents(employee.salary)
+        except ValueError:
+            return None
+        email = str(employee.email or "").strip()
+        external_id = str(external_id).strip() or None if external_id is not None else None
+        return ((email if key == "email" else external_id), employee.title, employee.forename, employee.surname,
+                email, salary, external_id)
+
+    @instrumented
+    def sync_records(self, records, confirmationProvider: UserConfirmationProvider, key: str = "email",
+                     delete_missing: bool = False, batch_size: int = 5000, preview_size: int = 10):
+        """Brings the EmployeeUoB table into line with a full extract from an external system (eg: an HR
+        feed), writing only the rows which actually change.
+
+        The records are streamed into a temporary staging table, batch_size at a time, and compared with
+        the table in SQL. Records whose Employee doesn't exist are inserted and records which differ from
+        their Employee are updated, with a single INSERT ... ON CONFLICT DO UPDATE statement which leaves
+        unchanged rows untouched. With delete_missing, Employees who can be matched (they have an email
+        address, or an ExternalId) but are not in the feed are deleted. The confirmation is given a
+        ChangePreview with the counts of each and the first preview_size new or changed Employees, and
+        everything is written in one transaction.
+
+        Records are matched on EmailAddress (ignoring case) or on ExternalId. Records without a value to
+        match on are skipped, and if the same value appears more than once the last record wins. With
+        external_id keys, records whose email address is also in another record, or belongs to another
+        Employee, are rejected; so existing Employees should first be given their ExternalIds, by syncing
+        a feed which includes them on email addresses. Records whose salary isn't an amount (see
+        employee.parse_salary) are rejected too.
+
+        Args:
+            records (Iterable[dict | Employee]): The feed, eg: employeeimport.iter_records(path)
+            confirmationProvider (UserConfirmationProvider): Asked once, if there is anything to change
+            key (str, optional): "email" or "external_id". Defaults to "email".
+            delete_missing (bool, optional): Delete matchable Employees missing from the feed. Defaults to False.
+            batch_size (int, optional): Number of records staged per executemany call. Defaults to 5000.
+            preview_size (int, optional): Number of Employees shown in the preview. Defaults to 10.
+
+        Returns:
+            dict: Counts of the Employees inserted, updated, unchanged and deleted, and of the records
+            skipped, superseded by a later duplicate and rejected. None if the sync was declined, found
+            the table changed by another user after the preview, or failed.
+        """
+        report = None
+        try:
+            if key not in self.sync_keys:
+                raise ValueError(f"Unknown sync key {key!r}, expected one of {', '.join(self.sync_keys)}")
+            key_column, present, collation = self.sync_keys[key]
+
+            self.get_connection()
+            self.cur.execute(self.sql_drop_sync_staging)
+            self.cur.execute(self.sql_create_sync_staging.format(collation=collation))
+
+            staged = skipped = rejected = 0
+            rows = (self.sync_row(r, key) for r in records)
+            while True:
+                batch = list(itertools.islice(rows, batch_size))
+                if not batch:
+                    break
+                valid = [row for row in batch if row is not None]
+                keyed = [row for row in valid if row[0]]
+                self.cur.executemany(self.sql_stage_sync_record, keyed)
+                staged += len(keyed)
+                skipped += len(valid) - len(keyed)
+                rejected += len(batch) - len(valid)
+            duplicates = staged - self.cur.execute(self.sql_count_sync_staging).fetchone()[0]
+
+            if key == "external_id":
+                rejected += self.cur.execute(self.sql_reject_sync_shared_emails).rowcount
+                rejected += self.cur.execute(self.sql_reject_sync_taken_emails).rowcount
+            # Only the temporary database has been written so far, so this takes no lock on EmployeeUoB
+            self.conn.commit()
+
+            counts_sql = self.sql_sync_counts.format(key=key_column, present=present)
+            totals = self.cur.execute(counts_sql).fetchall()
+            version = self.data_version()
+            inserts, updates, unchanged, missing = totals[0]
+            deletes = missing if delete_missing else 0
+            counts = {"inserted": inserts, "updated": updates, "unchanged": unchanged, "deleted": deletes,
+                      "skipped": skipped, "duplicates": duplicates, "rejected": rejected}
+
+            if inserts + updates + deletes == 0:
+                report = counts
+            else:
+                preview_cur = self.conn.cursor()
+                preview_cur.row_factory = employee_row_factory
+                preview_cur.execute(self.sql_sync_preview.format(key=key_column, present=present), (preview_size,))
+                preview = ChangePreview(inserts + updates + deletes, preview_cur.fetchall(), {
+                    "Inserts": inserts, "Updates": updates, "Deletes": deletes, "Unchanged": unchanged,
+                })
+
+                if confirmationProvider.requestConfirmation(preview):
+                    if self.begin_write(version, counts_sql, (), totals):
+                        if delete_missing:
+                            self.cur.execute(self.sql_sync_delete_missing.format(key=key_column, present=present))
+                        self.cur.execute(self.sql_sync_upsert.format(key=key_column, present=present))
+                        self.commit()
+                        report = counts
+
+            self.cur.execute(self.sql_drop_sync_staging)
+
+        except Exception as e:
+            self.report_error(e)
+        finally:
+            self.release_connection()
+            return report
+
+    @instrumented
+    def sync_file(self, path: str, confirmationProvider: UserConfirmationProvider, key: str = "email",
+                  delete_missing: bool = False, batch_size: int = 5000):
+        """Syncs the EmployeeUoB table with a CSV or JSONL extract using sync_records.
+
+        Args:
+            path (str): Path to a .csv, .jsonl or .ndjson file
+
+        Returns:
+            dict: The counts reported by sync_records, or None
+        """
+        import employeeimport
+
+        try:
+            records = employeeimport.iter_records(path)
+        except Exception as e:
+            self.report_error(e)
+            return None
+
+        return self.sync_records(records, confirmationProvider, key, delete_missing, batch_size)
+
+    @instrumented
+    def backup(self, target_path: str, pages: int = 256, sleep: float = 0.05, progress=None, max_restarts: int = 10):
+        """Copies the database to target_path while it is in use, with sqlite3's online backup API.
+
+        The copy is made pages pages at a time, and the read lock on the database is released for sleep
+        seconds between steps, so writers are only ever held up for one step. If another connection
+        writes to the database during the copy, SQLite starts the copy again from the beginning; after
+        max_restarts restarts the rest is copied in one step so that a busy database is still backed up
+        (holding writers up for that step, unless the database is in WAL mode).
+        The copy is written to target_path + ".partial" and only moved into place once complete, so
+        target_path never holds a torn copy.
+
+        Args:
+            target_path (str): The file to write the copy to. It is replaced if it exists.
+            pages (int, optional): Pages copied per step; 0 or less copies everything in one step.
+            Defaults to 256.
+            sleep (float, optional): Seconds to wait between steps. Defaults to 0.05.
+            progress (callable, optional): Called after each step with (pages copied, total pages).
+            max_restarts (int, optional): Restarts allowed before copying in one step. Defaults to 10.
+
+        Returns:
+            dict: The number of pages copied, the number of times the copy restarted and the time
+            taken in seconds, or None if the backup failed.
+        """
+        partial_path = target_path + ".partial"
+        source = target = None
+        result = None
+        try:
+            start = time.perf_counter()
+            source = self._connect()
+            target = sqlite3.connect(partial_path)
+            steps = {"remaining": None, "total": 0, "restarts": 0}
+
+            def on_step(status, remaining, total):
+                if steps["remaining"] is not None and remaining > steps["remaining"]:
+                    steps["restarts"] += 1
+                steps["remaining"], steps["total"] = remaining, total
+                if progress is not None:
+                    progress(total - remaining, total)
+                if steps["restarts"] > max_restarts and remaining:
+                    raise _BackupRestarted()
+
+            try:
+                source.backup(target, pages=pages if pages > 0 else -1, progress=on_step, sleep=sleep)
+            except _BackupRestarted:
+                source.backup(target, progress=on_step)
+            target.close()
+            target = None
+            os.replace(partial_path, target_path)
+            result = {"pages": steps["total"], "restarts": steps["restarts"],
+                      "seconds": round(time.perf_counter() - start, 3)}
+
+        except Exception as e:
+            self.report_error(e)
+        finally:
+            for conn in (source, target):
+                if conn is not None:
+                    conn.close()
+            if result is None and os.path.exists(partial_path):
+                os.remove(partial_path)
+            return result
+
+    def _skip_change_log_past(self, cursor: int):
+        """Marks every change log cursor up to one past cursor (and past the newest change now in the log)
+        as purged, and makes the next change come after it.
+        """
+        try:
+            self.get_connection()
+            if self.cur.execute(self.sql_check_table_exists, ("EmployeeUoB_changes",)).fetchone():
+                self.cur.execute(self.sql_begin_write)
+                skip_to = max(cursor, self.cur.execute(self.sql_latest_change).fetchone()[0]) + 1
+                self.cur.execute(self.sql_set_change_log_purged, (skip_to,))
+                if self.cur.execute(self.sql_set_change_log_sequence, (skip_to,)).rowcount == 0:
+                    self.cur.execute(self.sql_insert_change_log_sequence, (skip_to,))
+                self.commit()
+
+        except Exception as e:
+            self.report_error(e)
+        finally:
+            self.release_connection()
+
+    @instrumented
+    def restore(self, source_path: str, confirmationProvider: UserConfirmationProvider):
+        """Replaces the contents of the database with a backup (eg: one made by backup), after checking
+        that the backup is intact and asking for confirmation. The restore is done in a single step, so
+        other connections see either the old database or the restored one. If the backup has an older
+        schema version it is then upgraded. This is allowed even when an earlier upgrade failed.
+        The change log's cursors carry on from past the newest one before the restore, and every older
+        cursor is marked as purged, so readers of changes_since see truncated=True and reload the table.
+
+        Args:
+            source_path (str): The backup file
+            confirmationProvider (UserConfirmationProvider): Given a ChangePreview with the number of
+            Employees in the backup and in the database now.
+
+        Returns:
+            bool: Success
+        """
+        success = False
+        source = None
+        latest_change = None
+        try:
+            if not os.path.exists(source_path):
+                raise FileNotFoundError(f"No backup at {source_path}")
+            source = sqlite3.connect(f"file:{source_path}?mode=ro", uri=True)
+            check = source.execute(self.sql_quick_check).fetchone()[0]
+            if check != "ok":
+                raise ValueError(f"{source_path} is damaged: {check}")
+            backup_count = source.execute(self.sql_count_employees).fetchone()[0]
+
+            self._open_connection()
+            current_count = (self.cur.execute(self.sql_count_employees).fetchone()[0]
+                             if self.cur.execute(self.sql_check_table_exists, (self.employee_table_name,)).fetchone()
+                             else 0)
+            if self.cur.execute(self.sql_check_table_exists, ("EmployeeUoB_changes",)).fetchone():
+                latest_change = self.cur.execute(self.sql_latest_change).fetchone()[0]
+            preview = ChangePreview(backup_count, [], {
+                "Employees in backup": backup_count,
+                "Employees now": current_count,
+            })
+
+            if confirmationProvider.requestConfirmation(preview):
+                source.backup(self.conn)
+                self._search_index_available = False
+                self._name_key_index_available = False
+                if self.cache is not None:
+                    self.cache.invalidate()
+                success = True
+
+        except Exception as e:
+            self.report_error(e)
+        finally:
+            if source is not None:
+                source.close()
+            self.release_connection()
+
+        if success:
+            self.upgrade_schema()
+            if latest_change is not None:
+                self._skip_change_log_past(latest_change)
+            if self.replica is not None:
+                self.replica.refresh(full=True)
+        return success
@@ -1,6 +1,41 @@
-from typing import Iterable
+import math
+from collections.abc import Iterable
 
-from prettytable import PrettyTable
+
+record_column_names = ['Title', 'Forename', 'Surname', 'EmailAddress', 'Salary']
+currency_symbols = "£$€"
+
+
+def parse_salary(value):
+    """Reads a salary given as a number or as text such as "£32,500.00".
+
+    Raises:
+        ValueError: If it isn't a finite, non-negative amount
+    """
+    if value is None or value == "":
+        raise ValueError("Salary is missing")
+    if isinstance(value, bool):
+        raise ValueError("Salary must be a number")
+    if isinstance(value, str):
+        text = value.strip().lstrip(currency_symbols).replace(",", "").replace("_", "")
+        try:
+            value = float(text)
+        except ValueError:
+            raise ValueError(f"Salary {value!r} is not a number") from None
+    elif not isinstance(value, (int, float)):
+        raise ValueError("Salary must be a number")
+    if not math.isfinite(value) or value < 0:
+        raise ValueError(f"Salary {value!r} is out of range")
+    return round(float(value), 2)
+
+
+def salary_cents(value):
+    """The whole number of cents a salary is stored as in the EmployeeUoB table (see migrations).
+
+    Raises:
+        ValueError: If parse_salary can't read it
+    """
+    return round(parse_salary(value) * 100)
 
 
 class Employee:
@@ -8,16 +43,21 @@ class Employee:
     The class which represents Employees. 
     """
 
+    __slots__ = ('id', 'title', 'forename', 'surname', 'email', 'salary')
+
     user_editable_attributes = ['title', 'forename', 'surname', 'email', 'salary']
 
-    def __init__(self):
-  
-        self.id = 0
-        self.title = ''
-        self.forename = ''
-        self.surname = ''
-        self.email = ''
-        self.salary = 0.0
+    def __init__(self, id=0, title='', forename='', surname='', email='', salary=0.0):
+        """
+        The arguments are in the same order as the columns of the EmployeeUoB table, so an
+        Employee can be built straight from a row with Employee(*row).
+        """
+        self.id = id
+        self.title = title
+        self.forename = forename
+        self.surname = surname
+        self.email = email
+        self.salary = salary
 
     @staticmethod
     def from_user_input():
@@ -45,17 +85,29 @@ class Employee:
             Employee: A new Employee object
         """        
         try:
-            e = Employee()
-            e.set_employee_id(result_tuple[0])
-            e.set_employee_title(result_tuple[1])
-            e.set_forename(result_tuple[2])
-            e.set_surname(result_tuple[3])
-            e.set_email(result_tuple[4])
-            e.set_salary(result_tuple[5])
-            return e
+            return Employee(*result_tuple)
         except TypeError:
             return None
 
+    @staticmethod
+    def from_record(record: dict):
+        """Static method which creates an Employee from a record read from an import file (CSV or JSONL).
+        Keys may be either the Employee attribute names or the EmployeeUoB column names, in any case.
+
+        Args:
+            record (dict): The record, mapping field names to values.
+
+        Returns:
+            Employee: A new Employee object
+        """
+        e = Employee()
+        fields = {key.lower(): value for key, value in record.items()}
+        for attribute, column in zip(e.user_editable_attributes, record_column_names):
+            value = fields.get(attribute, fields.get(column.lower()))
+            if value is not None:
+                setattr(e, attribute, value)
+        return e
+
     def apply_user_update(self):
         """
         Function which allows the user to selectively update Employee attributes from the command line.
@@ -132,6 +184,16 @@ class Employee:
         return make_employee_table(self)
 
 
+def employee_row_factory(cursor, row):
+    """A sqlite3 row factory which turns rows of the EmployeeUoB table straight into Employee objects.
+    Set it as the row_factory of a cursor which selects whole EmployeeUoB rows.
+
+    Returns:
+        Employee: The Employee for the row
+    """
+    return Employee(*row)
+
+
 def make_employee_table(employees: Iterable):
 
     """Creates a nicely formatted table of Employees from a list of Employee objects.
@@ -140,7 +202,10 @@ def make_employee_table(employees: Iterable):
         str: String representation of a table of Employees, which can be printed to the console.
 
         Note: Uses the PrettyTable package: https://github.com/jazzband/prettytable
+        It is imported here rather than at the top of the module, so that scripts which never
+        print a table (eg: the cli module with JSON or CSV output) don't pay for importing it.
     """
+    from prettytable import PrettyTable
 
     table = PrettyTable()
     data_attributes = ['id'] + Employee.user_editable_attributes
@@ -0,0 +1,111 @@
+import threading
+from collections import OrderedDict
+
+
+class EmployeeCache:
+    """
+    The EmployeeCache class is a bounded, least-recently-used cache of query results from the
+    EmployeeUoB table, used by DBOperations to answer repeated lookups without going back to the
+    database.
+    Results are stored as tuples of rows rather than Employee objects, so that callers which
+    modify the Employees they are given cannot change what is in the cache.
+    The cache is emptied whenever DBOperations commits a change, and whenever PRAGMA data_version
+    shows that another connection has changed the database.
+    """
+
+    def __init__(self, max_size: int = 1024) -> None:
+        """
+        Args:
+            max_size (int, optional): Maximum number of results kept. Defaults to 1024.
+        """
+        self.max_size = max_size
+        self.generation = 0
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+        self.invalidations = 0
+        self._entries = OrderedDict()
+        self._data_versions = {}
+        self._lock = threading.Lock()
+
+    def get(self, key):
+        """Looks up a result.
+
+        Args:
+            key (tuple): Identifies the query and its parameters
+
+        Returns:
+            tuple: (found, rows) where found is False if the result isn't cached
+        """
+        with self._lock:
+            if key in self._entries:
+                self._entries.move_to_end(key)
+                self.hits += 1
+                return True, self._entries[key]
+            self.misses += 1
+            return False, None
+
+    def put(self, key, rows, generation: int):
+        """Stores a result, evicting the least recently used result if the cache is full.
+        The result is dropped if the cache has been invalidated since generation was read,
+        as it may have been read before the change which caused the invalidation.
+
+        Args:
+            key (tuple): Identifies the query and its parameters
+            rows (tuple): The rows returned by the query
+            generation (int): The value of self.generation read before the query was run
+        """
+        with self._lock:
+            if generation != self.generation:
+                return
+            self._entries[key] = rows
+            self._entries.move_to_end(key)
+            if len(self._entries) > self.max_size:
+                self._entries.popitem(last=False)
+                self.evictions += 1
+
+    def invalidate(self):
+        """Empties the cache.
+        """
+        with self._lock:
+            self._entries.clear()
+            self.generation += 1
+            self.invalidations += 1
+
+    def check_data_version(self, connection, data_version: int):
+        """Empties the cache if the data version seen on connection has changed since it was last
+        checked, which means another connection has committed a change to the database. The first
+        check on a connection also empties it, since results may have been cached by another
+        connection before a change this one never saw.
+
+        Args:
+            connection (sqlite3.Connection): The connection the data version was read on
+            data_version (int): The value of PRAGMA data_version on that connection
+        """
+        with self._lock:
+            previous = self._data_versions.get(id(connection))
+            self._data_versions[id(connection)] = data_version
+        if previous != data_version:
+            self.invalidate()
+
+    def forget_connections(self):
+        """Forgets the data versions seen on every connection, once they have been closed, so that a
+        new connection given the same id is treated as one the cache hasn't seen.
+        """
+        with self._lock:
+            self._data_versions.clear()
+
+    def stats(self):
+        """
+        Returns:
+            dict: The cache's size and its hit, miss, eviction and invalidation counters
+        """
+        with self._lock:
+            return {
+                "size": len(self._entries),
+                "max_size": self.max_size,
+                "hits": self.hits,
+                "misses": self.misses,
+                "evictions": self.evictions,
+                "invalidations": self.invalidations,
+            }
@@ -0,0 +1,155 @@
+import csv
+import json
+import os
+
+# Columns which can be exported, with the SQL which reads each. The names are the EmployeeUoB column
+# names, so an export can be read back by employeeimport (and sync, for ExternalId).
+export_columns = {
+    "Id": "Id",
+    "Title": "Title",
+    "Forename": "Forename",
+    "Surname": "Surname",
+    "EmailAddress": "EmailAddress",
+    "Salary": "Salary / 100.0",
+    "ExternalId": "ExternalId",
+}
+default_columns = ["Id", "Title", "Forename", "Surname", "EmailAddress", "Salary"]
+# Employee attribute names which differ from the column names
+column_aliases = {"email": "EmailAddress", "external_id": "ExternalId"}
+# pyarrow type of each column; the rest are strings
+arrow_types = {"Id": "int64", "Salary": "float64"}
+
+export_formats = {".csv": "csv", ".jsonl": "jsonl", ".ndjson": "jsonl", ".arrow": "arrow", ".feather": "arrow",
+                  ".parquet": "parquet"}
+
+
+def resolve_columns(columns=None):
+    """Matches requested column names (column or Employee attribute names, in any case) to export_columns.
+
+    Args:
+        columns (list[str], optional): The columns wanted, in order. Defaults to default_columns.
+
+    Returns:
+        list[str]: The export_columns names
+    """
+    if not columns:
+        return list(default_columns)
+    by_name = {name.lower(): name for name in export_columns}
+    by_name.update(column_aliases)
+    resolved = []
+    for column in columns:
+        name = by_name.get(column.strip().lower())
+        if name is None:
+            raise ValueError(f"Unknown export column {column!r}, expected some of {', '.join(export_columns)}")
+        resolved.append(name)
+    return resolved
+
+
+def export_format(path: str, format: str = None):
+    """
+    Returns:
+        str: format if given, otherwise the format matching the file extension
+    """
+    if format is not None:
+        if format not in export_formats.values():
+            raise ValueError(f"Unsupported export format: {format}")
+        return format
+    extension = os.path.splitext(path)[1].lower()
+    if extension not in export_formats:
+        raise ValueError(f"Unsupported export file type: {extension}")
+    return export_formats[extension]
+
+
+def select_sql(columns, condition: str = "1"):
+    """Builds the query which reads the given columns of the Employees matching condition, in Id order.
+    """
+    return ("SELECT " + ", ".join(export_columns[c] for c in columns)
+            + " FROM EmployeeUoB WHERE " + condition + " ORDER BY Id")
+
+
+def write_csv(chunks, columns, path: str):
+    with open(path, "w", newline="") as f:
+        writer = csv.writer(f)
+        writer.writerow(columns)
+        for rows in chunks:
+            writer.writerows(rows)
+
+
+def write_jsonl(chunks, columns, path: str):
+    with open(path, "w") as f:
+        for rows in chunks:
+            f.write("".join(json.dumps(dict(zip(columns, row))) + "\n" for row in rows))
+
+
+def arrow_schema(pa, columns):
+    return pa.schema([(c, getattr(pa, arrow_types.get(c, "string"))()) for c in columns])
+
+
+def record_batch(pa, schema, rows):
+    """Turns a chunk of rows into an Arrow record batch, a column at a time."""
+    return pa.RecordBatch.from_arrays([pa.array(values, type=field.type)
+                                       for values, field in zip(zip(*rows), schema)], schema=schema)
+
+
+def write_arrow(chunks, columns, path: str):
+    """Writes an Arrow IPC file with one record batch per chunk."""
+    import pyarrow as pa
+
+    schema = arrow_schema(pa, columns)
+    with pa.OSFile(path, "wb") as sink, pa.ipc.new_file(sink, schema) as writer:
+        for rows in chunks:
+            writer.write_batch(record_batch(pa, schema, rows))
+
+
+def write_parquet(chunks, columns, path: str):
+    """Writes a Parquet file with one row group per chunk."""
+    import pyarrow as pa
+    import pyarrow.parquet as pq
+
+    schema = arrow_schema(pa, columns)
+    with pq.ParquetWriter(path, schema) as writer:
+        for rows in chunks:
+            writer.write_batch(record_batch(pa, schema, rows))
+
+
+writers = {"csv": write_csv, "jsonl": write_jsonl, "arrow": write_arrow, "parquet": write_parquet}
+
+
+def write_export(chunks, columns, path: str, format: str = None):
+    """Writes chunks of rows to an export file as they are produced, so only one chunk is held in
+    memory at a time. The file is written as path + ".partial" and moved into place once complete.
+    Arrow and Parquet files need pyarrow.
+
+    Args:
+        chunks (Iterable[list[tuple]]): The rows, in chunks, with values in the order of columns
+        columns (list[str]): The column names
+        path (str): The file to write
+        format (str, optional): "csv", "jsonl", "arrow" or "parquet". Defaults to the one matching
+        the file extension.
+
+    Returns:
+        int: The number of rows written
+    """
+    format = export_format(path, format)
+    if format in ("arrow", "parquet"):
+        try:
+            import pyarrow
+        except ImportError:
+            raise ImportError(f"Exporting to {format} needs pyarrow (pip install pyarrow)") from None
+
+    count = 0
+
+    def counted():
+        nonlocal count
+        for rows in chunks:
+            count += len(rows)
+            yield rows
+
+    partial_path = path + ".partial"
+    try:
+        writers[format](counted(), columns, partial_path)
+        os.replace(partial_path, path)
+    finally:
+        if os.path.exists(partial_path):
+            os.remove(partial_path)
+    return count
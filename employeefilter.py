@@ -0,0 +1,66 @@
+class EmployeeFilter:
+    """
+    The EmployeeFilter class selects a subset of the EmployeeUoB table by title, salary range and/or
+    a list of Ids, and turns that selection into an SQL condition. Criteria which are left as None
+    don't restrict the selection, so EmployeeFilter() selects every Employee.
+
+    Lists of Ids are loaded into a temporary table and joined against, rather than being written into
+    the SQL, so that any number of Ids can be used.
+    """
+
+    id_table = "temp.EmployeeFilterIds"
+    # Salaries are stored in whole cents (see migrations)
+    salary_scale = 100
+
+    def __init__(self, titles=None, min_salary: float = None, max_salary: float = None, ids=None) -> None:
+        """
+        Args:
+            titles (list[str], optional): Only Employees with one of these titles
+            min_salary (float, optional): Only Employees paid at least this much
+            max_salary (float, optional): Only Employees paid less than this
+            ids (Iterable[int], optional): Only Employees with one of these Ids
+        """
+        self.titles = list(titles) if titles is not None else None
+        self.min_salary = min_salary
+        self.max_salary = max_salary
+        self.ids = ids
+
+    def prepare(self, cur):
+        """Loads the filter's Ids (if it has any) into a temporary table on the cursor's connection.
+        Must be called on a connection before condition() is used in a query on it.
+
+        Args:
+            cur (sqlite3.Cursor): A cursor on the connection which will run the query
+        """
+        if self.ids is None:
+            return
+        cur.execute(f"DROP TABLE IF EXISTS {self.id_table}")
+        cur.execute(f"CREATE TABLE {self.id_table} (Id INTEGER PRIMARY KEY)")
+        cur.executemany(f"INSERT OR IGNORE INTO {self.id_table} (Id) VALUES (?)", ((id,) for id in self.ids))
+        # The inserts open a transaction, which only involves the temporary database, so ending it
+        # here takes no lock on the EmployeeUoB table.
+        cur.connection.commit()
+
+    def condition(self):
+        """Builds the SQL condition matching the filter.
+
+        Returns:
+            tuple: (sql, params) where sql is a condition on the EmployeeUoB columns and params are its parameters
+        """
+        clauses = []
+        params = []
+        if self.titles is not None:
+            clauses.append("Title IN (" + ",".join("?" * len(self.titles)) + ")")
+            params += self.titles
+        if self.min_salary is not None:
+            clauses.append("Salary >= ?")
+            params.append(self.min_salary * self.salary_scale)
+        if self.max_salary is not None:
+            clauses.append("Salary < ?")
+            params.append(self.max_salary * self.salary_scale)
+        if self.ids is not None:
+            clauses.append(f"Id IN (SELECT Id FROM {self.id_table})")
+
+        if not clauses:
+            return "1", ()
+        return "(" + " AND ".join(clauses) + ")", tuple(params)
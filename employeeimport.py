@@ -0,0 +1,101 @@
+import csv
+import json
+import os
+
+from employee import Employee
+
+
+def iter_csv(path: str):
+    """Streams the records of a CSV file with a header row, one row at a time.
+
+    Args:
+        path (str): Path to the CSV file
+
+    Yields:
+        dict: One record per row, keyed by the header
+    """
+    with open(path, newline="") as f:
+        yield from csv.DictReader(f)
+
+
+def iter_jsonl(path: str):
+    """Streams the records of a JSON Lines file (one JSON object per line), one line at a time.
+    Blank lines are skipped.
+
+    Args:
+        path (str): Path to the JSONL file
+
+    Yields:
+        dict: One record per line
+    """
+    with open(path) as f:
+        for line in f:
+            if line.strip():
+                yield json.loads(line)
+
+
+def iter_records(path: str):
+    """Streams the records of a CSV or JSONL file, chosen by the file extension, as dicts. Use this
+    rather than read_records to see fields which aren't Employee attributes (eg: ExternalId).
+
+    Args:
+        path (str): Path to a .csv, .jsonl or .ndjson file
+
+    Returns:
+        Iterator[dict]: The records in the file
+    """
+    extension = os.path.splitext(path)[1].lower()
+    if extension == ".csv":
+        return iter_csv(path)
+    if extension in (".jsonl", ".ndjson"):
+        return iter_jsonl(path)
+    raise ValueError(f"Unsupported import file type: {extension}")
+
+
+def read_csv(path: str):
+    """Streams Employees from a CSV file with a header row, one row at a time.
+
+    Args:
+        path (str): Path to the CSV file
+
+    Returns:
+        Iterator[Employee]: One Employee per row
+    """
+    return map(Employee.from_record, iter_csv(path))
+
+
+def read_jsonl(path: str):
+    """Streams Employees from a JSON Lines file (one JSON object per line), one line at a time.
+    Blank lines are skipped.
+
+    Args:
+        path (str): Path to the JSONL file
+
+    Returns:
+        Iterator[Employee]: One Employee per line
+    """
+    return map(Employee.from_record, iter_jsonl(path))
+
+
+def read_records(path: str):
+    """Streams Employees from a CSV or JSONL file, chosen by the file extension.
+
+    Args:
+        path (str): Path to a .csv, .jsonl or .ndjson file
+
+    Returns:
+        Iterator[Employee]: The Employees in the file
+    """
+    return map(Employee.from_record, iter_records(path))
+
+
+def count_records(path: str):
+    """Counts the records in an import file without keeping them in memory.
+
+    Args:
+        path (str): Path to a .csv, .jsonl or .ndjson file
+
+    Returns:
+        int: Number of records
+    """
+    return sum(1 for _ in iter_records(path))
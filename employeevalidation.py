@@ -0,0 +1,196 @@
+import csv
+import hashlib
+import itertools
+import json
+import os
+import re
+from collections import deque
+from concurrent.futures import ProcessPoolExecutor
+
+from employee import Employee, parse_salary, record_column_names
+
+email_pattern = re.compile(r"^[^@\s]+@[^@\s]+\.[^@\s]+$")
+
+
+def clean_text(value, field: str):
+    """Strips a text field and collapses runs of whitespace inside it.
+
+    Raises:
+        ValueError: If the value isn't text
+    """
+    if value is None:
+        return ""
+    if not isinstance(value, str):
+        raise ValueError(f"{field} must be text")
+    return " ".join(value.split())
+
+
+def key_hash(key: str):
+    """A 64-bit hash of a duplicate-detection key, so that keys for millions of records fit in memory."""
+    return int.from_bytes(hashlib.blake2b(key.encode(), digest_size=8).digest(), "big")
+
+
+def duplicate_key(forename: str, surname: str, email: str):
+    """Records are the same Employee if they have the same email address or, if they have none, the same
+    name. Case is ignored, as it is by the EmployeeUoB columns.
+    """
+    if email:
+        return key_hash("email\0" + email.casefold())
+    return key_hash("name\0" + forename.casefold() + "\0" + surname.casefold())
+
+
+def normalise_record(record: dict):
+    """Checks and tidies one import record. Keys may be Employee attribute names or EmployeeUoB column
+    names, in any case, as for Employee.from_record.
+
+    Returns:
+        tuple: ((title, forename, surname, email, salary), key) for a valid record, or (None, reason)
+    """
+    if not isinstance(record, dict):
+        return None, "Record is not an object"
+    fields = {str(key).lower(): value for key, value in record.items()}
+    values = [fields.get(attribute, fields.get(column.lower()))
+              for attribute, column in zip(Employee.user_editable_attributes, record_column_names)]
+
+    errors = []
+    cleaned = []
+    for attribute, value in zip(Employee.user_editable_attributes[:4], values):
+        try:
+            cleaned.append(clean_text(value, attribute.capitalize()))
+        except ValueError as e:
+            errors.append(str(e))
+            cleaned.append("")
+    title, forename, surname, email = cleaned
+    email = email.lower()
+
+    if not forename or not surname:
+        errors.append("Forename and Surname are required")
+    if email and not email_pattern.match(email):
+        errors.append(f"Email address {email!r} is malformed")
+    try:
+        salary = parse_salary(values[4])
+    except ValueError as e:
+        errors.append(str(e))
+
+    if errors:
+        return None, "; ".join(errors)
+    return (title, forename, surname, email, salary), duplicate_key(forename, surname, email)
+
+
+def normalise_chunk(records):
+    """normalise_record for each of a list of records; this is what runs in the worker processes."""
+    return [normalise_record(r) for r in records]
+
+
+class ValidationPipeline:
+    """
+    The ValidationPipeline class checks records on their way into the EmployeeUoB table, so that only
+    clean rows reach the write path. Records are read in chunks and each chunk is:
+
+    1. normalised and type-checked (see normalise_record) on a pool of worker processes, several chunks
+       at a time,
+    2. checked for duplicates of earlier records in the same load, using 64-bit hashes of each record's
+       email address (or name, if it has none),
+    3. checked for duplicates of Employees already in the table, with one set-based lookup for the
+       whole chunk (see DBOperations.validate_records).
+
+    Rejected records are written to a CSV report with their record number (counting from 1), the
+    reason and the original record as JSON.
+    """
+
+    report_columns = ["Record", "Reason", "Data"]
+
+    def __init__(self, reject_path: str = None, workers: int = None, chunk_size: int = 5000) -> None:
+        """
+        Args:
+            reject_path (str, optional): Where to write the reject report. Defaults to no report.
+            workers (int, optional): Worker processes. With 1 or fewer, records are checked in this
+            process. Defaults to the number of CPUs.
+            chunk_size (int, optional): Records per chunk. Defaults to 5000.
+        """
+        self.reject_path = reject_path
+        self.workers = os.cpu_count() if workers is None else workers
+        self.chunk_size = chunk_size
+        self.counts = {"records": 0, "valid": 0, "invalid": 0, "duplicates": 0, "existing": 0}
+
+    def normalised_chunks(self, chunks):
+        """Runs normalise_chunk over the chunks, on the process pool if there is one, keeping at most
+        two chunks per worker in flight so memory use doesn't grow with the input.
+
+        Yields:
+            list: The results for each chunk, in order
+        """
+        if self.workers <= 1:
+            yield from map(normalise_chunk, chunks)
+            return
+        with ProcessPoolExecutor(self.workers) as pool:
+            pending = deque()
+            for chunk in chunks:
+                pending.append(pool.submit(normalise_chunk, chunk))
+                if len(pending) >= 2 * self.workers:
+                    yield pending.popleft().result()
+            while pending:
+                yield pending.popleft().result()
+
+    def validate(self, records, find_existing):
+        """Generator which checks records, writing rejects to the report and yielding the rest.
+
+        Args:
+            records (Iterable[dict]): The records, eg: from employeeimport.iter_records
+            find_existing (callable): Given a list of (record number, forename, surname, email) for the
+            valid records of a chunk, returns {record number: Id} for those matching an existing Employee.
+
+        Yields:
+            Employee: Each clean record
+        """
+        records = iter(records)
+        chunks = iter(lambda: list(itertools.islice(records, self.chunk_size)), [])
+        # Chunks are kept here, as well as being sent to the workers, for the reject report
+        kept = deque()
+
+        def keep(chunks):
+            for chunk in chunks:
+                kept.append(chunk)
+                yield chunk
+
+        seen = {}
+        report = open(self.reject_path, "w", newline="") if self.reject_path else None
+        try:
+            writer = csv.writer(report) if report else None
+            if writer:
+                writer.writerow(self.report_columns)
+
+            for results in self.normalised_chunks(keep(chunks)):
+                chunk = kept.popleft()
+                first = self.counts["records"] + 1
+                self.counts["records"] += len(chunk)
+                rejects = []
+
+                def reject(number, record, reason, count):
+                    self.counts[count] += 1
+                    rejects.append((number, reason, record))
+
+                candidates = []
+                for number, record, (values, key) in zip(itertools.count(first), chunk, results):
+                    if values is None:
+                        reject(number, record, key, "invalid")
+                    elif key in seen:
+                        reject(number, record, f"Duplicate of record {seen[key]}", "duplicates")
+                    else:
+                        seen[key] = number
+                        candidates.append((number, record, values))
+
+                existing = find_existing([(number,) + values[1:4] for number, _, values in candidates]) if candidates else {}
+                for number, record, values in candidates:
+                    if number in existing:
+                        reject(number, record, f"Already in the table as Id {existing[number]}", "existing")
+
+                if writer:
+                    writer.writerows([number, reason, json.dumps(record, default=str)] for number, reason, record in sorted(rejects))
+                for number, record, values in candidates:
+                    if number not in existing:
+                        self.counts["valid"] += 1
+                        yield Employee(0, *values)
+        finally:
+            if report:
+                report.close()
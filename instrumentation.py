@@ -0,0 +1,285 @@
+import functools
+import logging
+import re
+import threading
+import time
+
+from employee import Employee
+
+
+class LatencyHistogram:
+    """
+    A histogram of latencies in seconds, with fixed bucket boundaries so that histograms from
+    different runs can be compared (and exported in the Prometheus histogram format).
+    """
+
+    bucket_bounds = (0.0001, 0.00025, 0.0005, 0.001, 0.0025, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0)
+
+    def __init__(self) -> None:
+        self.bucket_counts = [0] * (len(self.bucket_bounds) + 1)
+        self.count = 0
+        self.sum = 0.0
+        self.max = 0.0
+
+    def observe(self, seconds: float):
+        index = 0
+        while index < len(self.bucket_bounds) and seconds > self.bucket_bounds[index]:
+            index += 1
+        self.bucket_counts[index] += 1
+        self.count += 1
+        self.sum += seconds
+        self.max = max(self.max, seconds)
+
+    def cumulative_buckets(self):
+        """
+        Returns:
+            list[tuple]: (upper bound, number of observations at or below it), ending with "+Inf"
+        """
+        total = 0
+        buckets = []
+        for bound, count in zip(self.bucket_bounds + ("+Inf",), self.bucket_counts):
+            total += count
+            buckets.append((bound, total))
+        return buckets
+
+    def to_dict(self):
+        return {
+            "count": self.count,
+            "sum_seconds": self.sum,
+            "max_seconds": self.max,
+            "buckets": {str(bound): count for bound, count in self.cumulative_buckets()},
+        }
+
+
+class OperationStats:
+    """
+    Counters for one DBOperations function or one SQL statement.
+    """
+
+    def __init__(self) -> None:
+        self.calls = 0
+        self.errors = 0
+        self.rows = 0
+        self.lock_wait_seconds = 0.0
+        self.latency = LatencyHistogram()
+
+    def to_dict(self):
+        return {
+            "calls": self.calls,
+            "errors": self.errors,
+            "rows": self.rows,
+            "lock_wait_seconds": self.lock_wait_seconds,
+            "latency": self.latency.to_dict(),
+        }
+
+
+class Instrumentation:
+    """
+    The Instrumentation class records what a DBOperations object does: for each of its functions, the
+    number of calls and errors, a latency histogram, the number of rows returned and the time spent
+    waiting for the write lock; and for each SQL statement, the number of executions and a latency
+    histogram.
+
+    Statements are seen through sqlite3's set_trace_callback, which is called as each statement starts.
+    A statement's latency is measured with a wall-clock timer from when it starts until the next
+    statement starts on the same thread or the calling function returns, so it includes the time
+    taken to fetch its rows.
+    Statements whose latency reaches slow_query_threshold are written to the slow query log.
+    """
+
+    literal_regex = r"'(?:[^']|'')*'|-?\b\d+(?:\.\d+)?\b"
+
+    def __init__(self, slow_query_threshold: float = None, slow_query_log: str = None) -> None:
+        """
+        Args:
+            slow_query_threshold (float, optional): Latency in seconds at or above which a statement is
+            logged as slow. Defaults to None (no slow query log).
+            slow_query_log (str, optional): File to append this Instrumentation's slow queries to (call
+            close when done with it). Slow queries are always sent to the "instrumentation.slow_queries"
+            logger, and so to the application's logging configuration too.
+        """
+        self.literal_pattern = re.compile(self.literal_regex)
+        self.slow_query_threshold = slow_query_threshold
+        self.methods = {}
+        self.statements = {}
+        self._lock = threading.Lock()
+        self._local = threading.local()
+
+        self.slow_query_logger = logging.getLogger("instrumentation.slow_queries")
+        self.slow_query_handler = None
+        if slow_query_log is not None:
+            # The logger is shared by every Instrumentation, so the file only takes this one's records
+            self.slow_query_handler = logging.FileHandler(slow_query_log)
+            self.slow_query_handler.setFormatter(logging.Formatter("%(asctime)s %(message)s"))
+            self.slow_query_handler.addFilter(lambda record: getattr(record, "instrumentation", None) is self)
+            self.slow_query_logger.addHandler(self.slow_query_handler)
+
+    def close(self):
+        """Closes the slow query log file, if there is one. Slow queries seen afterwards are only sent
+        to the logger.
+        """
+        if self.slow_query_handler is not None:
+            self.slow_query_logger.removeHandler(self.slow_query_handler)
+            self.slow_query_handler.close()
+            self.slow_query_handler = None
+
+    def _method_stack(self):
+        stack = getattr(self._local, "methods", None)
+        if stack is None:
+            stack = self._local.methods = []
+        return stack
+
+    def _stats(self, table, key):
+        stats = table.get(key)
+        if stats is None:
+            stats = table[key] = OperationStats()
+        return stats
+
+    def normalise(self, sql: str):
+        """Replaces the literal values in a traced statement with ?, so that executions of the same
+        statement with different parameters are counted together (and no data ends up in the stats).
+        """
+        return self.literal_pattern.sub("?", " ".join(sql.split()))
+
+    def trace(self, sql: str):
+        """The trace callback given to each connection with set_trace_callback.
+        """
+        if sql.startswith("--"):
+            # Statements run by triggers are reported with a comment naming the trigger, and
+            # their time is already part of the statement which fired the trigger.
+            return
+        self._finish_statement()
+        self._local.statement = (self.normalise(sql), time.perf_counter())
+
+    def _finish_statement(self):
+        current = getattr(self._local, "statement", None)
+        if current is None:
+            return
+        self._local.statement = None
+        sql, started = current
+        seconds = time.perf_counter() - started
+        with self._lock:
+            stats = self._stats(self.statements, sql)
+            stats.calls += 1
+            stats.latency.observe(seconds)
+        if self.slow_query_threshold is not None and seconds >= self.slow_query_threshold:
+            stack = self._method_stack()
+            method = stack[-1] if stack else "-"
+            self.slow_query_logger.warning("%.6fs %s %s", seconds, method, sql, extra={"instrumentation": self})
+
+    def method_started(self, name: str):
+        self._method_stack().append(name)
+
+    def method_finished(self, name: str, seconds: float, result):
+        self._finish_statement()
+        self._method_stack().pop()
+        with self._lock:
+            stats = self._stats(self.methods, name)
+            stats.calls += 1
+            stats.rows += self.count_rows(result)
+            stats.latency.observe(seconds)
+
+    def record_error(self):
+        """Counts an error against the function currently running on this thread.
+        """
+        stack = self._method_stack()
+        if stack:
+            with self._lock:
+                self._stats(self.methods, stack[-1]).errors += 1
+
+    def record_lock_wait(self, seconds: float):
+        """Adds time spent waiting for the write lock to the function currently running on this thread.
+        """
+        stack = self._method_stack()
+        if stack:
+            with self._lock:
+                self._stats(self.methods, stack[-1]).lock_wait_seconds += seconds
+
+    @staticmethod
+    def count_rows(result):
+        if isinstance(result, (list, tuple)):
+            return len(result)
+        if isinstance(result, Employee):
+            return 1
+        if isinstance(result, int) and not isinstance(result, bool):
+            return result
+        return 0
+
+    def to_dict(self):
+        with self._lock:
+            return {
+                "methods": {name: stats.to_dict() for name, stats in self.methods.items()},
+                "statements": {sql: stats.to_dict() for sql, stats in self.statements.items()},
+            }
+
+    def to_json(self):
+        import json
+
+        return json.dumps(self.to_dict(), indent=2)
+
+    def to_prometheus(self):
+        """Formats the stats in the Prometheus text exposition format.
+
+        Returns:
+            str: The metrics, one sample per line
+        """
+        lines = []
+        with self._lock:
+            for prefix, label, table in (("employee_db_method", "method", self.methods),
+                                         ("employee_db_statement", "statement", self.statements)):
+                lines += [f"# TYPE {prefix}_calls_total counter"]
+                lines += [f'{prefix}_calls_total{{{label}="{escape_label(key)}"}} {stats.calls}'
+                          for key, stats in table.items()]
+                if table is self.methods:
+                    for metric, attribute in (("errors_total", "errors"), ("rows_total", "rows"),
+                                              ("lock_wait_seconds_total", "lock_wait_seconds")):
+                        lines += [f"# TYPE {prefix}_{metric} counter"]
+                        lines += [f'{prefix}_{metric}{{{label}="{escape_label(key)}"}} {getattr(stats, attribute)}'
+                                  for key, stats in table.items()]
+                lines += [f"# TYPE {prefix}_duration_seconds histogram"]
+                for key, stats in table.items():
+                    labels = f'{label}="{escape_label(key)}"'
+                    lines += [f'{prefix}_duration_seconds_bucket{{{labels},le="{bound}"}} {count}'
+                              for bound, count in stats.latency.cumulative_buckets()]
+                    lines += [f"{prefix}_duration_seconds_sum{{{labels}}} {stats.latency.sum}",
+                              f"{prefix}_duration_seconds_count{{{labels}}} {stats.latency.count}"]
+        return "\n".join(lines) + "\n"
+
+    def dump(self, path: str, format: str = "json"):
+        """Writes the stats to a file.
+
+        Args:
+            path (str): The file to write
+            format (str, optional): "json" or "prometheus". Defaults to "json".
+        """
+        if format not in ("json", "prometheus"):
+            raise ValueError(f"Unknown stats format {format!r}, expected json or prometheus")
+        with open(path, "w") as f:
+            f.write(self.to_json() + "\n" if format == "json" else self.to_prometheus())
+
+
+def escape_label(value: str):
+    return value.replace("\\", "\\\\").replace('"', '\\"').replace("\n", "\\n")
+
+
+def instrumented(method):
+    """Decorator for DBOperations functions which records their calls in the DBOperations object's
+    Instrumentation, if it has one.
+    """
+    name = method.__name__
+
+    @functools.wraps(method)
+    def wrapper(self, *args, **kwargs):
+        if self.instrumentation is None:
+            return method(self, *args, **kwargs)
+
+        self.instrumentation.method_started(name)
+        start = time.perf_counter()
+        result = None
+        try:
+            result = method(self, *args, **kwargs)
+            return result
+        finally:
+            self.instrumentation.method_finished(name, time.perf_counter() - start, result)
+
+    return wrapper
@@ -1,5 +1,9 @@
+import itertools
+import sys
+
 from databaseoperations import DBOperations
-from employee import Employee, make_employee_table
+from employee import Employee
+from tablerenderer import TableRenderer
 from userconfirmation import UserConfirmationProvider
 
 
@@ -45,136 +49,144 @@ def main():
     All input and output will be retrieved and produced by this function and supporting functions
     so that the class which accesses the database can remain as generic as possible.
     """    
-    while True:
-        print("\n Menu:")
-        print("**********")
-        print(" 1. Create table EmployeeUoB")
-        print(" 2. Insert data into EmployeeUoB")
-        print(" 3. Select all data from EmployeeUoB")
-        print(" 4. Search for an employee")
-        print(" 5. Update a record")
-        print(" 6. Delete a record")
-        print(" 7. Adjust an employee's pay")
-        print(" 8. Adjust all employees' pay")
-        print(" 9. Exit\n")
-
-        try:
-            __choose_menu = int(input("Enter your choice: "))
-        except ValueError:
-            print("Invalid input")
-            continue
-
-        db_ops = DBOperations("EmployeeDatabase.db")
-
-        if __choose_menu == 1:  # create table
-            db_ops.create_table_if_not_exists()
+    with DBOperations("EmployeeDatabase.db", pooled=True, cache_size=256) as db_ops:
+        while True:
+            print("\n Menu:")
+            print("**********")
+            print(" 1. Create table EmployeeUoB")
+            print(" 2. Insert data into EmployeeUoB")
+            print(" 3. Select all data from EmployeeUoB")
+            print(" 4. Search for an employee")
+            print(" 5. Update a record")
+            print(" 6. Delete a record")
+            print(" 7. Adjust an employee's pay")
+            print(" 8. Adjust all employees' pay")
+            print(" 9. Exit\n")
 
-        elif __choose_menu == 2:  # insert new record
+            try:
+                __choose_menu = int(input("Enter your choice: "))
+            except ValueError:
+                print("Invalid input")
+                continue
 
-            data = Employee.from_user_input()
-            confirmationProvider = UserConfirmationProvider("Confirm data insertion")
+            if __choose_menu == 1:  # create table
+                db_ops.create_table_if_not_exists()
 
-            if db_ops.insert_data(data, confirmationProvider):
-                print("Data insertion successful")
-            else:
-                print("Data insertion failed")
+            elif __choose_menu == 2:  # insert new record
 
-        elif __choose_menu == 3:  # show all records
-            print(make_employee_table(db_ops.select_all()))
+                data = Employee.from_user_input()
+                confirmationProvider = UserConfirmationProvider("Confirm data insertion")
 
-        elif __choose_menu == 4:  # search database
-            print("Enter number to search by Id or text to search within employee names.")
-            search_term = input("Search For:\t")
-            try:
-                result = db_ops.search_data_id(int(search_term))
-                if result is not None:
-                    print(make_employee_table(result))
+                if db_ops.insert_data(data, confirmationProvider):
+                    print("Data insertion successful")
                 else:
-                    print("No results found")
+                    print("Data insertion failed")
 
-            except ValueError:
-                result = db_ops.search_data_name(search_term)
-                if len(result) != 0:
-                    print(make_employee_table(result))
-                else:
+            elif __choose_menu == 3:  # show all records
+                if not TableRenderer().render(itertools.chain.from_iterable(db_ops.iter_pages(page_size=500))):
                     print("No results found")
 
+            elif __choose_menu == 4:  # search database
+                print("Enter number to search by Id or text to search within employee names.")
+                search_term = input("Search For:\t")
+                try:
+                    result = db_ops.search_data_id(int(search_term))
+                    if result is not None:
+                        TableRenderer().render([result])
+                    else:
+                        print("No results found")
+
+                except ValueError:
+                    result = db_ops.search_data_name(search_term)
+                    if result is not None and len(result) == 0 and db_ops.name_key_index_exists():
+                        result = db_ops.search_data_name(search_term, "fuzzy", 20)
+                        if result:
+                            print("No exact matches, showing similar names")
+                    if result:
+                        TableRenderer().render(result)
+                    else:
+                        print("No results found")
+
             
 
-        elif __choose_menu == 5:  # update a record
+            elif __choose_menu == 5:  # update a record
+
+                input_id = get_numerical_user_input(int, "Enter Employee ID", 0, None)
 
-            input_id = get_numerical_user_input(int, "Enter Employee ID", 0, None)
+                employee_to_update = db_ops.search_data_id(input_id)
 
-            employee_to_update = db_ops.search_data_id(input_id)
+                if employee_to_update is not None:
 
-            if employee_to_update is not None:
+                    confirmationProvider = UserConfirmationProvider("Confirm update to record")
+                    employee_to_update.apply_user_update()
 
-                confirmationProvider = UserConfirmationProvider("Confirm update to record")
-                employee_to_update.apply_user_update()
+                    if db_ops.update_data(employee_to_update, confirmationProvider):
+                        print("Update successful")
+                    else:
+                        print("Update unsucessful")
 
-                if db_ops.update_data(employee_to_update, confirmationProvider):
-                    print("Update successful")
                 else:
-                    print("Update unsucessful")
+                    print("No such record")  
 
-            else:
-                print("No such record")  
+            elif __choose_menu == 6: # delete a record
 
-        elif __choose_menu == 6: # delete a record
+                input_id = get_numerical_user_input(int, "Enter Employee ID:\t", 0, None)
 
-            input_id = get_numerical_user_input(int, "Enter Employee ID:\t", 0, None)
+                employee_to_update = db_ops.search_data_id(input_id)
 
-            employee_to_update = db_ops.search_data_id(input_id)
+                if employee_to_update is not None:
 
-            if employee_to_update is not None:
+                    confirmationProvider = UserConfirmationProvider("Confirm deletion of record")
 
-                confirmationProvider = UserConfirmationProvider("Confirm deletion of record")
+                    if db_ops.delete_data(input_id, confirmationProvider):
+                        print("Deletion successful")
+                    else:
+                        print("Deletion unsucessful")
 
-                if db_ops.delete_data(input_id, confirmationProvider):
-                    print("Deletion successful")
                 else:
-                    print("Deletion unsucessful")
+                    print("No such record")
 
-            else:
-                print("No such record")
 
+            elif __choose_menu == 7: # adjust an employee's pay
 
-        elif __choose_menu == 7: # adjust an employee's pay
+                input_id = get_numerical_user_input(int, "Enter Employee ID", 0, None)
 
-            input_id = get_numerical_user_input(int, "Enter Employee ID", 0, None)
+                employee_to_award = db_ops.search_data_id(input_id)
 
-            employee_to_award = db_ops.search_data_id(input_id)
+                if employee_to_award is not None:
 
-            if employee_to_award is not None:
+                    input_percentage = get_numerical_user_input(float, "Enter percentage pay adjustment", -99.0, None)
+                    confirmationProvider = UserConfirmationProvider(
+                        f"Confirm pay adjustment of {input_percentage}% for {employee_to_award.forename} {employee_to_award.surname}")
 
-                input_percentage = get_numerical_user_input(float, "Enter percentage pay adjustment", -99.0, None)
-                confirmationProvider = UserConfirmationProvider(
-                    f"Confirm pay adjustment of {input_percentage}% for {employee_to_award.forename} {employee_to_award.surname}")
+                    if db_ops.adjust_pay(input_id, input_percentage, confirmationProvider):
+                        print("Adjustment successful")
+                    else:
+                        print("Adjustment unsucessful")
 
-                if db_ops.adjust_pay(input_id, input_percentage, confirmationProvider):
-                    print("Adjustment successful")
                 else:
-                    print("Adjustment unsucessful")
+                    print("No such record")
 
-            else:
-                print("No such record")
 
+            elif __choose_menu == 8: # adjust all employees' pay
 
-        elif __choose_menu == 8: # adjust all employees' pay
+                input_percentage = float(input("Enter percentage pay adjustment:\t"))
 
-            input_percentage = float(input("Enter percentage pay adjustment:\t"))
-
-            if db_ops.adjust_pay_all_employees(input_percentage, UserConfirmationProvider("Confirm general pay adjustment")):
-                print("Adjustment successful")
-            else:
-                print("Adjustment unsucessful")
+                if db_ops.adjust_pay_all_employees(input_percentage, UserConfirmationProvider("Confirm general pay adjustment")):
+                    print("Adjustment successful")
+                else:
+                    print("Adjustment unsucessful")
 
 
-        elif __choose_menu == 9:
-            exit(0)
-        else:
-            print("Invalid Choice")
+            elif __choose_menu == 9:
+                exit(0)
+            else:
+                print("Invalid Choice")
 
 
 if __name__ == "__main__":
+    if len(sys.argv) > 1:
+        # Any arguments mean a non-interactive command, see the cli module
+        import cli
+        sys.exit(cli.main(sys.argv[1:]))
     main()
@@ -0,0 +1,251 @@
+"""
+Versioned schema migrations for the Employee database.
+
+The schema version of a database is kept in PRAGMA user_version. Version 0 is either an empty
+database or the original EmployeeUoB table, whose columns (other than Id) had no declared type.
+migrate() applies each migration newer than the database's version in order, each one in its own
+transaction together with the update to user_version, so a database is never left half upgraded.
+"""
+from employee import parse_salary
+
+SQL_CREATE_TYPED_TABLE = """CREATE TABLE {name} (
+    Id INTEGER PRIMARY KEY AUTOINCREMENT,
+    Title TEXT NOT NULL DEFAULT '',
+    Forename TEXT NOT NULL DEFAULT '' COLLATE NOCASE,
+    Surname TEXT NOT NULL DEFAULT '' COLLATE NOCASE,
+    EmailAddress TEXT NOT NULL DEFAULT '' COLLATE NOCASE,
+    Salary INTEGER NOT NULL DEFAULT 0
+)"""
+
+# Salary is stored as a whole number of cents. Blank email addresses are allowed for any number of
+# Employees, so the unique index only covers Employees who have one; queries by email must include
+# "EmailAddress <> ''" for SQLite to use it.
+SQL_CREATE_INDEXES = [
+    "CREATE UNIQUE INDEX IF NOT EXISTS EmployeeUoB_EmailAddress ON EmployeeUoB (EmailAddress) WHERE EmailAddress <> ''",
+    "CREATE INDEX IF NOT EXISTS EmployeeUoB_Name ON EmployeeUoB (Surname, Forename)",
+]
+
+# Salaries which aren't stored as numbers (the original application stored whatever was typed) are read
+# in Python with employee.parse_salary and written back as numbers before the rows are copied, since
+# SQLite's CAST would turn "abc" into 0 and "30,000" into 30.
+SQL_FIND_UNTYPED_SALARIES = "SELECT Id, Salary FROM EmployeeUoB WHERE typeof(Salary) NOT IN ('integer', 'real')"
+SQL_SET_UNTYPED_SALARY = "UPDATE EmployeeUoB SET Salary = ? WHERE Id = ?"
+SQL_COPY_UNTYPED_ROWS = """INSERT INTO EmployeeUoB_typed (Id, Title, Forename, Surname, EmailAddress, Salary)
+    SELECT Id, COALESCE(Title, ''), COALESCE(Forename, ''), COALESCE(Surname, ''), TRIM(COALESCE(EmailAddress, '')),
+           CAST(ROUND(Salary * 100) AS INTEGER)
+    FROM EmployeeUoB"""
+
+SQL_FIND_DUPLICATE_EMAILS = """SELECT TRIM(EmailAddress) FROM EmployeeUoB WHERE TRIM(COALESCE(EmailAddress, '')) <> ''
+    GROUP BY TRIM(EmailAddress) COLLATE NOCASE HAVING COUNT(*) > 1"""
+
+SQL_CREATE_SEARCH_TABLE = ("CREATE VIRTUAL TABLE EmployeeUoB_fts USING fts5(Forename, Surname, EmailAddress, "
+                           "content='EmployeeUoB', content_rowid='Id', tokenize='trigram')")
+SQL_CREATE_SEARCH_TRIGGERS = [
+    "CREATE TRIGGER EmployeeUoB_fts_insert AFTER INSERT ON EmployeeUoB BEGIN "
+    "INSERT INTO EmployeeUoB_fts(rowid, Forename, Surname, EmailAddress) VALUES (new.Id, new.Forename, new.Surname, new.EmailAddress); END",
+    "CREATE TRIGGER EmployeeUoB_fts_delete AFTER DELETE ON EmployeeUoB BEGIN "
+    "INSERT INTO EmployeeUoB_fts(EmployeeUoB_fts, rowid, Forename, Surname, EmailAddress) VALUES ('delete', old.Id, old.Forename, old.Surname, old.EmailAddress); END",
+    "CREATE TRIGGER EmployeeUoB_fts_update AFTER UPDATE OF Forename, Surname, EmailAddress ON EmployeeUoB BEGIN "
+    "INSERT INTO EmployeeUoB_fts(EmployeeUoB_fts, rowid, Forename, Surname, EmailAddress) VALUES ('delete', old.Id, old.Forename, old.Surname, old.EmailAddress); "
+    "INSERT INTO EmployeeUoB_fts(rowid, Forename, Surname, EmailAddress) VALUES (new.Id, new.Forename, new.Surname, new.EmailAddress); END",
+]
+SQL_REBUILD_SEARCH_INDEX = "INSERT INTO EmployeeUoB_fts(EmployeeUoB_fts) VALUES ('rebuild')"
+
+# Optional index for fuzzy name search (see namekeys): the distinct words of each Employee's name, and
+# the phonetic and trigram keys of each word. Keys of words no Employee has any more are left in place
+# until the index is rebuilt. The triggers are plain SQL, so any connection can still change EmployeeUoB:
+# they remove the words of deleted and renamed Employees, and queue new and renamed ones in
+# EmployeeUoB_name_keys_pending, whose words and keys are worked out in Python by
+# namekeys.update_name_key_index.
+SQL_CREATE_NAME_KEY_TABLES = [
+    "CREATE TABLE EmployeeUoB_name_words (Word TEXT NOT NULL, EmployeeId INTEGER NOT NULL, "
+    "PRIMARY KEY (Word, EmployeeId)) WITHOUT ROWID",
+    "CREATE INDEX EmployeeUoB_name_words_EmployeeId ON EmployeeUoB_name_words (EmployeeId)",
+    "CREATE TABLE EmployeeUoB_name_keys (Key TEXT NOT NULL, Word TEXT NOT NULL, PRIMARY KEY (Key, Word)) WITHOUT ROWID",
+    "CREATE TABLE EmployeeUoB_name_keys_pending (EmployeeId INTEGER PRIMARY KEY)",
+]
+SQL_QUEUE_NAME_WORDS = "INSERT OR IGNORE INTO EmployeeUoB_name_keys_pending (EmployeeId) VALUES (new.Id);"
+SQL_DELETE_NAME_WORDS = ("DELETE FROM EmployeeUoB_name_words WHERE EmployeeId = old.Id; "
+                         "DELETE FROM EmployeeUoB_name_keys_pending WHERE EmployeeId = old.Id;")
+SQL_CREATE_NAME_KEY_TRIGGERS = [
+    "CREATE TRIGGER EmployeeUoB_name_keys_insert AFTER INSERT ON EmployeeUoB BEGIN " + SQL_QUEUE_NAME_WORDS + " END",
+    "CREATE TRIGGER EmployeeUoB_name_keys_delete AFTER DELETE ON EmployeeUoB BEGIN " + SQL_DELETE_NAME_WORDS + " END",
+    "CREATE TRIGGER EmployeeUoB_name_keys_update AFTER UPDATE OF Id, Forename, Surname ON EmployeeUoB "
+    "WHEN old.Id IS NOT new.Id OR old.Forename IS NOT new.Forename COLLATE BINARY "
+    "OR old.Surname IS NOT new.Surname COLLATE BINARY BEGIN " + SQL_DELETE_NAME_WORDS + " " + SQL_QUEUE_NAME_WORDS + " END",
+]
+SQL_PENDING_NAME_WORDS_EXIST = "SELECT EXISTS (SELECT 1 FROM EmployeeUoB_name_keys_pending)"
+SQL_SELECT_PENDING_NAMES = ("SELECT e.Id, e.Forename, e.Surname FROM EmployeeUoB_name_keys_pending p "
+                            "JOIN EmployeeUoB e ON e.Id = p.EmployeeId WHERE p.EmployeeId > ? ORDER BY p.EmployeeId LIMIT ?")
+SQL_SELECT_ALL_NAMES = "SELECT Id, Forename, Surname FROM EmployeeUoB WHERE Id > ? ORDER BY Id LIMIT ?"
+SQL_SELECT_UNINDEXED_WORDS = ("SELECT value FROM json_each(?) "
+                              "WHERE NOT EXISTS (SELECT 1 FROM EmployeeUoB_name_words WHERE Word = value)")
+SQL_INSERT_NAME_KEYS = "INSERT OR IGNORE INTO EmployeeUoB_name_keys (Key, Word) VALUES (?, ?)"
+SQL_INSERT_NAME_WORDS = "INSERT OR IGNORE INTO EmployeeUoB_name_words (Word, EmployeeId) VALUES (?, ?)"
+SQL_CLEAR_PENDING_NAME_WORDS = "DELETE FROM EmployeeUoB_name_keys_pending"
+
+
+def object_exists(cur, name: str):
+    return cur.execute("SELECT 1 FROM sqlite_master WHERE name=?", (name,)).fetchone() is not None
+
+
+def create_typed_table(cur):
+    """Migration 1: typed columns, Salary as integer cents, a unique index on EmailAddress and an index
+    on (Surname, Forename).
+    An existing untyped EmployeeUoB table is rebuilt in place, keeping every Id and the AUTOINCREMENT
+    sequence, and the full-text search index (if there is one) is reattached to the new table. Blank
+    salaries, which the original application accepted, become 0. The upgrade is refused if email
+    addresses are shared, or if salaries can't be read as amounts.
+    """
+    if not object_exists(cur, "EmployeeUoB"):
+        cur.execute(SQL_CREATE_TYPED_TABLE.format(name="EmployeeUoB"))
+    else:
+        duplicates = cur.execute(SQL_FIND_DUPLICATE_EMAILS).fetchall()
+        if duplicates:
+            raise ValueError(f"Cannot upgrade the database: {len(duplicates)} email address(es) belong to more than "
+                             f"one Employee, eg: {duplicates[0][0]}. Correct them and try again.")
+
+        salaries = []
+        unreadable = []
+        for id, salary in cur.execute(SQL_FIND_UNTYPED_SALARIES).fetchall():
+            if salary is None or isinstance(salary, str) and salary.strip() == "":
+                salaries.append((0, id))
+                continue
+            try:
+                salaries.append((parse_salary(salary), id))
+            except ValueError:
+                unreadable.append(id)
+        if unreadable:
+            shown = ", ".join(str(id) for id in unreadable[:20]) + (", ..." if len(unreadable) > 20 else "")
+            raise ValueError(f"Cannot upgrade the database: {len(unreadable)} Employee(s) have a Salary which isn't "
+                             f"an amount, Ids: {shown}. Correct them and try again.")
+        cur.executemany(SQL_SET_UNTYPED_SALARY, salaries)
+
+        sequence = cur.execute("SELECT seq FROM sqlite_sequence WHERE name='EmployeeUoB'").fetchone()
+        cur.execute(SQL_CREATE_TYPED_TABLE.format(name="EmployeeUoB_typed"))
+        cur.execute(SQL_COPY_UNTYPED_ROWS)
+        cur.execute("DROP TABLE EmployeeUoB")
+        cur.execute("ALTER TABLE EmployeeUoB_typed RENAME TO EmployeeUoB")
+        if sequence is not None:
+            cur.execute("UPDATE sqlite_sequence SET seq=MAX(seq, ?) WHERE name='EmployeeUoB'", sequence)
+
+        if object_exists(cur, "EmployeeUoB_fts"):
+            for sql in SQL_CREATE_SEARCH_TRIGGERS:
+                cur.execute(sql)
+            cur.execute(SQL_REBUILD_SEARCH_INDEX)
+
+    for sql in SQL_CREATE_INDEXES:
+        cur.execute(sql)
+
+
+# The change log has one row per change to EmployeeUoB, holding the row's values after the change (or
+# before it, for deletes). Updates which leave a row as it was (eg: a 0% pay adjustment) aren't logged;
+# text is compared with BINARY collation, rather than the columns' NOCASE, so that changes to the case
+# of a name or email address are. EmployeeUoB_changes_purged records the last Seq removed by retention,
+# so that readers whose cursor is older can tell they have missed changes.
+SQL_CHANGE_VALUES = "{row}.Title, {row}.Forename, {row}.Surname, {row}.EmailAddress, {row}.Salary"
+SQL_CREATE_CHANGE_LOG = [
+    """CREATE TABLE EmployeeUoB_changes (
+    Seq INTEGER PRIMARY KEY AUTOINCREMENT,
+    EmployeeId INTEGER NOT NULL,
+    Operation TEXT NOT NULL CHECK (Operation IN ('insert', 'update', 'delete')),
+    ChangedAt REAL NOT NULL DEFAULT ((julianday('now') - 2440587.5) * 86400.0),
+    Title TEXT, Forename TEXT, Surname TEXT, EmailAddress TEXT, Salary INTEGER
+)""",
+    "CREATE INDEX EmployeeUoB_changes_EmployeeId ON EmployeeUoB_changes (EmployeeId, Seq)",
+    "CREATE TABLE EmployeeUoB_changes_purged (PurgedThrough INTEGER NOT NULL)",
+    "INSERT INTO EmployeeUoB_changes_purged VALUES (0)",
+    "CREATE TRIGGER EmployeeUoB_changes_insert AFTER INSERT ON EmployeeUoB BEGIN "
+    "INSERT INTO EmployeeUoB_changes (EmployeeId, Operation, Title, Forename, Surname, EmailAddress, Salary) "
+    "VALUES (new.Id, 'insert', " + SQL_CHANGE_VALUES.format(row="new") + "); END",
+    "CREATE TRIGGER EmployeeUoB_changes_update AFTER UPDATE ON EmployeeUoB "
+    "WHEN old.Id IS NOT new.Id OR old.Title IS NOT new.Title COLLATE BINARY "
+    "OR old.Forename IS NOT new.Forename COLLATE BINARY OR old.Surname IS NOT new.Surname COLLATE BINARY "
+    "OR old.EmailAddress IS NOT new.EmailAddress COLLATE BINARY OR old.Salary IS NOT new.Salary BEGIN "
+    "INSERT INTO EmployeeUoB_changes (EmployeeId, Operation, Title, Forename, Surname, EmailAddress, Salary) "
+    "VALUES (new.Id, 'update', " + SQL_CHANGE_VALUES.format(row="new") + "); END",
+    "CREATE TRIGGER EmployeeUoB_changes_delete AFTER DELETE ON EmployeeUoB BEGIN "
+    "INSERT INTO EmployeeUoB_changes (EmployeeId, Operation, Title, Forename, Surname, EmailAddress, Salary) "
+    "VALUES (old.Id, 'delete', " + SQL_CHANGE_VALUES.format(row="old") + "); END",
+]
+
+
+def create_change_log(cur):
+    """Migration 2: a change log of every insert, update and delete on EmployeeUoB, filled by triggers.
+    Changes made before the migration aren't in it.
+    """
+    for sql in SQL_CREATE_CHANGE_LOG:
+        cur.execute(sql)
+
+
+# Optional identifier of the Employee in an external system (eg: the HR feed synced by
+# DBOperations.sync_records). Like EmailAddress it is unique among the Employees who have one.
+SQL_ADD_EXTERNAL_ID = [
+    "ALTER TABLE EmployeeUoB ADD COLUMN ExternalId TEXT",
+    "CREATE UNIQUE INDEX EmployeeUoB_ExternalId ON EmployeeUoB (ExternalId) WHERE ExternalId IS NOT NULL",
+]
+
+
+def add_external_id(cur):
+    """Migration 3: a nullable ExternalId column with a unique index.
+    """
+    for sql in SQL_ADD_EXTERNAL_ID:
+        cur.execute(sql)
+
+
+# (version, description, function applying the migration to a cursor), in order
+MIGRATIONS = [
+    (1, "Typed columns, integer cents Salary, EmailAddress and name indexes", create_typed_table),
+    (2, "Change log of inserts, updates and deletes", create_change_log),
+    (3, "ExternalId column", add_external_id),
+]
+
+LATEST_VERSION = MIGRATIONS[-1][0]
+
+
+def schema_version(conn):
+    """
+    Args:
+        conn (sqlite3.Connection): A connection to the database
+
+    Returns:
+        int: The database's schema version
+    """
+    return conn.execute("PRAGMA user_version").fetchone()[0]
+
+
+def migrate(conn):
+    """Brings a database up to the latest schema version.
+
+    Args:
+        conn (sqlite3.Connection): A connection to the database, with no transaction open
+
+    Returns:
+        list[tuple]: (version, description) of each migration applied
+    """
+    applied = []
+    for version, description, upgrade in MIGRATIONS:
+        if schema_version(conn) >= version:
+            continue
+        cur = conn.cursor()
+        cur.execute("BEGIN IMMEDIATE")
+        try:
+            # Another connection may have migrated the database while this one waited for the lock
+            if schema_version(conn) < version:
+                upgrade(cur)
+                cur.execute(f"PRAGMA user_version = {version}")
+                applied.append((version, description))
+            conn.commit()
+        except BaseException:
+            conn.rollback()
+            raise
+    return applied
+
+
+def needs_migration(conn):
+    """
+    Returns:
+        bool: Whether the database has an EmployeeUoB table with an out of date schema
+    """
+    cur = conn.cursor()
+    return object_exists(cur, "EmployeeUoB") and schema_version(conn) < LATEST_VERSION
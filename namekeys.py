@@ -0,0 +1,294 @@
+"""
+Keys for fuzzy name search (see DBOperations.search_data_name_fuzzy).
+
+Names are split into words (see name_words), and each distinct word is given:
+
+- a Soundex code, prefixed "S" (eg: "Smith" and "Smyth" both give "SS530"),
+- a Metaphone code, prefixed "M" (eg: "Stephen" and "Steven" both give "MSTFN"),
+- its trigrams, prefixed "T", with the word padded by two spaces in front and one behind, as in
+  PostgreSQL's pg_trgm, so that the start and end of a word count for more. Trigrams with only one
+  letter, such as "  a", match too many names to be worth keeping, so "Ann" gives "T an", "Tann"
+  and "Tnn ".
+
+The name key index is two tables: EmployeeUoB_name_words holds the words of each Employee's name, and
+EmployeeUoB_name_keys the keys of each word. Since many Employees share each word, a search looks up
+the keys of the words in its term among a few thousand words rather than a million names. Triggers on
+EmployeeUoB queue new and renamed Employees in EmployeeUoB_name_keys_pending (see migrations), and
+update_name_key_index adds their words and keys; changing what word_keys returns needs the index to
+be rebuilt (see DBOperations.create_name_key_index).
+"""
+import json
+import re
+import unicodedata
+from collections import Counter
+
+import migrations
+
+word_pattern = re.compile(r"[^\W\d_]+")
+
+soundex_codes = {letter: str(code) for code, letters in enumerate(
+    ["aeiouy", "bfpv", "cgjkqsxz", "dt", "l", "mn", "r"]) for letter in letters}
+vowels = set("aeiou")
+soundex_key_prefix = "S"
+metaphone_key_prefix = "M"
+trigram_key_prefix = "T"
+metaphone_max_length = 6
+# Employees read by update_name_key_index at a time
+update_batch_size = 50000
+
+
+def name_words(text: str):
+    """Splits a name into words of lower case letters, without accents, so "Zoë O'Brien-Smith" gives
+    ["zoe", "o", "brien", "smith"]. Digits and punctuation are dropped.
+    """
+    if not text:
+        return []
+    decomposed = unicodedata.normalize("NFKD", text.casefold())
+    return word_pattern.findall("".join(c for c in decomposed if not unicodedata.combining(c)))
+
+
+def soundex(word: str):
+    """American Soundex: the first letter and the codes of the next three consonant sounds, eg:
+    "robert" and "rupert" give "R163". H and W don't separate letters with the same code.
+    """
+    if not word:
+        return ""
+    code = word[0].upper()
+    previous = soundex_codes.get(word[0], "")
+    for letter in word[1:]:
+        digit = soundex_codes.get(letter)
+        if digit is None:
+            # h, w and letters outside a-z
+            continue
+        if digit != "0" and digit != previous:
+            code += digit
+            if len(code) == 4:
+                break
+        previous = digit
+    return code.ljust(4, "0")
+
+
+def metaphone(word: str):
+    """Lawrence Philips' original Metaphone, truncated to metaphone_max_length characters. "0" stands
+    for "th" and "X" for "sh"; vowels are kept only at the start of the word.
+    """
+    word = "".join(c for c in word if "a" <= c <= "z")
+    if not word:
+        return ""
+    if word[:2] in ("ae", "gn", "kn", "pn", "wr"):
+        word = word[1:]
+    elif word[0] == "x":
+        word = "s" + word[1:]
+    elif word[:2] == "wh":
+        word = "w" + word[2:]
+
+    def at(i):
+        return word[i] if 0 <= i < len(word) else ""
+
+    code = []
+    for i, c in enumerate(word):
+        if c == at(i - 1) and c != "c":
+            continue
+        following, after = at(i + 1), at(i + 2)
+        if c in vowels:
+            if i == 0:
+                code.append(c.upper())
+        elif c == "b":
+            if not (at(i - 1) == "m" and i == len(word) - 1):
+                code.append("B")
+        elif c == "c":
+            if following == "i" and after == "a" or following == "h":
+                code.append("K" if at(i - 1) == "s" else "X")
+            elif following in ("i", "e", "y"):
+                if at(i - 1) != "s":
+                    code.append("S")
+            else:
+                code.append("K")
+        elif c == "d":
+            code.append("J" if following == "g" and after in ("e", "i", "y") else "T")
+        elif c == "g":
+            if following == "h" and after and after not in vowels:
+                continue
+            if following == "n" and (i + 2 == len(word) or word[i + 2:] == "ed"):
+                continue
+            if at(i - 1) == "d" and following in ("e", "i", "y"):
+                continue
+            code.append("J" if following in ("i", "e", "y") else "K")
+        elif c == "h":
+            if following in vowels and at(i - 1) not in ("c", "s", "p", "t", "g"):
+                code.append("H")
+        elif c == "k":
+            if at(i - 1) != "c":
+                code.append("K")
+        elif c == "p":
+            code.append("F" if following == "h" else "P")
+        elif c == "q":
+            code.append("K")
+        elif c == "s":
+            if following == "h" or following == "i" and after in ("o", "a"):
+                code.append("X")
+            else:
+                code.append("S")
+        elif c == "t":
+            if following == "i" and after in ("o", "a"):
+                code.append("X")
+            elif following == "h":
+                code.append("0")
+            elif not (following == "c" and after == "h"):
+                code.append("T")
+        elif c == "v":
+            code.append("F")
+        elif c in ("w", "y"):
+            if following in vowels:
+                code.append(c.upper())
+        elif c == "x":
+            code.append("KS")
+        elif c == "z":
+            code.append("S")
+        else:
+            code.append(c.upper())
+    return "".join(code)[:metaphone_max_length]
+
+
+def trigrams(word: str):
+    """The trigrams of the padded word which have at least two letters."""
+    padded = "  " + word + " "
+    return {padded[i:i + 3] for i in range(len(padded) - 2) if padded[i:i + 3].count(" ") < 2}
+
+
+def word_keys(word: str):
+    """The Soundex, Metaphone and trigram keys of one word."""
+    keys = {trigram_key_prefix + t for t in trigrams(word)}
+    keys.add(soundex_key_prefix + soundex(word))
+    phonetic = metaphone(word)
+    if phonetic:
+        keys.add(metaphone_key_prefix + phonetic)
+    return keys
+
+
+def name_word_keys(word):
+    """The keys of a word as a JSON array, for a search to read with json_each."""
+    return json.dumps(sorted(word_keys(word)))
+
+
+def update_name_key_index(conn, everyone: bool = False):
+    """Adds the words of the Employees queued in EmployeeUoB_name_keys_pending to the name key index,
+    with the keys of any words it didn't have, and empties the queue. Should be run in a write
+    transaction, so that no Employee is queued while it runs.
+
+    Args:
+        conn (sqlite3.Connection): A connection to a database with the name key index
+        everyone (bool, optional): Add every Employee, to fill a new index. Defaults to False.
+
+    Returns:
+        int: The number of Employees whose words were added
+    """
+    updated = 0
+    last_id = -1
+    while True:
+        names = conn.execute(migrations.SQL_SELECT_ALL_NAMES if everyone else migrations.SQL_SELECT_PENDING_NAMES,
+                             (last_id, update_batch_size)).fetchall()
+        if not names:
+            break
+        # Written in key order, which is much faster than the order of the Employees for a large batch
+        rows = sorted({(word, id) for id, forename, surname in names
+                       for word in name_words(forename) + name_words(surname)})
+        words = json.dumps(sorted({word for word, _ in rows}))
+        new_words = [word for (word,) in conn.execute(migrations.SQL_SELECT_UNINDEXED_WORDS, (words,))]
+        conn.executemany(migrations.SQL_INSERT_NAME_KEYS, sorted((key, word) for word in new_words
+                                                                 for key in word_keys(word)))
+        conn.executemany(migrations.SQL_INSERT_NAME_WORDS, rows)
+        updated += len(names)
+        last_id = names[-1][0]
+    conn.execute(migrations.SQL_CLEAR_PENDING_NAME_WORDS)
+    return updated
+
+
+def max_word_distance(word: str):
+    """How many edits a word of a search term may be from a word of a name and still match it: one,
+    or one for every three letters of longer words.
+    """
+    return max(1, len(word) // 3)
+
+
+def edit_distance(a: str, b: str, limit: int = None):
+    """The optimal string alignment distance between two strings: the number of single character
+    insertions, deletions, substitutions and transpositions of adjacent characters that turn one
+    into the other, so "smtih" is 1 from "smith".
+
+    Args:
+        limit (int, optional): Only distances up to this are needed; larger ones are returned as
+        limit + 1. Only the cells of the table within limit of its diagonal are worked out, and it
+        stops as soon as a row has nothing within limit. Defaults to no limit.
+    """
+    if limit is None:
+        limit = max(len(a), len(b))
+    if abs(len(a) - len(b)) > limit:
+        return limit + 1
+    beyond = limit + 1
+    previous2 = None
+    previous = [j if j <= limit else beyond for j in range(len(b) + 1)]
+    for i in range(1, len(a) + 1):
+        current = [beyond] * (len(b) + 1)
+        if i <= limit:
+            current[0] = i
+        row_min = current[0]
+        x = a[i - 1]
+        for j in range(max(1, i - limit), min(len(b), i + limit) + 1):
+            y = b[j - 1]
+            d = previous[j - 1] if x == y else previous[j - 1] + 1
+            if previous[j] + 1 < d:
+                d = previous[j] + 1
+            if current[j - 1] + 1 < d:
+                d = current[j - 1] + 1
+            if i > 1 and j > 1 and x == b[j - 2] and a[i - 2] == y and previous2[j - 2] + 1 < d:
+                d = previous2[j - 2] + 1
+            current[j] = d if d < beyond else beyond
+            if d < row_min:
+                row_min = d
+        if row_min > limit:
+            return beyond
+        previous2, previous = previous, current
+    return previous[-1]
+
+
+def close_words(word: str, candidates, limit: int):
+    """Finds the candidates within limit edits of a word, or which sound like it.
+
+    Args:
+        candidates (Iterable[tuple]): (candidate, whether it has the same Metaphone code as word)
+
+    Returns:
+        dict: {candidate: edit distance} for each candidate within limit, or with the same Metaphone code
+    """
+    counts = Counter(word)
+    found = {}
+    for candidate, sounds_alike in candidates:
+        if sounds_alike:
+            found[candidate] = edit_distance(word, candidate)
+            continue
+        if abs(len(candidate) - len(word)) > limit:
+            continue
+        # Each edit changes the counts of at most two letters, by one, so this rules out most
+        # candidates much more cheaply than edit_distance
+        difference = counts.copy()
+        difference.subtract(candidate)
+        if sum(map(abs, difference.values())) > 2 * limit:
+            continue
+        distance = edit_distance(word, candidate, limit)
+        if distance <= limit:
+            found[candidate] = distance
+    return found
+
+
+def name_distance(term_words, forename: str, surname: str):
+    """How far a search term is from an Employee's name: for each word of the term, its edit distance
+    from the closest word of the name, added up.
+
+    Args:
+        term_words (list[str]): name_words of the search term
+    """
+    words = name_words(forename) + name_words(surname)
+    if not words:
+        return sum(len(w) for w in term_words)
+    return sum(min(edit_distance(t, w) for w in words) for t in term_words)
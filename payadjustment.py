@@ -0,0 +1,41 @@
+from employeefilter import EmployeeFilter
+
+
+class PayRule:
+    """
+    One tier of a pay adjustment: Employees matching the rule's title and salary band have their pay
+    adjusted by the rule's percentage.
+    """
+
+    def __init__(self, percentage_increase: float, titles=None, min_salary: float = None, max_salary: float = None) -> None:
+        """
+        Args:
+            percentage_increase (float): Percentage by which to adjust pay (-99% to +inf%)
+            titles (list[str], optional): Only applies to Employees with one of these titles
+            min_salary (float, optional): Only applies to Employees paid at least this much
+            max_salary (float, optional): Only applies to Employees paid less than this
+        """
+        self.percentage_increase = percentage_increase
+        self.applies_to = EmployeeFilter(titles, min_salary, max_salary)
+
+    def factor(self):
+        return 1 + self.percentage_increase / 100
+
+
+def pay_factor_expression(rules):
+    """Builds an SQL CASE expression giving the factor by which each Employee's pay is multiplied.
+    The first matching rule applies; Employees matching no rule get NULL.
+
+    Args:
+        rules (list[PayRule]): The tiers of the adjustment, in order of precedence
+
+    Returns:
+        tuple: (sql, params)
+    """
+    sql = "CASE"
+    params = []
+    for rule in rules:
+        condition, condition_params = rule.applies_to.condition()
+        sql += f" WHEN {condition} THEN ?"
+        params += list(condition_params) + [rule.factor()]
+    return sql + " END", tuple(params)
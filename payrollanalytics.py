@@ -0,0 +1,168 @@
+try:
+    import numpy
+except ImportError:
+    numpy = None
+
+from employeefilter import EmployeeFilter
+
+
+class PayrollAnalytics:
+    """
+    The PayrollAnalytics class answers questions about salaries in the EmployeeUoB table without
+    creating Employee objects. Totals, means, histograms and groupings are computed by SQLite.
+    Medians and percentiles are computed with NumPy on the Salary column, fetched in chunks; if NumPy
+    isn't installed they are found by SQLite instead, which sorts the table once per percentile.
+
+    It uses the connections of the DBOperations object it is given, so it shares its pooling,
+    profile and instrumentation settings.
+    """
+
+    # Salary is stored in whole cents (see migrations), and reported in pounds
+    sql_salary_aggregates = "COUNT(*), TOTAL(Salary) / 100.0, AVG(Salary) / 100.0, MIN(Salary) / 100.0, MAX(Salary) / 100.0"
+    sql_summary = "SELECT " + sql_salary_aggregates + " from EmployeeUoB WHERE {condition}"
+    sql_group_summary = ("SELECT {key} AS GroupKey, " + sql_salary_aggregates + " "
+                         "from EmployeeUoB WHERE {condition} GROUP BY GroupKey ORDER BY GroupKey")
+    sql_salary_column = "SELECT Salary / 100.0 from EmployeeUoB WHERE {condition}"
+    sql_salary_at_rank = "SELECT Salary / 100.0 from EmployeeUoB WHERE {condition} ORDER BY Salary LIMIT 2 OFFSET ?"
+    sql_histogram = ("SELECT MIN(CAST((Salary / 100.0 - ?) / ? AS INTEGER), ?) AS Bucket, COUNT(*) "
+                     "from EmployeeUoB WHERE {condition} GROUP BY Bucket ORDER BY Bucket")
+
+    group_keys = {
+        "title": "Title",
+        "surname_initial": "UPPER(SUBSTR(Surname, 1, 1))",
+    }
+
+    def __init__(self, db_ops, chunk_size: int = 10000) -> None:
+        """
+        Args:
+            db_ops (DBOperations): The database to analyse
+            chunk_size (int, optional): Rows fetched at a time when building a NumPy column. Defaults to 10000.
+        """
+        self.db_ops = db_ops
+        self.chunk_size = chunk_size
+
+    def _query(self, template, params=(), employee_filter: EmployeeFilter = None, trailing_params=(), **format_args):
+        """Runs an aggregate query over the Employees selected by employee_filter. params are the 
+        parameters which come before the filter's condition in the query, trailing_params those after it.
+
+        Returns:
+            list[tuple]: The result rows
+        """
+        employee_filter = employee_filter or EmployeeFilter()
+        condition, condition_params = employee_filter.condition()
+        try:
+            self.db_ops.get_connection()
+            employee_filter.prepare(self.db_ops.cur)
+            self.db_ops.cur.execute(template.format(condition=condition, **format_args),
+                                    tuple(params) + condition_params + tuple(trailing_params))
+            return self.db_ops.cur.fetchall()
+        finally:
+            self.db_ops.release_connection()
+
+    def summary(self, employee_filter: EmployeeFilter = None):
+        """
+        Args:
+            employee_filter (EmployeeFilter, optional): Which Employees to include. Defaults to everyone.
+
+        Returns:
+            dict: count, total, mean, min and max salary. mean, min and max are None if there are no Employees.
+        """
+        count, total, mean, minimum, maximum = self._query(self.sql_summary, employee_filter=employee_filter)[0]
+        return {"count": count, "total": total, "mean": mean, "min": minimum, "max": maximum}
+
+    def total(self, employee_filter: EmployeeFilter = None):
+        return self.summary(employee_filter)["total"]
+
+    def mean(self, employee_filter: EmployeeFilter = None):
+        return self.summary(employee_filter)["mean"]
+
+    def group_by(self, key: str = "title", employee_filter: EmployeeFilter = None):
+        """Summarises salaries for each group of Employees.
+
+        Args:
+            key (str, optional): "title" or "surname_initial". Defaults to "title".
+            employee_filter (EmployeeFilter, optional): Which Employees to include. Defaults to everyone.
+
+        Returns:
+            dict: For each group, a dict of count, total, mean, min and max salary
+        """
+        if key not in self.group_keys:
+            raise ValueError(f"Unknown group key {key!r}, expected one of {', '.join(self.group_keys)}")
+        rows = self._query(self.sql_group_summary, employee_filter=employee_filter, key=self.group_keys[key])
+        return {group: {"count": count, "total": total, "mean": mean, "min": minimum, "max": maximum}
+                for group, count, total, mean, minimum, maximum in rows}
+
+    def histogram(self, bins: int = 10, employee_filter: EmployeeFilter = None):
+        """Counts Employees in equal-width salary bands between the lowest and highest salary.
+
+        Args:
+            bins (int, optional): Number of bands. Defaults to 10.
+            employee_filter (EmployeeFilter, optional): Which Employees to include. Defaults to everyone.
+
+        Returns:
+            list[tuple]: (band lower bound, band upper bound, number of Employees) for each band
+        """
+        summary = self.summary(employee_filter)
+        if not summary["count"]:
+            return []
+        low, high = float(summary["min"]), float(summary["max"])
+        width = (high - low) / bins or 1.0
+        counts = dict(self._query(self.sql_histogram, (low, width, bins - 1), employee_filter))
+        return [(low + i * width, low + (i + 1) * width, counts.get(i, 0)) for i in range(bins)]
+
+    def salary_column(self, employee_filter: EmployeeFilter = None):
+        """Fetches the Salary column into a NumPy array, chunk_size rows at a time.
+
+        Returns:
+            numpy.ndarray: The salaries, as float64
+        """
+        if numpy is None:
+            raise ImportError("salary_column needs NumPy")
+        employee_filter = employee_filter or EmployeeFilter()
+        condition, params = employee_filter.condition()
+        chunks = []
+        try:
+            self.db_ops.get_connection()
+            employee_filter.prepare(self.db_ops.cur)
+            self.db_ops.cur.execute(self.sql_salary_column.format(condition=condition), params)
+            while True:
+                rows = self.db_ops.cur.fetchmany(self.chunk_size)
+                if not rows:
+                    break
+                chunks.append(numpy.fromiter((r[0] for r in rows), dtype=numpy.float64, count=len(rows)))
+        finally:
+            self.db_ops.release_connection()
+        return numpy.concatenate(chunks) if chunks else numpy.empty(0)
+
+    def percentiles(self, percentages=(25, 50, 75, 90, 99), employee_filter: EmployeeFilter = None):
+        """Finds salary percentiles, interpolating linearly between the two nearest salaries.
+
+        Args:
+            percentages (Iterable[float], optional): The percentiles to find, from 0 to 100.
+            employee_filter (EmployeeFilter, optional): Which Employees to include. Defaults to everyone.
+
+        Returns:
+            dict: The salary at each percentile, or None for each if there are no Employees
+        """
+        percentages = list(percentages)
+        if numpy is not None:
+            column = self.salary_column(employee_filter)
+            if not len(column):
+                return {p: None for p in percentages}
+            return dict(zip(percentages, (float(v) for v in numpy.percentile(column, percentages))))
+
+        count = self.summary(employee_filter)["count"]
+        result = {}
+        for p in percentages:
+            if not count:
+                result[p] = None
+                continue
+            position = (count - 1) * p / 100
+            rank = int(position)
+            values = [r[0] for r in self._query(self.sql_salary_at_rank, (), employee_filter, (rank,))]
+            upper = values[1] if len(values) > 1 else values[0]
+            result[p] = values[0] + (upper - values[0]) * (position - rank)
+        return result
+
+    def median(self, employee_filter: EmployeeFilter = None):
+        return self.percentiles((50,), employee_filter)[50]
@@ -0,0 +1,234 @@
+import os
+import sqlite3
+import threading
+import time
+
+import namekeys
+
+
+class ReadReplica:
+    """
+    The ReadReplica class keeps an in-memory copy of a database file for DBOperations to answer reads
+    from (see the read_replica argument of DBOperations). The copy is made with the sqlite3 backup API
+    and kept up to date from the change log:
+
+    - Before a read, if max_staleness seconds have passed since the last check, PRAGMA data_version
+      on a connection kept open to the file, and the modification time of the file and its WAL, are
+      compared with their values at the last check. So reads are never answered from a copy more
+      than max_staleness seconds (plus the time of a refresh) behind the file.
+    - If either has changed, the Employees changed since the last refresh are found from the change
+      log and read again from the file, in one read transaction, replacing their rows in the copy.
+    - The whole file is copied again instead if the change log doesn't go back far enough (it has
+      been compacted), the schema has changed (eg: a migration or the search index), the file has
+      been replaced, or more than
+      full_refresh_fraction of the rows have changed.
+
+    The copy has a single connection, so reads through it are serialised; they are answered from
+    memory, so are short.
+    """
+
+    sql_data_version = "PRAGMA data_version"
+    sql_schema_version = "PRAGMA schema_version"
+    sql_change_log_exists = "SELECT 1 from sqlite_master WHERE name='EmployeeUoB_changes'"
+    sql_latest_change = ("SELECT MAX(PurgedThrough, (SELECT COALESCE(MAX(Seq), 0) from EmployeeUoB_changes)) "
+                         "from EmployeeUoB_changes_purged")
+    sql_purged_through = "SELECT PurgedThrough from EmployeeUoB_changes_purged"
+    sql_changed_ids = "SELECT DISTINCT EmployeeId from EmployeeUoB_changes WHERE Seq > ? AND Seq <= ?"
+    sql_changed_rows = ("SELECT * from EmployeeUoB WHERE Id IN "
+                        "(SELECT EmployeeId from EmployeeUoB_changes WHERE Seq > ? AND Seq <= ?)")
+    sql_count_rows = "SELECT COUNT(*) from EmployeeUoB"
+    sql_delete_row = "DELETE FROM EmployeeUoB WHERE Id = ?"
+    sql_insert_row = "INSERT INTO EmployeeUoB VALUES ({placeholders})"
+    # The copy's own change log isn't read (changes_since reads the file), so its triggers are dropped
+    sql_change_log_triggers = ("SELECT name from sqlite_master WHERE type='trigger' AND name LIKE 'EmployeeUoB^_changes^_%' "
+                               "ESCAPE '^'")
+    sql_name_key_queue_exists = "SELECT 1 from sqlite_master WHERE name='EmployeeUoB_name_keys_pending'"
+
+    def __init__(self, database_name: str, max_staleness: float = 0, full_refresh_fraction: float = 0.25,
+                 on_refresh=None, trace=None) -> None:
+        """
+        Args:
+            database_name (str): Path to the database file
+            max_staleness (float, optional): Seconds a read may go without checking the file for changes.
+            Defaults to 0, checking before every read.
+            full_refresh_fraction (float, optional): Fraction of the rows which can change before the
+            whole file is copied rather than just the changed rows. Defaults to 0.25.
+            on_refresh (callable, optional): Called after each refresh which changed the copy, eg: to
+            empty a cache.
+            trace (callable, optional): Trace callback for the in-memory connection (see Instrumentation).
+        """
+        self.database_name = database_name
+        self.max_staleness = max_staleness
+        self.full_refresh_fraction = full_refresh_fraction
+        self.on_refresh = on_refresh
+        self.lock = threading.RLock()
+        self.conn = sqlite3.connect(":memory:", check_same_thread=False)
+        if trace is not None:
+            self.conn.set_trace_callback(trace)
+        self.source = None
+        self.cursor = None
+        self.schema_version = None
+        self.signature = None
+        self.checked_at = None
+        self._expired = False
+        self.stats = {"checks": 0, "full refreshes": 0, "incremental refreshes": 0, "last refresh": None}
+        self.refresh(full=True)
+
+    def close(self):
+        with self.lock:
+            if self.source is not None:
+                self.source.close()
+            self.conn.close()
+
+    def acquire(self):
+        """Takes the copy for a read, first refreshing it if it may be more than max_staleness seconds old.
+        Must be followed by release.
+
+        Returns:
+            sqlite3.Connection: The in-memory connection
+        """
+        self.lock.acquire()
+        try:
+            if self._expired or time.monotonic() - self.checked_at >= self.max_staleness:
+                self.check()
+        except BaseException:
+            self.lock.release()
+            raise
+        return self.conn
+
+    def release(self):
+        if self.conn.in_transaction:
+            self.conn.rollback()
+        self.lock.release()
+
+    def expire(self):
+        """Makes the next read check the file, whatever max_staleness is, eg: after a write through
+        DBOperations, so that its own changes are seen straight away.
+        """
+        self._expired = True
+
+    def file_signature(self):
+        """The data version and the identity and modification times of the file and its WAL."""
+        stat = os.stat(self.database_name)
+        try:
+            wal_mtime = os.stat(self.database_name + "-wal").st_mtime_ns
+        except FileNotFoundError:
+            wal_mtime = None
+        data_version = self.source.execute(self.sql_data_version).fetchone()[0]
+        return data_version, (stat.st_dev, stat.st_ino), stat.st_mtime_ns, wal_mtime
+
+    def check(self):
+        """Refreshes the copy if the file has changed since the last check."""
+        self.stats["checks"] += 1
+        self._expired = False
+        signature = self.file_signature()
+        if signature != self.signature:
+            # A new file identity means the file has been replaced, and self.source still reads the old one
+            self.refresh(full=signature[1] != self.signature[1])
+        self.checked_at = time.monotonic()
+
+    def staleness(self):
+        """
+        Returns:
+            float: Seconds since the copy was last known to match the file
+        """
+        return time.monotonic() - self.checked_at
+
+    def refresh(self, full: bool = False):
+        """Brings the copy up to date with the file, incrementally from the change log if possible.
+
+        Args:
+            full (bool, optional): Copy the whole file, and reopen it. Defaults to False.
+        """
+        with self.lock:
+            start = time.perf_counter()
+            rows = None
+            if not full:
+                # Taken before reading the changes, so a change made while they are read is seen next time
+                signature = self.file_signature()
+                rows = self.refresh_incrementally()
+                if rows is not None:
+                    self.signature = signature
+            if rows is None:
+                full = True
+                rows = self.refresh_fully()
+            self.checked_at = time.monotonic()
+
+            if rows:
+                self.stats["full refreshes" if full else "incremental refreshes"] += 1
+                self.stats["last refresh"] = {"mode": "full" if full else "incremental", "rows": rows,
+                                              "seconds": round(time.perf_counter() - start, 6)}
+                if self.on_refresh is not None:
+                    self.on_refresh()
+
+    def latest_change(self):
+        if self.source.execute(self.sql_change_log_exists).fetchone() is None:
+            return None
+        return self.source.execute(self.sql_latest_change).fetchone()[0]
+
+    def refresh_fully(self):
+        """Copies the whole file into the copy.
+
+        Returns:
+            int: The number of rows in EmployeeUoB (at least 1, so that the refresh is counted)
+        """
+        if self.source is not None:
+            self.source.close()
+        self.source = sqlite3.connect(self.database_name, check_same_thread=False)
+        # The signature and cursor are read first, so changes made during the copy are applied again
+        # rather than missed
+        self.signature = self.file_signature()
+        self.cursor = self.latest_change()
+        self.schema_version = self.source.execute(self.sql_schema_version).fetchone()[0]
+        self.source.backup(self.conn)
+        for (trigger,) in self.conn.execute(self.sql_change_log_triggers).fetchall():
+            self.conn.execute(f"DROP TRIGGER {trigger}")
+        self.update_name_key_index()
+        try:
+            return max(self.conn.execute(self.sql_count_rows).fetchone()[0], 1)
+        except sqlite3.OperationalError:
+            # No EmployeeUoB table yet
+            return 1
+
+    def refresh_incrementally(self):
+        """Replaces the rows of the Employees changed since the last refresh.
+
+        Returns:
+            int: The number of Employees changed (0 if none), or None if a full refresh is needed
+        """
+        source = self.source
+        source.execute("BEGIN")
+        try:
+            latest = self.latest_change()
+            if latest is None or self.cursor is None or latest < self.cursor:
+                return None
+            if latest == self.cursor and source.execute(self.sql_schema_version).fetchone()[0] == self.schema_version:
+                return 0
+            if (source.execute(self.sql_purged_through).fetchone()[0] > self.cursor
+                    or source.execute(self.sql_schema_version).fetchone()[0] != self.schema_version):
+                return None
+
+            params = (self.cursor, latest)
+            ids = source.execute(self.sql_changed_ids, params).fetchall()
+            if len(ids) > self.full_refresh_fraction * source.execute(self.sql_count_rows).fetchone()[0]:
+                return None
+            rows = source.execute(self.sql_changed_rows, params).fetchall()
+        finally:
+            source.commit()
+
+        with self.conn:
+            self.conn.executemany(self.sql_delete_row, ids)
+            if rows:
+                placeholders = ", ".join("?" * len(rows[0]))
+                self.conn.executemany(self.sql_insert_row.format(placeholders=placeholders), rows)
+        self.update_name_key_index()
+        self.cursor = latest
+        return len(ids)
+
+    def update_name_key_index(self):
+        """Adds the Employees queued by the name key index's triggers (see namekeys), in the file or as
+        their rows were replaced, to the copy's index, if it has one.
+        """
+        if self.conn.execute(self.sql_name_key_queue_exists).fetchone() is not None:
+            with self.conn:
+                namekeys.update_name_key_index(self.conn)
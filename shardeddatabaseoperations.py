@@ -0,0 +1,362 @@
+import heapq
+import itertools
+import os
+import threading
+import zlib
+from concurrent.futures import ThreadPoolExecutor
+
+import namekeys
+from changepreview import ChangePreview
+from databaseoperations import DBOperations
+from employee import Employee
+from userconfirmation import UserConfirmationProvider
+
+
+class ShardConfirmationProvider(UserConfirmationProvider):
+    """
+    The confirmation provider given to a shard's DBOperations. It passes each request to a function,
+    which translates the shard's Ids and asks the caller's provider.
+    """
+
+    def __init__(self, request) -> None:
+        super().__init__("")
+        self.request = request
+
+    def requestConfirmation(self, data):
+        return self.request(data)
+
+
+class FanOutConfirmation:
+    """
+    Collects the confirmation requests of one change made on every shard at once, so that the user is
+    asked a single time with the ChangePreviews of all the shards combined. Each shard's worker waits
+    in requestConfirmation until every shard has either asked or finished without asking; the last to
+    do so asks the user and all of them are given the same answer.
+    """
+
+    def __init__(self, provider: UserConfirmationProvider, sharded) -> None:
+        """
+        Args:
+            provider (UserConfirmationProvider): The caller's provider
+            sharded (ShardedDBOperations): Used to translate Ids in the previews
+        """
+        self.provider = provider
+        self.sharded = sharded
+        self.pending = set(range(len(sharded.shards)))
+        self.previews = {}
+        self.decision = None
+        self.deciding = False
+        self.condition = threading.Condition()
+
+    def for_shard(self, index: int):
+        return ShardConfirmationProvider(lambda data: self.request(index, data))
+
+    def request(self, index: int, data):
+        with self.condition:
+            self.previews[index] = self.sharded.to_global(data, index)
+            self.pending.discard(index)
+            self.decide()
+            while self.decision is None:
+                self.condition.wait()
+            return self.decision
+
+    def finished(self, index: int):
+        """Called when a shard's call returns, in case it never asked for confirmation."""
+        with self.condition:
+            self.pending.discard(index)
+            self.decide()
+
+    def decide(self):
+        """Asks the caller's provider once every shard has been heard from. Called holding the condition."""
+        if self.pending or self.deciding:
+            return
+        self.deciding = True
+        decision = False
+        self.condition.release()
+        try:
+            if self.previews:
+                decision = bool(self.provider.requestConfirmation(self.combined_preview()))
+        finally:
+            self.condition.acquire()
+            self.decision = decision
+            self.condition.notify_all()
+
+    def combined_preview(self):
+        previews = [self.previews[i] for i in sorted(self.previews)]
+        row_counts = [p.row_count for p in previews]
+        sample_size = max(len(p.sample) for p in previews)
+        sample = list(itertools.islice(heapq.merge(*(p.sample for p in previews), key=lambda e: e.id), sample_size))
+        aggregates = {}
+        for p in previews:
+            for name, value in p.aggregates.items():
+                if isinstance(value, (int, float)) and name in aggregates:
+                    aggregates[name] = round(aggregates[name] + value, 2)
+                else:
+                    aggregates.setdefault(name, value)
+        return ChangePreview(None if None in row_counts else sum(row_counts), sample, aggregates)
+
+
+class ShardedDBOperations:
+    """
+    The ShardedDBOperations class spreads the EmployeeUoB table over shard_count SQLite files, each
+    managed by its own pooled DBOperations, so that writes to different shards don't wait for each
+    other's write lock. It offers the same functions as DBOperations for single Employees and for
+    whole-table operations.
+
+    Ids are global: the Employee with Id i is row i // shard_count of shard i % shard_count. Id-based
+    functions (search_data_id, update_data, delete_data, adjust_pay) therefore go straight to one shard.
+    New Employees are placed in turn on each shard, or, with a key, on the shard given by a hash of
+    that attribute. select_all, search_data_name and adjust_pay_all_employees run on every shard in
+    parallel on a thread pool (SQLite releases the GIL while it works) and merge the results;
+    adjust_pay_all_employees asks for one confirmation covering all shards, but each shard commits its
+    own part, so a conflict on one shard doesn't undo the others.
+
+    Email addresses are only unique within a shard, unless key is "email". Because Ids depend on it,
+    shard_count can't be changed once the shards hold data.
+    """
+
+    shard_name_format = "{stem}.shard{index}{extension}"
+
+    def __init__(self, database_name: str, shard_count: int = 4, key: str = None, max_workers: int = None,
+                 **db_options):
+        """
+        Args:
+            database_name (str): Path the shard files are named after, eg: EmployeeDatabase.db gives
+            EmployeeDatabase.shard0.db, EmployeeDatabase.shard1.db, ...
+            shard_count (int, optional): Number of shards. Defaults to 4.
+            key (str, optional): Employee attribute (eg: "email") whose hash picks the shard for new
+            Employees. Defaults to placing them on each shard in turn.
+            max_workers (int, optional): Threads used for fan-out. Defaults to shard_count.
+            **db_options: Any other DBOperations arguments (cache_size, profile, instrumentation, ...).
+            The shards are always pooled.
+        """
+        if shard_count < 1:
+            raise ValueError("shard_count must be at least 1")
+        if key is not None and key not in Employee.user_editable_attributes:
+            raise ValueError(f"Unknown shard key {key!r}, expected one of {', '.join(Employee.user_editable_attributes)}")
+
+        stem, extension = os.path.splitext(database_name)
+        self.shard_names = [self.shard_name_format.format(stem=stem, index=i, extension=extension)
+                            for i in range(shard_count)]
+        extra_shard = self.shard_name_format.format(stem=stem, index=shard_count, extension=extension)
+        if os.path.exists(extra_shard):
+            raise ValueError(f"{extra_shard} exists, so the database has more than {shard_count} shards")
+
+        self.database_name = database_name
+        self.key = key
+        self.shards = [DBOperations(name, pooled=True, **db_options) for name in self.shard_names]
+        self.executor = ThreadPoolExecutor(max_workers or shard_count, thread_name_prefix="ShardedDBOperations")
+        # Changes asking one confirmation for all shards need a thread per shard, as the shards wait for
+        # each other; they are run one at a time on their own pool so they can't starve each other.
+        self.confirmed_executor = ThreadPoolExecutor(shard_count, thread_name_prefix="ShardedDBOperations-confirmed")
+        self._confirmed_lock = threading.Lock()
+        self._next_shard = itertools.count()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, exc_type, exc_value, traceback):
+        self.close()
+
+    def close(self):
+        """Waits for running fan-out calls, then closes every shard's connections."""
+        self.executor.shutdown(wait=True)
+        self.confirmed_executor.shutdown(wait=True)
+        for shard in self.shards:
+            shard.close()
+
+    def shard_index(self, id: int):
+        """
+        Returns:
+            int: The shard holding the Employee with the given global Id
+        """
+        return id % len(self.shards)
+
+    def local_id(self, id: int):
+        return id // len(self.shards)
+
+    def global_id(self, local_id: int, index: int):
+        return local_id * len(self.shards) + index
+
+    def placement(self, employee: Employee):
+        """
+        Returns:
+            int: The shard a new Employee is inserted into
+        """
+        if self.key is None:
+            return next(self._next_shard) % len(self.shards)
+        value = str(getattr(employee, self.key)).lower()
+        return zlib.crc32(value.encode()) % len(self.shards)
+
+    def to_global(self, data, index: int):
+        """Copies Employees (alone, in a list or in a ChangePreview) from shard index with their Ids made global.
+        """
+        if isinstance(data, Employee):
+            return Employee(self.global_id(data.id, index) if data.id else 0, data.title, data.forename,
+                            data.surname, data.email, data.salary)
+        if isinstance(data, list):
+            return [self.to_global(e, index) for e in data]
+        if isinstance(data, ChangePreview):
+            return ChangePreview(data.row_count, self.to_global(list(data.sample), index), data.aggregates)
+        return data
+
+    def globalise(self, employees, index: int):
+        """Makes the Ids of Employees returned by shard index global, in place (the shards return new
+        Employee objects from every query, so nothing else holds them).
+
+        Returns:
+            list[Employee]: employees
+        """
+        if employees is not None:
+            n = len(self.shards)
+            for e in employees:
+                e.id = e.id * n + index
+        return employees
+
+    def routed_provider(self, provider: UserConfirmationProvider, index: int):
+        return ShardConfirmationProvider(lambda data: provider.requestConfirmation(self.to_global(data, index)))
+
+    def fan_out(self, call, executor=None):
+        """Runs call(shard, index) on every shard in parallel.
+
+        Returns:
+            list: The results, in shard order
+        """
+        executor = executor or self.executor
+        futures = [executor.submit(call, shard, index) for index, shard in enumerate(self.shards)]
+        return [f.result() for f in futures]
+
+    def create_table_if_not_exists(self):
+        self.fan_out(lambda shard, index: shard.create_table_if_not_exists())
+
+    def create_table(self):
+        self.fan_out(lambda shard, index: shard.create_table())
+
+    def create_name_key_index(self):
+        return all(self.fan_out(lambda shard, index: shard.create_name_key_index()))
+
+    def update_name_key_index(self, best_effort: bool = False):
+        updated = self.fan_out(lambda shard, index: shard.update_name_key_index(best_effort))
+        return None if None in updated else sum(updated)
+
+    def table_exists(self, table_name: str = None):
+        return all(self.fan_out(lambda shard, index: shard.table_exists(table_name)))
+
+    def insert_data(self, data_to_insert: Employee, confirmationProvider: UserConfirmationProvider):
+        """See DBOperations.insert_data. The Employee is given its global Id once inserted.
+        """
+        index = self.placement(data_to_insert)
+        success = self.shards[index].insert_data(data_to_insert, confirmationProvider)
+        if success:
+            data_to_insert.id = self.global_id(data_to_insert.id, index)
+        return success
+
+    def insert_many(self, employees, confirmationProvider: UserConfirmationProvider, batch_size: int = 1000,
+                    sample_size: int = 5, row_count: int = None):
+        """See DBOperations.insert_many. Each batch is split between the shards, which write their
+        parts in parallel.
+        """
+        if row_count is None and hasattr(employees, "__len__"):
+            row_count = len(employees)
+        employees = iter(employees)
+        sample = list(itertools.islice(employees, sample_size))
+        if not sample or not confirmationProvider.requestConfirmation(ChangePreview(row_count, sample)):
+            return 0
+
+        inserted = 0
+        employees = itertools.chain(sample, employees)
+        approved = ShardConfirmationProvider(lambda data: True)
+        while True:
+            parts = [[] for _ in self.shards]
+            for e in itertools.islice(employees, batch_size * len(self.shards)):
+                parts[self.placement(e)].append(e)
+            if not any(parts):
+                return inserted
+            inserted += sum(self.fan_out(lambda shard, index: shard.insert_many(parts[index], approved, batch_size)
+                                         if parts[index] else 0))
+
+    def select_all(self):
+        """
+        Returns:
+            list[Employee]: Every Employee on every shard, in Id order
+        """
+        results = self.fan_out(lambda shard, index: self.globalise(shard.select_all(), index))
+        if any(r is None for r in results):
+            return None
+        return list(heapq.merge(*results, key=lambda e: e.id))
+
+    def search_data_name(self, term, mode: str = "auto", limit: int = None):
+        """See DBOperations.search_data_name. Each shard returns up to limit matches; "prefix" results
+        are merged in name order, "like" results in Id order, "fuzzy" results by edit distance, and
+        full-text results by taking each shard's best match in turn, since their ranks can't be compared
+        across shards.
+        """
+        results = self.fan_out(lambda shard, index: self.globalise(shard.search_data_name(term, mode, limit), index))
+        if any(r is None for r in results):
+            return None
+
+        if mode == "prefix":
+            merged = heapq.merge(*results, key=lambda e: (e.surname, e.forename))
+        elif mode == "fuzzy":
+            words = namekeys.name_words(term)
+            merged = heapq.merge(*results, key=lambda e: (namekeys.name_distance(words, e.forename, e.surname), e.id))
+        elif mode == "like" or len(term) < 3 or not all(shard.search_index_exists() for shard in self.shards):
+            merged = heapq.merge(*results, key=lambda e: e.id)
+        else:
+            merged = (e for row in itertools.zip_longest(*results) for e in row if e is not None)
+        return list(itertools.islice(merged, limit))
+
+    def search_data_id(self, search_term: int):
+        index = self.shard_index(search_term)
+        return self.to_global(self.shards[index].search_data_id(self.local_id(search_term)), index)
+
+    def search_data_email(self, email: str):
+        """See DBOperations.search_data_email. With key="email" only one shard is searched, unless the
+        Employee has since been given an email address which hashes to another shard.
+        """
+        if self.key == "email":
+            index = self.placement(Employee(email=email))
+            found = self.shards[index].search_data_email(email)
+            if found is not None:
+                return self.to_global(found, index)
+
+        for index, found in enumerate(self.fan_out(lambda shard, index: shard.search_data_email(email))):
+            if found is not None:
+                return self.to_global(found, index)
+        return None
+
+    def update_data(self, employee: Employee, confirmationProvider: UserConfirmationProvider):
+        """See DBOperations.update_data. The Employee stays on its shard even if its key attribute changes.
+        """
+        index = self.shard_index(employee.id)
+        local = Employee(self.local_id(employee.id), employee.title, employee.forename, employee.surname,
+                         employee.email, employee.salary)
+        return self.shards[index].update_data(local, self.routed_provider(confirmationProvider, index))
+
+    def delete_data(self, id: int, confirmationProvider: UserConfirmationProvider):
+        index = self.shard_index(id)
+        return self.shards[index].delete_data(self.local_id(id), self.routed_provider(confirmationProvider, index))
+
+    def adjust_pay(self, id: int, percentage_increase: float, confirmationProvider: UserConfirmationProvider):
+        index = self.shard_index(id)
+        return self.shards[index].adjust_pay(self.local_id(id), percentage_increase,
+                                             self.routed_provider(confirmationProvider, index))
+
+    def adjust_pay_all_employees(self, percentage_increase: float, confirmationProvider: UserConfirmationProvider,
+                                 preview_size: int = 10):
+        """See DBOperations.adjust_pay_all_employees. The confirmation is asked once, with the shards'
+        previews combined (row counts and payroll totals added up).
+
+        Returns:
+            bool: Whether every shard's part succeeded
+        """
+        confirmation = FanOutConfirmation(confirmationProvider, self)
+
+        def adjust(shard, index):
+            try:
+                return shard.adjust_pay_all_employees(percentage_increase, confirmation.for_shard(index), preview_size)
+            finally:
+                confirmation.finished(index)
+
+        with self._confirmed_lock:
+            return all(self.fan_out(adjust, self.confirmed_executor))
@@ -0,0 +1,102 @@
+import os
+import threading
+import time
+from datetime import datetime
+
+
+class SnapshotScheduler:
+    """
+    The SnapshotScheduler class takes a backup of a database every interval seconds on a background
+    thread, using DBOperations.backup, and keeps only the newest few. Snapshots are named after the
+    database file and the time they were taken, eg: EmployeeDatabase-20240131-235900-123.db, so they
+    sort oldest first.
+
+    A failed snapshot is reported by DBOperations.report_error and the scheduler carries on with the
+    next one.
+    """
+
+    def __init__(self, db_ops, directory: str, interval: float = 3600, keep: int = 24, pages: int = 256,
+                 sleep: float = 0.05) -> None:
+        """
+        Args:
+            db_ops (DBOperations): The database to take snapshots of
+            directory (str): Where to write the snapshots. It is created if it doesn't exist.
+            interval (float, optional): Seconds between the start of one snapshot and the next. Defaults to 3600.
+            keep (int, optional): Number of snapshots to keep; older ones are deleted. Defaults to 24.
+            pages (int, optional): Passed to DBOperations.backup. Defaults to 256.
+            sleep (float, optional): Passed to DBOperations.backup. Defaults to 0.05.
+        """
+        self.db_ops = db_ops
+        self.directory = directory
+        self.interval = interval
+        self.keep = max(keep, 1)
+        self.pages = pages
+        self.sleep = sleep
+        self.prefix = os.path.splitext(os.path.basename(db_ops.database_name))[0] + "-"
+        self.last_snapshot = None
+        self.last_result = None
+        self.snapshots_taken = 0
+        self._stop = threading.Event()
+        self._thread = None
+
+    def __enter__(self):
+        self.start()
+        return self
+
+    def __exit__(self, exc_type, exc_value, traceback):
+        self.stop()
+
+    def snapshots(self):
+        """
+        Returns:
+            list[str]: Paths of the snapshots in the directory, oldest first
+        """
+        if not os.path.isdir(self.directory):
+            return []
+        names = sorted(n for n in os.listdir(self.directory) if n.startswith(self.prefix) and n.endswith(".db"))
+        return [os.path.join(self.directory, n) for n in names]
+
+    def take_snapshot(self):
+        """Takes one snapshot now, then deletes any beyond the newest keep.
+
+        Returns:
+            str: Path of the snapshot, or None if the backup failed
+        """
+        os.makedirs(self.directory, exist_ok=True)
+        path = os.path.join(self.directory, self.prefix + datetime.now().strftime("%Y%m%d-%H%M%S-%f")[:-3] + ".db")
+        result = self.db_ops.backup(path, self.pages, self.sleep)
+        if result is None:
+            return None
+
+        self.last_snapshot = path
+        self.last_result = result
+        self.snapshots_taken += 1
+        for old in self.snapshots()[:-self.keep]:
+            os.remove(old)
+        return path
+
+    def run(self):
+        """Takes snapshots until stop is called. This is what the background thread runs, but it can also
+        be called directly to take snapshots in the foreground.
+        """
+        while not self._stop.is_set():
+            start = time.monotonic()
+            self.take_snapshot()
+            self._stop.wait(max(self.interval - (time.monotonic() - start), 0))
+
+    def start(self):
+        """Starts taking snapshots on a background thread, beginning with one straight away.
+        """
+        if self._thread is not None and self._thread.is_alive():
+            return
+        self._stop.clear()
+        self._thread = threading.Thread(target=self.run, name="SnapshotScheduler", daemon=True)
+        self._thread.start()
+
+    def stop(self):
+        """Stops the background thread, waiting for a snapshot in progress to finish.
+        """
+        self._stop.set()
+        if self._thread is not None:
+            self._thread.join()
+            self._thread = None
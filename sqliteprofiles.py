@@ -0,0 +1,49 @@
+"""
+Named sets of SQLite PRAGMA settings which DBOperations applies to every connection it opens.
+
+    durable:     WAL journal with a full fsync on every commit. Readers no longer block the writer,
+                 and no committed change can be lost on power failure.
+    throughput:  WAL journal, fsync only at checkpoints (a committed change can be lost on power
+                 failure, but the database cannot be corrupted), larger page cache, memory-mapped
+                 I/O and in-memory temporary tables.
+    read-mostly: As throughput, with a larger page cache and memory map for workloads that mostly
+                 run select_all and searches.
+"""
+
+PROFILES = {
+    "durable": {
+        "journal_mode": "WAL",
+        "synchronous": "FULL",
+        "cache_size": -8192,
+        "mmap_size": 0,
+        "temp_store": "DEFAULT",
+        "busy_timeout": 5000,
+    },
+    "throughput": {
+        "journal_mode": "WAL",
+        "synchronous": "NORMAL",
+        "cache_size": -65536,
+        "mmap_size": 268435456,
+        "temp_store": "MEMORY",
+        "busy_timeout": 5000,
+    },
+    "read-mostly": {
+        "journal_mode": "WAL",
+        "synchronous": "NORMAL",
+        "cache_size": -262144,
+        "mmap_size": 1073741824,
+        "temp_store": "MEMORY",
+        "busy_timeout": 10000,
+    },
+}
+
+
+def apply_profile(conn, profile: str):
+    """Applies a named profile's settings to a connection.
+
+    Args:
+        conn (sqlite3.Connection): The connection to configure
+        profile (str): One of the names in PROFILES
+    """
+    for pragma, value in PROFILES[profile].items():
+        conn.execute(f"PRAGMA {pragma}={value}")
@@ -0,0 +1,132 @@
+import itertools
+import sys
+from collections import deque
+
+from employee import Employee
+
+
+class TableRenderer:
+    """
+    The TableRenderer class prints Employees as a text table, in the same layout as make_employee_table,
+    but streams them out a page at a time instead of building the whole table in memory first.
+
+    Column widths are worked out from the first sample_size Employees only, so that output can start
+    before the rest have been read; any later value too wide for its column is cut short and ends in
+    "...". Numbers are right-aligned and text left-aligned.
+    """
+
+    default_columns = ["id"] + Employee.user_editable_attributes
+
+    def __init__(self, columns=None, sample_size: int = 200, page_size: int = 500, max_column_width: int = 40) -> None:
+        """
+        Args:
+            columns (list[str], optional): Employee attributes to show. Defaults to all of them.
+            sample_size (int, optional): Number of Employees used to size the columns. Defaults to 200.
+            page_size (int, optional): Number of rows written to the output at a time. Defaults to 500.
+            max_column_width (int, optional): Widest a column can be. Defaults to 40.
+        """
+        self.columns = columns or self.default_columns
+        self.headings = [c.capitalize() for c in self.columns]
+        self.sample_size = sample_size
+        self.page_size = page_size
+        self.max_column_width = max(max_column_width, 3)
+
+    def column_widths(self, sample):
+        widths = [len(h) for h in self.headings]
+        for e in sample:
+            for i, column in enumerate(self.columns):
+                widths[i] = max(widths[i], len(str(getattr(e, column))))
+        return [min(w, self.max_column_width) for w in widths]
+
+    @staticmethod
+    def format_cell(value, width: int):
+        text = str(value)
+        if len(text) > width:
+            return text[:width - 3] + "..."
+        if isinstance(value, (int, float)) and not isinstance(value, bool):
+            return text.rjust(width)
+        return text.ljust(width)
+
+    def format_row(self, values, widths):
+        return "| " + " | ".join(self.format_cell(v, w) for v, w in zip(values, widths)) + " |"
+
+    def format_employee(self, employee: Employee, widths):
+        return self.format_row([getattr(employee, c) for c in self.columns], widths)
+
+    def format_note(self, note: str, widths):
+        """A row spanning the whole table, eg: to show where rows have been left out."""
+        inner_width = sum(widths) + 3 * (len(widths) - 1)
+        return "| " + note[:inner_width].center(inner_width) + " |"
+
+    @staticmethod
+    def border(widths):
+        return "+" + "+".join("-" * (w + 2) for w in widths) + "+"
+
+    def render(self, employees, out=None):
+        """Writes a table of Employees to out, a page at a time. Nothing is written if there are none.
+
+        Args:
+            employees (Iterable[Employee]): The Employees, eg: a list, or a generator such as DBOperations.iter_all()
+            out (TextIO, optional): Where to write the table. Defaults to sys.stdout.
+
+        Returns:
+            int: The number of Employees written
+        """
+        out = out or sys.stdout
+        employees = iter(employees)
+        sample = list(itertools.islice(employees, self.sample_size))
+        if not sample:
+            return 0
+
+        widths = self.column_widths(sample)
+        border = self.border(widths)
+        out.write("\n".join([border, self.format_row(self.headings, widths), border]) + "\n")
+
+        count = 0
+        for page in itertools.chain([sample], iter(lambda: list(itertools.islice(employees, self.page_size)), [])):
+            out.write("\n".join(self.format_employee(e, widths) for e in page) + "\n")
+            count += len(page)
+            out.flush()
+
+        out.write(border + "\n")
+        return count
+
+    def render_preview(self, employees, head: int = 10, tail: int = 5, row_count: int = None, out=None):
+        """Writes a shortened table of Employees: the first head and last tail of them, with a row in
+        between saying how many were left out, followed by a count of the rows shown. Only head + tail
+        Employees are held in memory however many there are.
+
+        Args:
+            employees (Iterable[Employee]): The Employees
+            head (int, optional): Number of Employees shown from the start. Defaults to 10.
+            tail (int, optional): Number of Employees shown from the end. Defaults to 5.
+            row_count (int, optional): The total number of rows, if employees is only a sample of them.
+            out (TextIO, optional): Where to write the table. Defaults to sys.stdout.
+
+        Returns:
+            int: The number of Employees in employees
+        """
+        out = out or sys.stdout
+        employees = iter(employees)
+        first = list(itertools.islice(employees, head))
+        last = deque(maxlen=tail)
+        count = len(first)
+        for e in employees:
+            last.append(e)
+            count += 1
+        left_out = count - len(first) - len(last)
+        shown = len(first) + len(last)
+        total = count if row_count is None else max(row_count, count)
+
+        if shown:
+            widths = self.column_widths(itertools.chain(first, last))
+            border = self.border(widths)
+            lines = [border, self.format_row(self.headings, widths), border]
+            lines += [self.format_employee(e, widths) for e in first]
+            if left_out:
+                lines.append(self.format_note(f"... {left_out} more rows ...", widths))
+            lines += [self.format_employee(e, widths) for e in last]
+            lines.append(border)
+            out.write("\n".join(lines) + "\n")
+        out.write(f"Showing {shown} of {total} rows\n")
+        return count
@@ -0,0 +1,35 @@
+import asyncio
+
+from asyncdatabaseoperations import AsyncDBOperations
+from employee import Employee
+from userconfirmation import AutoConfirmationProvider
+
+
+def test_coalesced_reads_each_get_their_own_copy(tmp_path):
+    async def run():
+        async with AsyncDBOperations(str(tmp_path / "employees.db")) as db_ops:
+            await db_ops.create_table()
+            await db_ops.insert_data(Employee(0, "Mx", "Ann", "Lee", "ann@example.com", 30000),
+                                     AutoConfirmationProvider())
+
+            async def read_and_rename(forename):
+                employees = await db_ops.select_all()
+                seen = employees[0].forename
+                employees[0].forename = forename
+                return seen
+
+            seen = await asyncio.gather(*(read_and_rename(f"Name{i}") for i in range(5)))
+            return seen, db_ops.coalesced_reads
+
+    seen, coalesced_reads = asyncio.run(run())
+    assert coalesced_reads > 0
+    assert seen == ["Ann"] * 5
+
+
+def test_backup_passes_max_restarts_through(tmp_path):
+    async def run():
+        async with AsyncDBOperations(str(tmp_path / "employees.db")) as db_ops:
+            await db_ops.create_table()
+            return await db_ops.backup(str(tmp_path / "backup.db"), max_restarts=0)
+
+    assert asyncio.run(run())["restarts"] == 0
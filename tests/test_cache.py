@@ -0,0 +1,46 @@
+import sqlite3
+import threading
+
+from databaseoperations import DBOperations
+from employee import Employee
+from employeecache import EmployeeCache
+from userconfirmation import AutoConfirmationProvider
+
+
+def test_a_connection_seen_for_the_first_time_empties_the_cache():
+    cache = EmployeeCache()
+    cache.put(("id", 1), ((1,),), cache.generation)
+
+    cache.check_data_version(object(), 1)
+
+    assert cache.get(("id", 1)) == (False, None)
+
+
+def test_changes_made_before_a_thread_first_reads_are_seen(tmp_path):
+    path = str(tmp_path / "employees.db")
+    db_ops = DBOperations(path, pooled=True, cache_size=16)
+    db_ops.create_table()
+    db_ops.insert_data(Employee(0, "Mx", "Ann", "Lee", "ann@example.com", 30000), AutoConfirmationProvider())
+    assert db_ops.search_data_id(1).salary == 30000
+
+    writer = sqlite3.connect(path)
+    writer.execute("UPDATE EmployeeUoB SET Salary = 4000000 WHERE Id = 1")
+    writer.commit()
+    writer.close()
+
+    salaries = []
+    thread = threading.Thread(target=lambda: salaries.append(db_ops.search_data_id(1).salary))
+    thread.start()
+    thread.join()
+    assert salaries == [40000]
+
+
+def test_close_forgets_connections(tmp_path):
+    db_ops = DBOperations(str(tmp_path / "employees.db"), pooled=True, cache_size=16)
+    db_ops.create_table()
+    db_ops.search_data_id(1)
+    assert db_ops.cache._data_versions
+
+    db_ops.close()
+
+    assert not db_ops.cache._data_versions
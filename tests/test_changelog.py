@@ -0,0 +1,66 @@
+import pytest
+
+from databaseoperations import DBOperations
+from employee import Employee
+from userconfirmation import AutoConfirmationProvider
+
+approve = AutoConfirmationProvider()
+
+
+@pytest.fixture
+def db_ops(tmp_path):
+    db_ops = DBOperations(str(tmp_path / "employees.db"))
+    db_ops.create_table()
+    db_ops.insert_many([Employee(0, "Mx", f"Name{i}", "Smith", f"name{i}@example.com", 30000) for i in range(3)],
+                       approve)
+    return db_ops
+
+
+def operations(batch):
+    return [(change.employee_id, change.operation) for change in batch.changes]
+
+
+def test_changes_are_read_in_batches(db_ops):
+    batch = db_ops.changes_since(0, limit=2)
+    assert operations(batch) == [(1, "insert"), (2, "insert")]
+    assert batch.more and not batch.truncated
+
+    batch = db_ops.changes_since(batch.cursor, limit=2)
+    assert operations(batch) == [(3, "insert")]
+    assert not batch.more
+    assert batch.cursor == db_ops.latest_change_cursor()
+
+
+def test_updates_deletes_and_case_only_changes_are_logged(db_ops):
+    cursor = db_ops.latest_change_cursor()
+    employee = db_ops.search_data_id(1)
+    employee.forename = employee.forename.upper()
+    assert db_ops.update_data(employee, approve)
+    assert db_ops.adjust_pay(2, 10, approve)
+    assert db_ops.delete_data(3, approve)
+
+    batch = db_ops.changes_since(cursor)
+    assert operations(batch) == [(1, "update"), (2, "update"), (3, "delete")]
+    assert batch.changes[0].forename == "NAME0"
+    assert batch.changes[1].salary == 33000
+    assert batch.changes[2].email == "name2@example.com"
+
+
+def test_updates_which_change_nothing_are_not_logged(db_ops):
+    cursor = db_ops.latest_change_cursor()
+    assert db_ops.adjust_pay(1, 0, approve)
+
+    assert db_ops.changes_since(cursor).changes == []
+
+
+def test_readers_behind_a_compaction_are_told_they_missed_changes(db_ops):
+    assert db_ops.adjust_pay(1, 10, approve)
+    cursor = db_ops.latest_change_cursor()
+    assert db_ops.adjust_pay(2, 10, approve)
+
+    db_ops.compact_change_log(max_changes=1)
+
+    assert db_ops.changes_since(0).truncated
+    batch = db_ops.changes_since(cursor)
+    assert not batch.truncated
+    assert operations(batch) == [(2, "update")]
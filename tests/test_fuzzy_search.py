@@ -0,0 +1,48 @@
+import sqlite3
+
+from databaseoperations import DBOperations
+from employee import Employee
+from userconfirmation import AutoConfirmationProvider
+
+approve = AutoConfirmationProvider()
+
+
+def make_database(path):
+    db_ops = DBOperations(path, pooled=True)
+    db_ops.create_table()
+    assert db_ops.create_name_key_index()
+    db_ops.insert_many([Employee(0, "Mr", "John", "Smith", "john@example.com", 30000)], approve)
+    return db_ops
+
+
+def surnames(employees):
+    return [employee.surname for employee in employees]
+
+
+def test_misspelt_names_are_found(tmp_path):
+    db_ops = make_database(str(tmp_path / "employees.db"))
+
+    assert surnames(db_ops.search_data_name("Jon Smtih", "fuzzy")) == ["Smith"]
+    assert db_ops.search_data_name("Jon Smtih", "fuzzy", 0) == []
+
+
+def test_search_goes_ahead_while_another_connection_is_writing(tmp_path, capsys):
+    path = str(tmp_path / "employees.db")
+    db_ops = make_database(path)
+    assert db_ops.update_name_key_index() == 1
+    db_ops.insert_many([Employee(0, "Ms", "Jane", "Smyth", "jane@example.com", 31000)], approve)
+    capsys.readouterr()
+
+    db_ops.pool.acquire().execute("PRAGMA busy_timeout = 0")
+    writer = sqlite3.connect(path)
+    writer.execute("BEGIN IMMEDIATE")
+    try:
+        results = db_ops.search_data_name("Smith", "fuzzy")
+    finally:
+        writer.rollback()
+        writer.close()
+
+    assert surnames(results) == ["Smith"]
+    assert capsys.readouterr().out == ""
+    assert surnames(db_ops.search_data_name("Smith", "fuzzy")) == ["Smith", "Smyth"]
+
@@ -0,0 +1,28 @@
+import logging
+
+from databaseoperations import DBOperations
+from instrumentation import Instrumentation
+
+
+def test_each_slow_query_log_only_gets_its_own_queries(tmp_path):
+    first = Instrumentation(0.0, str(tmp_path / "first.log"))
+    second = Instrumentation(0.0, str(tmp_path / "second.log"))
+    DBOperations(str(tmp_path / "employees.db"), instrumentation=first).create_table()
+    DBOperations(str(tmp_path / "employees.db"), instrumentation=second).search_data_id(1)
+    first.close()
+    second.close()
+
+    first_log = (tmp_path / "first.log").read_text()
+    second_log = (tmp_path / "second.log").read_text()
+    assert "create_table" in first_log and "search_data_id" not in first_log
+    assert "search_data_id" in second_log and "create_table" not in second_log
+    assert first.methods["create_table"].calls == 1
+
+
+def test_close_removes_the_slow_query_log_handler(tmp_path):
+    logger = logging.getLogger("instrumentation.slow_queries")
+    handlers = list(logger.handlers)
+
+    Instrumentation(0.0, str(tmp_path / "slow.log")).close()
+
+    assert logger.handlers == handlers
@@ -0,0 +1,91 @@
+import sqlite3
+
+import migrations
+from databaseoperations import DBOperations
+
+
+def make_untyped_database(path, rows):
+    conn = sqlite3.connect(path)
+    conn.execute("CREATE TABLE EmployeeUoB (Id INTEGER PRIMARY KEY AUTOINCREMENT, "
+                 "Title, Forename, Surname, EmailAddress, Salary)")
+    conn.executemany("INSERT INTO EmployeeUoB (Title, Forename, Surname, EmailAddress, Salary) "
+                     "VALUES (?, ?, ?, ?, ?)", rows)
+    conn.commit()
+    conn.close()
+
+
+def schema_version(path):
+    conn = sqlite3.connect(path)
+    try:
+        return migrations.schema_version(conn)
+    finally:
+        conn.close()
+
+
+def salaries(db_ops):
+    return {employee.id: employee.salary for employee in db_ops.select_all()}
+
+
+def test_untyped_salaries_are_read_as_amounts(tmp_path):
+    path = str(tmp_path / "employees.db")
+    make_untyped_database(path, [
+        ("Mr", "Ann", "Lee", "ann@example.com", "30000"),
+        ("Ms", "Bea", "Kim", "bea@example.com", "£32,500.50"),
+        ("Dr", "Cal", "Ode", "cal@example.com", 41000),
+    ])
+
+    db_ops = DBOperations(path)
+
+    assert schema_version(path) == migrations.LATEST_VERSION
+    assert salaries(db_ops) == {1: 30000.0, 2: 32500.5, 3: 41000.0}
+
+
+def test_blank_salaries_become_zero(tmp_path):
+    path = str(tmp_path / "employees.db")
+    make_untyped_database(path, [
+        ("Mr", "Ann", "Lee", "ann@example.com", ""),
+        ("Ms", "Bea", "Kim", "bea@example.com", None),
+        ("Dr", "Cal", "Ode", "cal@example.com", "  "),
+    ])
+
+    db_ops = DBOperations(path)
+
+    assert schema_version(path) == migrations.LATEST_VERSION
+    assert salaries(db_ops) == {1: 0.0, 2: 0.0, 3: 0.0}
+
+
+def test_refused_upgrade_names_the_rows_and_stops_every_function(tmp_path, capsys):
+    path = str(tmp_path / "employees.db")
+    make_untyped_database(path, [
+        ("Mr", "Ann", "Lee", "ann@example.com", "30000"),
+        ("Ms", "Bea", "Kim", "bea@example.com", "abc"),
+    ])
+
+    db_ops = DBOperations(path)
+
+    assert "Ids: 2" in capsys.readouterr().out
+    assert schema_version(path) == 0
+    assert db_ops.select_all() is None
+    assert "could not be upgraded" in capsys.readouterr().out
+
+    conn = sqlite3.connect(path)
+    conn.execute("UPDATE EmployeeUoB SET Salary = '1' WHERE Id = 2")
+    conn.commit()
+    conn.close()
+
+    assert [version for version, _ in db_ops.upgrade_schema()] == list(range(1, migrations.LATEST_VERSION + 1))
+    assert salaries(db_ops) == {1: 30000.0, 2: 1.0}
+
+
+def test_shared_email_addresses_refuse_the_upgrade(tmp_path, capsys):
+    path = str(tmp_path / "employees.db")
+    make_untyped_database(path, [
+        ("Mr", "Ann", "Lee", "ann@example.com", "30000"),
+        ("Ms", "Bea", "Kim", " ANN@example.com", "31000"),
+    ])
+
+    db_ops = DBOperations(path)
+
+    assert "ann@example.com" in capsys.readouterr().out
+    assert schema_version(path) == 0
+    assert db_ops.select_all() is None
@@ -0,0 +1,58 @@
+from databaseoperations import DBOperations
+from employee import Employee
+from userconfirmation import AutoConfirmationProvider
+
+approve = AutoConfirmationProvider()
+
+
+def add_employee(db_ops, forename):
+    employee = Employee(0, "Mx", forename, "Smith", f"{forename.lower()}@example.com", 30000)
+    assert db_ops.insert_data(employee, approve)
+    return employee
+
+
+def test_restore_replaces_the_employees(tmp_path):
+    db_ops = DBOperations(str(tmp_path / "employees.db"))
+    db_ops.create_table()
+    add_employee(db_ops, "Ann")
+    assert db_ops.backup(str(tmp_path / "backup.db")) is not None
+    add_employee(db_ops, "Bea")
+
+    assert not db_ops.restore(str(tmp_path / "backup.db"), AutoConfirmationProvider(approve=False))
+    assert len(db_ops.select_all()) == 2
+
+    assert db_ops.restore(str(tmp_path / "backup.db"), approve)
+    assert [employee.forename for employee in db_ops.select_all()] == ["Ann"]
+
+
+def test_restore_does_not_rewind_change_log_cursors(tmp_path):
+    db_ops = DBOperations(str(tmp_path / "employees.db"))
+    db_ops.create_table()
+    add_employee(db_ops, "Ann")
+    assert db_ops.backup(str(tmp_path / "backup.db")) is not None
+    for forename in ("Bea", "Cal", "Dee"):
+        add_employee(db_ops, forename)
+    cursor = db_ops.latest_change_cursor()
+    assert db_ops.changes_since(cursor).changes == []
+
+    assert db_ops.restore(str(tmp_path / "backup.db"), approve)
+    add_employee(db_ops, "Eve")
+
+    batch = db_ops.changes_since(cursor)
+    assert batch.truncated
+    reloaded = db_ops.latest_change_cursor()
+    assert reloaded > cursor
+    add_employee(db_ops, "Fay")
+    batch = db_ops.changes_since(reloaded)
+    assert not batch.truncated
+    assert [change.forename for change in batch.changes] == ["Fay"]
+
+
+def test_restore_of_a_damaged_backup_is_refused(tmp_path):
+    db_ops = DBOperations(str(tmp_path / "employees.db"))
+    db_ops.create_table()
+    add_employee(db_ops, "Ann")
+    (tmp_path / "backup.db").write_bytes(b"not a database" * 100)
+
+    assert not db_ops.restore(str(tmp_path / "backup.db"), approve)
+    assert len(db_ops.select_all()) == 1
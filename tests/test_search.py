@@ -0,0 +1,27 @@
+import pytest
+
+from databaseoperations import DBOperations
+from employee import Employee
+from instrumentation import Instrumentation
+from userconfirmation import AutoConfirmationProvider
+
+
+@pytest.fixture
+def db_ops(tmp_path):
+    db_ops = DBOperations(str(tmp_path / "employees.db"), instrumentation=Instrumentation())
+    db_ops.create_table()
+    db_ops.insert_many([Employee(0, "Mx", "Ann", "Leeson", "ann@example.com", 30000),
+                        Employee(0, "Mx", "Bea", "Lee", "bea@example.com", 31000)], AutoConfirmationProvider())
+    return db_ops
+
+
+@pytest.mark.parametrize("mode, term", [("fzt", "Lee"), ("fts", "Le"), ("fts", "Lee")])
+def test_searches_which_cant_run_are_reported_as_errors(db_ops, capsys, mode, term):
+    assert db_ops.search_data_name(term, mode) is None
+    assert capsys.readouterr().out
+    assert db_ops.instrumentation.methods["search_data_name"].errors == 1
+
+
+@pytest.mark.parametrize("mode", ["auto", "like", "prefix"])
+def test_name_search_modes(db_ops, mode):
+    assert sorted(e.surname for e in db_ops.search_data_name("Lee", mode)) == ["Lee", "Leeson"]
@@ -0,0 +1,67 @@
+import pytest
+
+from databaseoperations import DBOperations
+from employee import Employee
+from userconfirmation import AutoConfirmationProvider
+
+approve = AutoConfirmationProvider()
+
+
+def record(forename, email, salary, **fields):
+    return dict({"Title": "Mx", "Forename": forename, "Surname": "Smith", "EmailAddress": email,
+                 "Salary": salary}, **fields)
+
+
+@pytest.fixture
+def db_ops(tmp_path):
+    db_ops = DBOperations(str(tmp_path / "employees.db"))
+    db_ops.create_table()
+    db_ops.insert_many([Employee(0, "Mx", "Ann", "Smith", "ann@example.com", 30000),
+                        Employee(0, "Mx", "Bea", "Smith", "bea@example.com", 31000),
+                        Employee(0, "Mx", "Cal", "Smith", "cal@example.com", 32000)], approve)
+    return db_ops
+
+
+def test_only_changed_rows_are_written(db_ops):
+    cursor = db_ops.latest_change_cursor()
+    feed = [record("Ann", "ANN@example.com", "30,000"), record("Bea", "bea@example.com", "£35,000"),
+            record("Dee", "dee@example.com", 40000)]
+
+    report = db_ops.sync_records(feed, approve, delete_missing=True)
+
+    assert report == {"inserted": 1, "updated": 2, "unchanged": 0, "deleted": 1, "skipped": 0,
+                      "duplicates": 0, "rejected": 0}
+    assert db_ops.search_data_email("bea@example.com").salary == 35000
+    assert db_ops.search_data_email("cal@example.com") is None
+    assert len(db_ops.changes_since(cursor).changes) == 4
+
+    cursor = db_ops.latest_change_cursor()
+    report = db_ops.sync_records(feed, approve, delete_missing=True)
+    assert report["unchanged"] == 3 and report["updated"] == report["inserted"] == report["deleted"] == 0
+    assert db_ops.changes_since(cursor).changes == []
+
+
+def test_records_which_cant_be_used_are_skipped_or_rejected(db_ops):
+    feed = [record("Ann", "ann@example.com", "abc"), record("Bea", "bea@example.com", ""),
+            record("Eve", " ", 1000), record("Cal", "cal@example.com", 1), record("Cal", "cal@example.com", 33000)]
+
+    report = db_ops.sync_records(feed, approve)
+
+    assert report["rejected"] == 2 and report["skipped"] == 1 and report["duplicates"] == 1
+    assert report["updated"] == 1
+    assert db_ops.search_data_email("ann@example.com").salary == 30000
+    assert db_ops.search_data_email("cal@example.com").salary == 33000
+
+
+def test_declined_sync_changes_nothing(db_ops):
+    assert db_ops.sync_records([record("Dee", "dee@example.com", 1)], AutoConfirmationProvider(approve=False)) is None
+    assert len(db_ops.select_all()) == 3
+
+
+def test_sync_on_external_ids(db_ops):
+    feed = [record("Ann", "ann@example.com", 30000, ExternalId="A1")]
+    assert db_ops.sync_records(feed, approve)["updated"] == 1
+
+    feed = [record("Anne", "anne@example.com", 30000, ExternalId="A1")]
+    assert db_ops.sync_records(feed, approve, key="external_id")["updated"] == 1
+    assert db_ops.search_data_id(1).email == "anne@example.com"
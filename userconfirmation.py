@@ -1,4 +1,6 @@
-from employee import make_employee_table
+from changepreview import ChangePreview
+from employee import Employee
+from tablerenderer import TableRenderer
 
 class UserConfirmationProvider:
     """
@@ -10,20 +12,37 @@ class UserConfirmationProvider:
     non-CLI application.
     """    
 
-    def __init__(self, prompt: str) -> None:
+    def __init__(self, prompt: str, preview_head: int = 10, preview_tail: int = 5) -> None:
+        """
+        Args:
+            prompt (str): The question asked
+            preview_head (int, optional): Number of affected Employees shown from the start of a long
+            list. Defaults to 10.
+            preview_tail (int, optional): Number shown from the end. Defaults to 5.
+        """
         self.prompt = prompt
+        self.preview_head = preview_head
+        self.preview_tail = preview_tail
 
     def requestConfirmation(self, data):
         """Ask for confirmation of the changes.
 
         Args:
-            data (list[Employee]): A list of the affected Employee records
+            data (list[Employee] | ChangePreview): The affected Employee records, or a
+            ChangePreview summarising them when there are too many to list
 
         Returns:
             bool: Whether the user approved the change(s)
         """        
         print("\nAffected data")
-        print(make_employee_table(data))
+        row_count = None
+        if isinstance(data, ChangePreview):
+            print(data.summary())
+            row_count = data.row_count
+            data = data.sample
+        if isinstance(data, Employee):
+            data = [data]
+        TableRenderer().render_preview(data, self.preview_head, self.preview_tail, row_count)
 
         operation_confirmed = None
         while operation_confirmed is None:
@@ -33,4 +52,16 @@ class UserConfirmationProvider:
 
         return operation_confirmed
 
-        
\ No newline at end of file
+
+class AutoConfirmationProvider(UserConfirmationProvider):
+    """
+    A UserConfirmationProvider which gives the same answer to every request without asking anyone,
+    for scripts, scheduled jobs and benchmarks.
+    """
+
+    def __init__(self, prompt: str = "", approve: bool = True) -> None:
+        super().__init__(prompt)
+        self.approve = approve
+
+    def requestConfirmation(self, data):
+        return self.approve